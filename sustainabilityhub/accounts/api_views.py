@@ -12,6 +12,9 @@ from .serializers import (
 )
 from .models import UserWarning
 from .permissions import get_user_role, assign_user_role, CanManageUsers
+from stats.models import UserCounters
+from sustainabilityhub.pagination import KeysetCursorPagination
+from search.typeahead import matching_ids
 
 User = get_user_model()
 
@@ -20,6 +23,8 @@ class UserViewSet(viewsets.ModelViewSet):
     """API ViewSet for user management"""
     queryset = User.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-date_joined', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -51,7 +56,7 @@ class UserViewSet(viewsets.ModelViewSet):
             elif role == 'verified':
                 queryset = queryset.filter(groups__name='Verified Users')
         
-        return queryset.select_related().prefetch_related('groups')
+        return queryset.select_related('counters').prefetch_related('groups')
     
     def perform_create(self, serializer):
         """Create new user account"""
@@ -120,16 +125,17 @@ class UserViewSet(viewsets.ModelViewSet):
     def stats(self, request, pk=None):
         """Get user statistics"""
         user = self.get_object()
+        counters = UserCounters.for_user(user)
         
         stats = {
-            'projects_created': user.created_projects.count(),
-            'projects_joined': user.joined_projects.count(),
-            'forum_posts': user.forum_posts.count(),
-            'community_posts': getattr(user, 'community_posts', user.social_posts).count(),
-            'events_created': user.created_events.count(),
-            'followers_count': user.followers.count(),
-            'following_count': user.following.count(),
-            'warnings_count': user.warnings.filter(is_active=True).count(),
+            'projects_created': counters.projects_created,
+            'projects_joined': counters.projects_joined,
+            'forum_posts': counters.forum_posts,
+            'community_posts': counters.community_posts,
+            'events_created': counters.events_created,
+            'followers_count': counters.followers,
+            'following_count': counters.following,
+            'warnings_count': counters.active_warnings,
         }
         
         return Response(stats)
@@ -141,11 +147,10 @@ class UserViewSet(viewsets.ModelViewSet):
         if not query:
             return Response([])
         
-        users = self.get_queryset().filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )[:20]
+        # Word-prefix matches from the typeahead index, most followed first
+        ids = matching_ids('user', query, limit=20)
+        found = self.get_queryset().in_bulk(ids)
+        users = [found[pk] for pk in ids if pk in found]
         
         serializer = UserSearchSerializer(users, many=True, context={'request': request})
         return Response(serializer.data)
@@ -210,6 +215,7 @@ class UserWarningViewSet(viewsets.ModelViewSet):
     """API ViewSet for user warnings"""
     queryset = UserWarning.objects.all()
     serializer_class = UserWarningSerializer
+    pagination_class = KeysetCursorPagination
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
@@ -284,31 +290,31 @@ class UserWarningViewSet(viewsets.ModelViewSet):
 @permission_classes([permissions.IsAuthenticated])
 def user_dashboard_stats(request):
     """Get dashboard statistics for current user"""
-    user = request.user
+    counters = UserCounters.for_user(request.user)
     
     stats = {
         'projects': {
-            'created': user.created_projects.count(),
-            'joined': user.joined_projects.count(),
-            'active': user.created_projects.filter(status='active').count(),
+            'created': counters.projects_created,
+            'joined': counters.projects_joined,
+            'active': counters.projects_active,
         },
         'community': {
-            'posts': getattr(user, 'community_posts', user.social_posts).count(),
-            'comments': getattr(user, 'community_comments', user.comments).count(),
-            'followers': user.followers.count(),
-            'following': user.following.count(),
+            'posts': counters.community_posts,
+            'comments': counters.community_comments,
+            'followers': counters.followers,
+            'following': counters.following,
         },
         'forum': {
-            'topics': user.topics.count(),
-            'posts': user.forum_posts.count(),
+            'topics': counters.topics_created,
+            'posts': counters.forum_posts,
         },
         'events': {
-            'created': user.created_events.count(),
-            'attending': user.event_attendees.count(),
+            'created': counters.events_created,
+            'attending': counters.events_attending,
         },
         'warnings': {
-            'active': user.warnings.filter(is_active=True).count(),
-            'total': user.warnings.count(),
+            'active': counters.active_warnings,
+            'total': counters.warnings_total,
         }
     }
     
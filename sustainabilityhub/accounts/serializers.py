@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import UserWarning
 from .permissions import get_user_role
+from stats.models import UserCounters
 
 User = get_user_model()
 
@@ -62,12 +63,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return get_user_role(obj)
     
     def get_stats(self, obj):
+        counters = UserCounters.for_user(obj)
         return {
-            'projects_created': obj.created_projects.count(),
-            'projects_joined': obj.joined_projects.count(),
-            'forum_posts': obj.forum_posts.count(),
-            'community_posts': obj.community_posts.count(),
-            'events_created': obj.created_events.count(),
+            'projects_created': counters.projects_created,
+            'projects_joined': counters.projects_joined,
+            'forum_posts': counters.forum_posts,
+            'community_posts': counters.community_posts,
+            'events_created': counters.events_created,
         }
     
     def get_is_following(self, obj):
@@ -77,10 +79,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return False
     
     def get_followers_count(self, obj):
-        return obj.followers.count()
+        return UserCounters.for_user(obj).followers
     
     def get_following_count(self, obj):
-        return obj.following.count()
+        return UserCounters.for_user(obj).following
 
 
 class UserBasicSerializer(serializers.ModelSerializer):
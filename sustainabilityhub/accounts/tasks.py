@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from sustainabilityhub.tasks import task
+from .models import OTP
+
+OTP_SUBJECTS = {
+    'login': 'Your EcoConnect login code',
+    'reset': 'Your EcoConnect password reset code',
+}
+
+
+@task
+def send_otp_email(otp_id, purpose):
+    """Email a one-time code; the console email backend prints it in development"""
+    otp = OTP.objects.filter(pk=otp_id, is_used=False).first()
+    if otp is None:
+        # Replaced by a newer code or already used
+        return
+    send_mail(
+        OTP_SUBJECTS[purpose],
+        f'Your code is {otp.otp_code}. It expires at {timezone.localtime(otp.expires_at):%Y-%m-%d %H:%M}.\n\n'
+        'If you did not ask for it, you can ignore this email.',
+        settings.DEFAULT_FROM_EMAIL,
+        [otp.email],
+    )
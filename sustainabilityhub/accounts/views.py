@@ -7,7 +7,9 @@ from django.utils import timezone
 from datetime import timedelta
 from .forms import CustomUserCreationForm
 from .models import UserWarning, OTP
-from notifications.utils import create_notification
+from .tasks import send_otp_email
+from notifications.utils import queue_notifications
+from stats.models import UserCounters
 
 User = get_user_model()
 
@@ -33,23 +35,17 @@ def otp_login_request(request):
         OTP.objects.filter(email=email).delete()
         
         # Create new OTP
-        OTP.objects.create(
+        otp = OTP.objects.create(
             email=email,
             otp_code=otp_code,
             expires_at=expires_at
         )
         
-        # Print OTP to terminal
-        print(f'\n{"="*60}')
-        print(f'🔐 OTP LOGIN REQUEST')
-        print(f'{"="*60}')
-        print(f'Email: {email}')
-        print(f'OTP Code: {otp_code}')
-        print(f'Expires: {expires_at.strftime("%Y-%m-%d %H:%M:%S")}')
-        print(f'{"="*60}\n')
+        # Emailed once the OTP row is committed
+        send_otp_email.delay(otp.pk, 'login')
         
         request.session['otp_email'] = email
-        messages.success(request, f'OTP generated! Check the terminal/console for your OTP code.')
+        messages.success(request, f'We sent a one-time code to {email}. It expires in 10 minutes.')
         return redirect('accounts:otp_verify')
     
     return render(request, 'accounts/otp_login.html')
@@ -123,24 +119,18 @@ def forgot_password(request):
         OTP.objects.filter(email=email).delete()
         
         # Create new OTP
-        OTP.objects.create(
+        otp = OTP.objects.create(
             email=email,
             otp_code=otp_code,
             expires_at=expires_at
         )
         
-        # Print OTP to terminal
-        print(f'\n{"="*60}')
-        print(f'🔑 PASSWORD RESET OTP')
-        print(f'{"="*60}')
-        print(f'Email: {email}')
-        print(f'OTP Code: {otp_code}')
-        print(f'Expires: {expires_at.strftime("%Y-%m-%d %H:%M:%S")}')
-        print(f'{"="*60}\n')
+        # Emailed once the OTP row is committed
+        send_otp_email.delay(otp.pk, 'reset')
         
         request.session['otp_email'] = email
         request.session['otp_type'] = 'reset'
-        messages.success(request, 'OTP generated! Check the terminal for your OTP code.')
+        messages.success(request, f'We sent a one-time code to {email}. It expires in 10 minutes.')
         return redirect('accounts:otp_verify')
     
     return render(request, 'accounts/forgot_password.html')
@@ -290,8 +280,8 @@ def warn_user(request, pk):
         )
         
         # Notify user about warning
-        create_notification(
-            recipient=user,
+        queue_notifications(
+            [user.pk],
             notification_type='warning_issued',
             title=f'{warning.get_severity_display()} Warning',
             message=f'Reason: {warning.reason}',
@@ -322,8 +312,8 @@ def toggle_user_status(request, pk):
             messages.success(request, f'User {user.username} has been {status}.')
             
             # Notify user about status change
-            create_notification(
-                recipient=user,
+            queue_notifications(
+                [user.pk],
                 notification_type='account_status',
                 title=f'Account {status.title()}',
                 message=f'Your account has been {status} by an administrator.',
@@ -339,8 +329,9 @@ def my_warnings(request):
     """View for users to see their own warnings"""
     from django.utils import timezone
     
-    # Mark all unviewed warnings as viewed
-    request.user.warnings.filter(is_active=True, viewed_at__isnull=True).update(viewed_at=timezone.now())
+    # Mark all unviewed warnings as viewed (bulk update skips signals, so adjust the counter here)
+    viewed = request.user.warnings.filter(is_active=True, viewed_at__isnull=True).update(viewed_at=timezone.now())
+    UserCounters.apply_deltas(request.user.pk, {'unviewed_warnings': -viewed})
     
     # Get all active warnings
     warnings = request.user.warnings.filter(is_active=True).order_by('-created_at')
@@ -350,12 +341,13 @@ def my_warnings(request):
 def profile(request):
     """View for users to see their own profile"""
     user = request.user
+    counters = UserCounters.for_user(user)
     stats = {
-        'topics_count': user.topics.count(),
-        'forum_posts_count': user.forum_posts.count(),
-        'created_projects_count': user.created_projects.count(),
-        'joined_projects_count': user.joined_projects.count(),
-        'warnings_count': user.warnings.filter(is_active=True).count(),
+        'topics_count': counters.topics_created,
+        'forum_posts_count': counters.forum_posts,
+        'created_projects_count': counters.projects_created,
+        'joined_projects_count': counters.projects_joined,
+        'warnings_count': counters.active_warnings,
     }
     warnings = user.warnings.filter(is_active=True).order_by('-created_at')[:5]
     return render(request, 'accounts/profile.html', {'stats': stats, 'warnings': warnings})
@@ -393,14 +385,15 @@ def user_detail(request, pk):
     warnings = user.warnings.filter(is_active=True)[:10]  # Latest 10 warnings
     
     # Get comprehensive stats
+    counters = UserCounters.for_user(user)
     stats = {
-        'topics_count': user.topics.count(),
-        'forum_posts_count': user.forum_posts.count(),
-        'created_projects_count': user.created_projects.count(),
-        'joined_projects_count': user.joined_projects.count(),
-        'warnings_count': user.warnings.filter(is_active=True).count(),
-        'events_created': user.events_created.count() if hasattr(user, 'events_created') else 0,
-        'resources_shared': user.resources_created.count() if hasattr(user, 'resources_created') else 0,
+        'topics_count': counters.topics_created,
+        'forum_posts_count': counters.forum_posts,
+        'created_projects_count': counters.projects_created,
+        'joined_projects_count': counters.projects_joined,
+        'warnings_count': counters.active_warnings,
+        'events_created': counters.events_created,
+        'resources_shared': counters.resources_shared,
     }
     
     return render(request, 'accounts/user_detail.html', {
@@ -1,7 +1,6 @@
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
-from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.dispatch import receiver
-from .models import ActivityLog, UserSession, SecurityEvent
+from .models import ActivityLog
 
 
 class ActivityLogMiddleware(MiddlewareMixin):
@@ -15,6 +14,24 @@ class ActivityLogMiddleware(MiddlewareMixin):
                 'user_agent': request.META.get('HTTP_USER_AGENT', ''),
             }
     
+    def process_response(self, request, response):
+        """Log the page view; the row is queued, not written, so this adds no query"""
+        user = getattr(request, 'user', None)
+        # Still authenticated: a logout during the request is logged by its own signal
+        if user is not None and user.is_authenticated and not request.path.startswith(self.skipped_prefixes()):
+            ActivityLog.log_activity(
+                user=user,
+                action_type='page_view',
+                description=request.path,
+                metadata={'method': request.method, 'status': response.status_code},
+                request=request
+            )
+        return response
+    
+    @staticmethod
+    def skipped_prefixes():
+        return tuple(prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL) if prefix)
+    
     def get_client_ip(self, request):
         """Get client IP address from request"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -23,49 +40,3 @@ class ActivityLogMiddleware(MiddlewareMixin):
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
-
-
-@receiver(user_logged_in)
-def log_user_login(sender, request, user, **kwargs):
-    """Log user login activity"""
-    ActivityLog.log_activity(
-        user=user,
-        action_type='user_login',
-        description=f'User {user.username} logged in',
-        request=request
-    )
-    
-    # Create or update user session
-    session_key = request.session.session_key
-    if session_key:
-        UserSession.objects.update_or_create(
-            session_key=session_key,
-            defaults={
-                'user': user,
-                'ip_address': ActivityLog.get_client_ip(request),
-                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                'is_active': True,
-            }
-        )
-
-
-@receiver(user_logged_out)
-def log_user_logout(sender, request, user, **kwargs):
-    """Log user logout activity"""
-    if user:
-        ActivityLog.log_activity(
-            user=user,
-            action_type='user_logout',
-            description=f'User {user.username} logged out',
-            request=request
-        )
-        
-        # Update user session
-        session_key = request.session.session_key
-        if session_key:
-            try:
-                session = UserSession.objects.get(session_key=session_key)
-                session.is_active = False
-                session.save()
-            except UserSession.DoesNotExist:
-                pass
\ No newline at end of file
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity_logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action_type',
+            field=models.CharField(choices=[('user_registered', 'User Registered'), ('user_login', 'User Login'), ('user_logout', 'User Logout'), ('profile_updated', 'Profile Updated'), ('page_view', 'Page View'), ('project_created', 'Project Created'), ('project_joined', 'Project Joined'), ('project_left', 'Project Left'), ('project_updated', 'Project Updated'), ('event_created', 'Event Created'), ('event_joined', 'Event Joined'), ('event_left', 'Event Left'), ('topic_created', 'Topic Created'), ('post_created', 'Post Created'), ('comment_created', 'Comment Created'), ('community_post_created', 'Community Post Created'), ('community_comment_created', 'Community Comment Created'), ('user_followed', 'User Followed'), ('user_unfollowed', 'User Unfollowed'), ('resource_created', 'Resource Created'), ('resource_shared', 'Resource Shared'), ('user_warned', 'User Warned'), ('user_banned', 'User Banned'), ('content_moderated', 'Content Moderated')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
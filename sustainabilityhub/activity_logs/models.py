@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.utils import timezone
 
 
 class ActivityLog(models.Model):
@@ -12,6 +13,7 @@ class ActivityLog(models.Model):
         ('user_login', 'User Login'),
         ('user_logout', 'User Logout'),
         ('profile_updated', 'Profile Updated'),
+        ('page_view', 'Page View'),
         
         # Project actions
         ('project_created', 'Project Created'),
@@ -63,7 +65,8 @@ class ActivityLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -78,9 +81,19 @@ class ActivityLog(models.Model):
     
     @classmethod
     def log_activity(cls, user, action_type, description='', content_object=None, metadata=None, request=None):
-        """Helper method to log activities"""
+        """
+        Queue an activity for the buffered writer (activity_logs.writer).
+
+        Returns the unsaved row, or None when ACTIVITY_LOG_ENABLED is off or
+        the writer's queue is full.
+        """
+        from . import writer
+
+        if not getattr(settings, 'ACTIVITY_LOG_ENABLED', True):
+            return None
+
         log_data = {
-            'user': user,
+            'user_id': user.pk,
             'action_type': action_type,
             'description': description,
             'metadata': metadata or {},
@@ -93,7 +106,8 @@ class ActivityLog(models.Model):
             log_data['ip_address'] = cls.get_client_ip(request)
             log_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
         
-        return cls.objects.create(**log_data)
+        log = cls(**log_data)
+        return log if writer.record(log) else None
     
     @staticmethod
     def get_client_ip(request):
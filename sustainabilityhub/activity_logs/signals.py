@@ -0,0 +1,55 @@
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.signals import request_started, request_finished
+from django.dispatch import receiver
+from .models import ActivityLog, UserSession
+from . import writer
+
+request_started.connect(writer.request_started, dispatch_uid='activity_log_request_started')
+request_finished.connect(writer.request_finished, dispatch_uid='activity_log_request_finished')
+
+
+@receiver(user_logged_in)
+def log_user_login(sender, request, user, **kwargs):
+    """Log user login activity"""
+    ActivityLog.log_activity(
+        user=user,
+        action_type='user_login',
+        description=f'User {user.username} logged in',
+        request=request
+    )
+    
+    # Create or update user session; logins without a client address (test client, scripts) have none
+    session_key = request.session.session_key
+    ip_address = ActivityLog.get_client_ip(request)
+    if session_key and ip_address:
+        UserSession.objects.update_or_create(
+            session_key=session_key,
+            defaults={
+                'user': user,
+                'ip_address': ip_address,
+                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+                'is_active': True,
+            }
+        )
+
+
+@receiver(user_logged_out)
+def log_user_logout(sender, request, user, **kwargs):
+    """Log user logout activity"""
+    if user:
+        ActivityLog.log_activity(
+            user=user,
+            action_type='user_logout',
+            description=f'User {user.username} logged out',
+            request=request
+        )
+        
+        # Update user session
+        session_key = request.session.session_key
+        if session_key:
+            try:
+                session = UserSession.objects.get(session_key=session_key)
+                session.is_active = False
+                session.save()
+            except UserSession.DoesNotExist:
+                pass
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Buffered writer for ActivityLog.
+
+ActivityLog.log_activity() queues an unsaved row here instead of inserting
+it. A daemon thread per process writes the queue with bulk_create every
+ACTIVITY_LOG_FLUSH_INTERVAL seconds, or sooner once ACTIVITY_LOG_BATCH_SIZE
+rows are waiting. Whatever is left is written when the process exits.
+
+The queue holds at most ACTIVITY_LOG_MAX_PENDING rows. If the database falls
+behind, new rows are dropped rather than letting the queue grow without
+bound or slowing requests down. A full batch that wakes the writer early is
+counted as backpressure. A batch the database rejects (say a row for a user
+deleted since it was queued) is retried row by row, so only the bad rows
+are counted as failed. Drops and failed writes are logged as warnings.
+stats() returns the counters for this process.
+
+With ACTIVITY_LOG_FLUSH_ON_REQUEST the thread is not started. Rows queued
+during a request are written when it finishes, and rows logged outside a
+request are written at once. Tests use this, since their transactions are
+not visible to other threads.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_pending = deque()
+_condition = threading.Condition()
+_counters = dict.fromkeys(['queued', 'written', 'dropped', 'failed', 'flushes', 'backpressure'], 0)
+_reported = {'dropped': 0, 'failed': 0}
+_high_water = 0
+_thread_pid = None
+_request = threading.local()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _batch_size():
+    return _setting('ACTIVITY_LOG_BATCH_SIZE', 500)
+
+
+def _flush_on_request():
+    return _setting('ACTIVITY_LOG_FLUSH_ON_REQUEST', False)
+
+
+def _ensure_thread():
+    """Start this process's writer thread; a forked child starts its own"""
+    global _thread_pid
+    pid = os.getpid()
+    if _thread_pid == pid:
+        return
+    if _thread_pid is not None:
+        # Rows copied from the parent are the parent's to write
+        _pending.clear()
+    _thread_pid = pid
+    threading.Thread(target=_run, name='activity-log-writer', daemon=True).start()
+
+
+def record(log):
+    """Queue an unsaved ActivityLog; returns False if it was dropped"""
+    global _high_water
+    with _condition:
+        if not _flush_on_request():
+            _ensure_thread()
+        if len(_pending) >= _setting('ACTIVITY_LOG_MAX_PENDING', 10000):
+            _counters['dropped'] += 1
+            return False
+        _pending.append(log)
+        _counters['queued'] += 1
+        _high_water = max(_high_water, len(_pending))
+        if len(_pending) == _batch_size():
+            _counters['backpressure'] += 1
+            _condition.notify()
+    if _flush_on_request() and not getattr(_request, 'active', False):
+        flush()
+    return True
+
+
+def flush():
+    """Write every queued row; returns how many were written"""
+    from .models import ActivityLog
+
+    written = 0
+    while True:
+        with _condition:
+            batch = [_pending.popleft() for _ in range(min(len(_pending), _batch_size()))]
+        if not batch:
+            break
+        written += _write(ActivityLog, batch)
+    with _condition:
+        _counters['written'] += written
+        _counters['flushes'] += 1
+        lost = {name: _counters[name] - _reported[name] for name in _reported}
+        _reported.update((name, _counters[name]) for name in _reported)
+    if any(lost.values()):
+        logger.warning('Activity log lost %(dropped)d dropped and %(failed)d failed rows since the last flush', lost)
+    return written
+
+
+def _write(model, batch):
+    """Insert a batch; if it fails, retry its rows one by one so only the bad ones are lost"""
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        return len(batch)
+    except Exception:
+        logger.warning('Could not write %d activity log rows at once, retrying them one by one', len(batch), exc_info=True)
+
+    written = 0
+    for log in batch:
+        # The failed insert may have set a primary key before rolling back
+        log.pk = None
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([log])
+        except Exception:
+            logger.exception('Could not write an activity log row for user %s', log.user_id)
+            with _condition:
+                _counters['failed'] += 1
+            continue
+        written += 1
+    return written
+
+
+def stats():
+    """Counters of this process's writer, plus the current and highest queue length"""
+    with _condition:
+        return dict(_counters, pending=len(_pending), high_water=_high_water)
+
+
+def _run():
+    while True:
+        with _condition:
+            if len(_pending) < _batch_size():
+                _condition.wait(_setting('ACTIVITY_LOG_FLUSH_INTERVAL', 2))
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Activity log writer failed')
+            time.sleep(1)
+
+
+def request_started(sender, **kwargs):
+    _request.active = True
+
+
+def request_finished(sender, **kwargs):
+    _request.active = False
+    if _flush_on_request() and _pending:
+        flush()
+
+
+atexit.register(lambda: _pending and flush())
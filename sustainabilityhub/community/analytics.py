@@ -0,0 +1,117 @@
+"""
+Impact analytics computed with NumPy over the daily rollup.
+
+A member's report loads their ImpactDailyRollup rows for the period once
+(one row per type and day, however many actions they logged) into a
+types x days matrix. Daily series, trailing moving averages and the
+per-type breakdown are array operations on that matrix.
+
+Community percentiles compare a member's total for one impact type with
+every member who logged that type in the period. The sorted totals are
+cached for a few minutes, since they are the same for everyone.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from sustainabilityhub.computations import cached_computation
+from .rollup import CANONICAL_UNITS
+from .sustainability_features import IMPACT_TYPES, ImpactDailyRollup
+
+TYPES = [impact_type for impact_type, _ in IMPACT_TYPES]
+LABELS = dict(IMPACT_TYPES)
+PERCENTILES = (25, 50, 75, 90)
+
+
+def moving_average(series, window):
+    """Trailing mean over `window` days along the last axis; the first days average what there is"""
+    sums = np.cumsum(series, axis=-1)
+    shifted = np.zeros_like(sums)
+    shifted[..., window:] = sums[..., :-window]
+    return (sums - shifted) / np.minimum(np.arange(1, series.shape[-1] + 1), window)
+
+
+def _matrix(user_id, start, days):
+    """(amounts, actions) arrays of shape (types, days) for a member"""
+    rows = list(ImpactDailyRollup.objects.filter(
+        user_id=user_id, day__gte=start, day__lt=start + timedelta(days=days)
+    ).values_list('impact_type', 'day', 'amount', 'actions'))
+    amounts = np.zeros((len(TYPES), days))
+    actions = np.zeros((len(TYPES), days), dtype=np.int64)
+    if rows:
+        impact_types, row_days, row_amounts, row_actions = zip(*rows)
+        type_index = np.array([TYPES.index(impact_type) for impact_type in impact_types])
+        day_index = np.array([(day - start).days for day in row_days])
+        np.add.at(amounts, (type_index, day_index), row_amounts)
+        np.add.at(actions, (type_index, day_index), row_actions)
+    return amounts, actions
+
+
+@cached_computation('community:impact_totals', ttl=600)
+def community_totals(impact_type, start, end):
+    """Sorted per-member totals of `impact_type` between two ISO dates, inclusive"""
+    rows = ImpactDailyRollup.objects.filter(
+        impact_type=impact_type, day__range=(start, end)
+    ).values_list('user_id', 'amount')
+    users = np.fromiter((user_id for user_id, _ in rows), dtype=np.int64)
+    amounts = np.fromiter((amount for _, amount in rows), dtype=np.float64, count=len(users))
+    if not len(users):
+        return np.zeros(0)
+    _, member = np.unique(users, return_inverse=True)
+    return np.sort(np.bincount(member, weights=amounts))
+
+
+def _round(values):
+    return np.round(values, 3).tolist()
+
+
+def impact_report(user_id, days=90, window=7, impact_type='carbon_saved', today=None):
+    """Series, moving averages, breakdown and community standing for a member's last `days` days"""
+    end = today or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    amounts, actions = _matrix(user_id, start, days)
+    averages = moving_average(amounts, window)
+    type_totals = amounts.sum(axis=1)
+    type_actions = actions.sum(axis=1)
+    logged = np.flatnonzero(type_actions)
+
+    totals = community_totals(impact_type, start.isoformat(), end.isoformat())
+    own = float(type_totals[TYPES.index(impact_type)])
+    standing = {
+        'impact_type': impact_type,
+        'unit': CANONICAL_UNITS[impact_type],
+        'total': round(own, 3),
+        'members': len(totals),
+        # Share of members who logged this type with a total no higher than yours
+        'percentile': round(100 * np.searchsorted(totals, own, side='right') / len(totals), 1) if len(totals) else None,
+        'community': dict(zip(
+            (f'p{p}' for p in PERCENTILES), _round(np.percentile(totals, PERCENTILES)) if len(totals) else [None] * 4
+        )),
+    }
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': [(start + timedelta(days=offset)).isoformat() for offset in range(days)],
+        'actions': actions.sum(axis=0).tolist(),
+        'series': {
+            TYPES[i]: {
+                'unit': CANONICAL_UNITS[TYPES[i]],
+                'daily': _round(amounts[i]),
+                'moving_average': _round(averages[i]),
+            }
+            for i in logged
+        },
+        'breakdown': [
+            {
+                'impact_type': TYPES[i],
+                'label': LABELS[TYPES[i]],
+                'unit': CANONICAL_UNITS[TYPES[i]],
+                'total': round(float(type_totals[i]), 3),
+                'actions': int(type_actions[i]),
+            }
+            for i in logged[np.argsort(-type_totals[logged], kind='stable')]
+        ],
+        'percentiles': standing,
+    }
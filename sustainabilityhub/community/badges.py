@@ -0,0 +1,197 @@
+"""
+Badge rules: SustainabilityBadge.criteria compiled into set-based queries.
+
+Criteria is a JSON object; a member earns the badge when every rule in it
+holds:
+
+    {
+        "impact_total": 100,        # canonical units (see community.rollup)
+        "impact_actions": 10,       # impact records logged
+        "impact_type": "carbon_saved",  # limits the three impact rules
+        "streak_days": 7,           # consecutive days with impact logged
+        "challenges_completed": 3,
+        "posts": 20,
+        "post_type": "tip",         # limits "posts"
+    }
+
+Each threshold becomes a grouped query (GROUP BY user HAVING ...), and
+the badge's query selects the members matching all of them who do not hold
+the badge yet. Streaks are found in one ordered pass over the daily rollup
+of the remaining candidates. Awards are inserted in batches with
+bulk_create(ignore_conflicts=True), so concurrent passes cannot award a
+badge twice.
+
+award() runs for every member (the award_badges command) or only for the
+members given. Signals queue check_badges for the members an event touched,
+and only badges whose criteria read that kind of event are evaluated.
+"""
+import logging
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from sustainabilityhub.cache import cached_table
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Criteria key -> kind of event that can change it
+RULES = {
+    'impact_total': 'impact',
+    'impact_actions': 'impact',
+    'streak_days': 'impact',
+    'challenges_completed': 'challenge',
+    'posts': 'post',
+}
+FILTERS = {'impact_type': 'impact', 'post_type': 'post'}
+
+
+class Rule:
+    """Compiled criteria of one badge"""
+
+    def __init__(self, badge):
+        criteria = badge.criteria
+        if not isinstance(criteria, dict) or not set(criteria) & set(RULES):
+            raise ValueError(f'Badge {badge.pk} has no rules in its criteria')
+        unknown = set(criteria) - set(RULES) - set(FILTERS)
+        if unknown:
+            raise ValueError(f'Badge {badge.pk} has unknown criteria {sorted(unknown)}')
+        for key in RULES:
+            if key in criteria and not isinstance(criteria[key], (int, float)):
+                raise ValueError(f'Badge {badge.pk} needs a number for {key!r}')
+        self.badge = badge
+        self.criteria = criteria
+        self.kinds = {RULES[key] for key in criteria if key in RULES}
+
+    def _grouped(self, user_ids):
+        """Queries of user ids meeting each threshold"""
+        from .models import ChallengeParticipation, Post
+        from .sustainability_features import ImpactDailyRollup
+
+        criteria = self.criteria
+        queries = []
+        if 'impact_total' in criteria or 'impact_actions' in criteria:
+            rows = ImpactDailyRollup.objects.all()
+            if 'impact_type' in criteria:
+                rows = rows.filter(impact_type=criteria['impact_type'])
+            having = {}
+            if 'impact_total' in criteria:
+                having['total__gte'] = criteria['impact_total']
+            if 'impact_actions' in criteria:
+                having['count__gte'] = criteria['impact_actions']
+            queries.append(self._having(rows, 'user_id', user_ids, having, total=Sum('amount'), count=Sum('actions')))
+        if 'challenges_completed' in criteria:
+            rows = ChallengeParticipation.objects.filter(completed=True)
+            queries.append(self._having(
+                rows, 'user_id', user_ids, {'count__gte': criteria['challenges_completed']}, count=Count('id')
+            ))
+        if 'posts' in criteria:
+            rows = Post.objects.all()
+            if 'post_type' in criteria:
+                rows = rows.filter(post_type=criteria['post_type'])
+            queries.append(self._having(rows, 'author_id', user_ids, {'count__gte': criteria['posts']}, count=Count('id')))
+        return queries
+
+    @staticmethod
+    def _having(rows, column, user_ids, having, **aggregates):
+        if user_ids is not None:
+            rows = rows.filter(**{f'{column}__in': user_ids})
+        return rows.values(column).annotate(**aggregates).filter(**having).values(column)
+
+    def candidates(self, user_ids=None):
+        """Members meeting every grouped threshold who do not hold the badge"""
+        users = get_user_model().objects.filter(is_active=True).exclude(badges__badge=self.badge)
+        if user_ids is not None:
+            users = users.filter(pk__in=user_ids)
+        for query in self._grouped(user_ids):
+            users = users.filter(pk__in=query)
+        return users.values_list('pk', flat=True)
+
+    def _streaks(self, user_ids):
+        """The members of `user_ids` with a run of streak_days consecutive active days"""
+        from .sustainability_features import ImpactDailyRollup
+
+        needed = self.criteria['streak_days']
+        rows = ImpactDailyRollup.objects.filter(user_id__in=user_ids, actions__gt=0)
+        if 'impact_type' in self.criteria:
+            rows = rows.filter(impact_type=self.criteria['impact_type'])
+        found = set()
+        last_user = last_day = None
+        run = 0
+        for user_id, day in rows.values_list('user_id', 'day').distinct().order_by('user_id', 'day').iterator():
+            if user_id in found:
+                continue
+            run = run + 1 if user_id == last_user and day - last_day == timedelta(days=1) else 1
+            last_user, last_day = user_id, day
+            if run >= needed:
+                found.add(user_id)
+        return found
+
+    def eligible(self, user_ids=None):
+        """Ids of the members who would be awarded the badge now"""
+        candidates = self.candidates(user_ids)
+        if 'streak_days' not in self.criteria:
+            return candidates
+        eligible = set()
+        candidates = list(candidates.iterator())
+        for start in range(0, len(candidates), BATCH_SIZE):
+            eligible |= self._streaks(candidates[start:start + BATCH_SIZE])
+        return sorted(eligible)
+
+    def award(self, user_ids=None, dry_run=False):
+        """Award the badge to eligible members; returns how many there were"""
+        from .sustainability_features import UserBadge
+
+        eligible = self.eligible(user_ids)
+        if dry_run:
+            return len(eligible) if isinstance(eligible, list) else eligible.count()
+        if not isinstance(eligible, list):
+            eligible = list(eligible.iterator())
+        for start in range(0, len(eligible), BATCH_SIZE):
+            UserBadge.objects.bulk_create(
+                [UserBadge(user_id=user_id, badge=self.badge) for user_id in eligible[start:start + BATCH_SIZE]],
+                ignore_conflicts=True,
+            )
+        return len(eligible)
+
+
+def rules(kind=None):
+    """Compiled rules of every badge, or of those reading events of `kind`"""
+    from .sustainability_features import SustainabilityBadge
+
+    compiled = []
+    for badge in cached_table(SustainabilityBadge):
+        try:
+            rule = Rule(badge)
+        except ValueError as error:
+            logger.warning('Skipping badge: %s', error)
+            continue
+        if kind is None or kind in rule.kinds:
+            compiled.append(rule)
+    return compiled
+
+
+def watches(kind):
+    """Whether any badge reads events of `kind`"""
+    return bool(rules(kind))
+
+
+def award(user_ids=None, kinds=None, badges=None, dry_run=False):
+    """
+    Award every badge whose criteria are met; returns {badge: members awarded}.
+
+    user_ids limits the pass to those members, kinds to badges reading those
+    kinds of events and badges to those badge ids. With dry_run nothing is
+    written and the counts are of members who would be awarded.
+    """
+    awarded = {}
+    for rule in rules():
+        if kinds is not None and not rule.kinds & set(kinds):
+            continue
+        if badges is not None and rule.badge.pk not in badges:
+            continue
+        with transaction.atomic():
+            awarded[rule.badge] = rule.award(user_ids, dry_run)
+    return awarded
@@ -0,0 +1,152 @@
+"""
+Challenge participation: joining, completing and progress.
+
+A challenge Post carries participants_count, completions_count and
+impact_achieved_total. Signals on ChallengeParticipation move them with F()
+updates whenever a participation is created, completed, edited or deleted,
+so concurrent joins cannot lose a count and no other column of the Post is
+rewritten. Only completed participations count towards the impact total.
+
+progress() reads those columns and the top finishers, ranked by the
+impact they reported. Those come from a partial index over the challenge's
+completed participations rather than a scan of ChallengeParticipation.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ChallengeParticipation, Post
+
+TOP_FINISHERS = 10
+
+
+def _state(participation):
+    impact = (participation.impact_achieved or 0) if participation.completed else 0
+    return participation.challenge_post_id, participation.completed, impact
+
+
+def _move(changes):
+    """Apply {post_id: [joined, completed, impact]} to the challenge counters"""
+    for post_id, (joined, completed, impact) in changes.items():
+        deltas = {
+            'participants_count': joined,
+            'completions_count': completed,
+            'impact_achieved_total': impact,
+        }
+        deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if post_id is not None and deltas:
+            Post.objects.filter(pk=post_id).update(**deltas)
+
+
+def _apply(before, after):
+    changes = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        post_id, completed, impact = state
+        totals = changes.setdefault(post_id, [0, 0, 0])
+        totals[0] += sign
+        totals[1] += sign * completed
+        totals[2] += sign * Decimal(impact)
+    _move(changes)
+
+
+def remember(sender, instance, **kwargs):
+    """Keep the loaded state so a save moves the counters by the difference"""
+    if instance.pk is not None:
+        instance._challenge_state = _state(instance)
+
+
+def count(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, '_challenge_state', None)
+    after = _state(instance)
+    if before != after:
+        _apply(before, after)
+        instance._challenge_state = after
+
+
+def uncount(sender, instance, **kwargs):
+    _apply(getattr(instance, '_challenge_state', None) or _state(instance), None)
+
+
+def parse_impact(value):
+    """impact_achieved from request data; None when not given, ValueError when invalid"""
+    if value in (None, ''):
+        return None
+    try:
+        impact = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError('impact_achieved must be a number')
+    if not impact.is_finite():
+        raise ValueError('impact_achieved must be a finite number')
+    if impact < 0:
+        raise ValueError('impact_achieved cannot be negative')
+    # Must fit the column's max_digits once rounded to its decimal places
+    field = ChallengeParticipation._meta.get_field('impact_achieved')
+    limit = 10 ** (field.max_digits - field.decimal_places)
+    if impact < limit:
+        impact = impact.quantize(Decimal(1).scaleb(-field.decimal_places))
+    if impact >= limit:
+        raise ValueError(f'impact_achieved must be less than {limit}')
+    return impact
+
+
+def participants(post_id):
+    return Post.objects.values_list('participants_count', flat=True).get(pk=post_id)
+
+
+def join(user, post):
+    """Join a challenge; returns (created, participants)"""
+    _, created = ChallengeParticipation.objects.get_or_create(user=user, challenge_post=post)
+    return created, participants(post.pk)
+
+
+def complete(user, post, impact_achieved=None):
+    """Mark a member's participation completed; raises ChallengeParticipation.DoesNotExist if they never joined"""
+    with transaction.atomic():
+        participation = ChallengeParticipation.objects.select_for_update().get(user=user, challenge_post=post)
+        participation.completed = True
+        participation.impact_achieved = impact_achieved
+        if participation.completed_at is None:
+            participation.completed_at = timezone.now()
+        participation.save(update_fields=['completed', 'impact_achieved', 'completed_at'])
+    return participation
+
+
+def progress(post, user=None, limit=TOP_FINISHERS):
+    """Counts, impact and top finishers of a challenge, plus `user`'s own participation"""
+    post = Post.objects.only(
+        'participants_count', 'completions_count', 'impact_achieved_total', 'challenge_duration', 'created_at'
+    ).get(pk=post.pk)
+    finishers = ChallengeParticipation.objects.filter(
+        challenge_post=post, completed=True, impact_achieved__isnull=False
+    ).order_by('-impact_achieved', 'completed_at').values(
+        'user_id', 'user__username', 'impact_achieved', 'completed_at'
+    )[:limit]
+
+    data = {
+        'challenge': post.pk,
+        'duration_days': post.challenge_duration,
+        'participants': post.participants_count,
+        'completed': post.completions_count,
+        'completion_rate': round(post.completions_count / post.participants_count, 3) if post.participants_count else 0,
+        'impact_achieved_total': float(post.impact_achieved_total),
+        'top_finishers': [
+            {
+                'user_id': row['user_id'],
+                'username': row['user__username'],
+                'impact_achieved': float(row['impact_achieved']),
+                'completed_at': row['completed_at'],
+            }
+            for row in finishers
+        ],
+    }
+    if user is not None and user.is_authenticated:
+        own = ChallengeParticipation.objects.filter(challenge_post=post, user=user).values('completed').first()
+        data['joined'] = own is not None
+        data['completed_by_you'] = bool(own and own['completed'])
+    return data
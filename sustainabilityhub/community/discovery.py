@@ -0,0 +1,68 @@
+"""
+Discovery: ranked recent posts from authors the viewer does not follow.
+
+A pool of the DISCOVERY_POOL_SIZE best scoring posts of the last
+DISCOVERY_WINDOW_HOURS is computed every DISCOVERY_REFRESH seconds and
+shared through the cache. Posts are scored like trending items: their
+engagement (the post itself, its reactions and twice its comments) decayed
+by age with TRENDING_GRAVITY.
+
+A reader walks the ranked pool and skips the authors in their follow set,
+so discovery costs the same however many posts exist or accounts the
+viewer follows. It ends where the pool does.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from sustainabilityhub.computations import get_or_compute
+from trending.engine import decayed_score
+
+POOL_KEY = 'community:discovery_pool'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def compute_pool(now=None):
+    """[(post_id, author_id)] of the best scoring recent posts, best first"""
+    from .models import Post
+
+    now = now or timezone.now()
+    gravity = _setting('TRENDING_GRAVITY', 1.8)
+    rows = Post.objects.filter(
+        created_at__gte=now - timedelta(hours=_setting('DISCOVERY_WINDOW_HOURS', 7 * 24))
+    ).annotate(comment_total=Count('comments')).values_list(
+        'id', 'author_id', 'reaction_count', 'comment_total', 'created_at'
+    )
+    scored = (
+        (decayed_score(1 + reactions + 2 * comments, (now - created_at).total_seconds() / 3600, gravity), post_id, author_id)
+        for post_id, author_id, reactions, comments, created_at in rows.iterator()
+    )
+    return [(post_id, author_id) for _, post_id, author_id in heapq.nlargest(_setting('DISCOVERY_POOL_SIZE', 1000), scored)]
+
+
+def pool():
+    return get_or_compute(POOL_KEY, compute_pool, _setting('DISCOVERY_REFRESH', 300))
+
+
+def ranked_ids(exclude_authors=()):
+    """Ids of the pooled posts not written by `exclude_authors`, best first"""
+    exclude_authors = set(exclude_authors)
+    return [post_id for post_id, author_id in pool() if author_id not in exclude_authors]
+
+
+def hidden_authors(user):
+    """The viewer and everyone they follow through either follow relation"""
+    if not user.is_authenticated:
+        return set()
+    # profiles.Follow is canonical (timelines, counters, typeahead), but the
+    # community follow buttons still write community.Follow
+    following = set(user.following.values_list('following_id', flat=True))
+    following |= set(user.community_following.values_list('following_id', flat=True))
+    following.add(user.pk)
+    return following
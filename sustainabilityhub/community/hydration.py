@@ -0,0 +1,105 @@
+"""
+Batch loading for the community serializers.
+
+PostSerializer and CommentSerializer read reactions, comment counts, linked objects,
+hashtag totals and reply trees from attributes set here, so serializing a
+page costs a fixed number of queries however many posts or comments it
+holds.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, prefetch_related_objects
+
+from sustainabilityhub.threads import subtree_filter
+
+from .models import Comment, HashTag
+
+POST_LOOKUPS = [
+    'reactions__user',
+    'comments__author',
+    'comments__reactions__user',
+    'hashtags',
+    'content_object',
+]
+
+COMMENT_LOOKUPS = [
+    'reactions__user',
+]
+
+
+def _viewer_reaction(reactions, user):
+    if user is None or not user.is_authenticated:
+        return None
+    for reaction in reactions:
+        if reaction.user_id == user.pk:
+            return reaction.reaction_type
+    return None
+
+
+def _attach_replies(comments):
+    """Link each comment to its children using one flat list of a post's comments"""
+    children = defaultdict(list)
+    for comment in comments:
+        if comment.parent_id is not None:
+            children[comment.parent_id].append(comment)
+    for comment in comments:
+        comment.hydrated_replies = children.get(comment.pk, [])
+
+
+def _hydrate_comment_list(comments, user):
+    for comment in comments:
+        comment.hydrated_user_reaction = _viewer_reaction(comment.reactions.all(), user)
+        comment.is_hydrated = True
+
+
+def hydrate_posts(posts, user=None):
+    """Load everything PostSerializer renders for a page of posts"""
+    posts = [post for post in posts if not getattr(post, 'is_hydrated', False)]
+    if not posts:
+        return
+    prefetch_related_objects(posts, *POST_LOOKUPS)
+
+    for post in posts:
+        comments = list(post.comments.all())
+        post.hydrated_total_comments = len(comments)
+        post.hydrated_user_reaction = _viewer_reaction(post.reactions.all(), user)
+        _attach_replies(comments)
+        _hydrate_comment_list(comments, user)
+        post.is_hydrated = True
+
+    hashtags = [hashtag for post in posts for hashtag in post.hashtags.all()]
+    if hashtags:
+        counts = dict(
+            HashTag.posts.through.objects.filter(hashtag_id__in={hashtag.pk for hashtag in hashtags})
+            .values_list('hashtag_id').annotate(total=Count('id'))
+        )
+        for hashtag in hashtags:
+            hashtag.hydrated_post_count = counts.get(hashtag.pk, 0)
+
+
+def hydrate_comments(comments, user=None):
+    """Load reactions and full reply trees for a page of comments"""
+    comments = [comment for comment in comments if not getattr(comment, 'is_hydrated', False)]
+    if not comments:
+        return
+    prefetch_related_objects(comments, *COMMENT_LOOKUPS)
+
+    # Replies can nest to any depth; each comment's subtree is one path range
+    by_pk = {comment.pk: comment for comment in comments}
+    thread = list(
+        Comment.objects.filter(subtree_filter(comments))
+        .exclude(pk__in=by_pk).select_related('author')
+    )
+    prefetch_related_objects(thread, *COMMENT_LOOKUPS)
+
+    everything = comments + thread
+    _attach_replies(everything)
+    _hydrate_comment_list(everything, user)
+
+
+def hydrate_thread(comments, user=None):
+    """Hydrate a thread loaded by threads.load_thread without fetching further replies"""
+    comments = list(comments)
+    prefetch_related_objects(comments, *COMMENT_LOOKUPS)
+    _attach_replies(comments)
+    _hydrate_comment_list(comments, user)
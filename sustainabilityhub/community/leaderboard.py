@@ -0,0 +1,286 @@
+"""
+Impact leaderboards kept as running totals.
+
+A board ranks members by the impact they logged in one window: this week,
+this month or all time. There is a board for all impact, one per
+impact_type and one per LocalImpactGroup. The 'actions' board counts rows
+instead of summing amounts. Amounts are in canonical units (see
+community.rollup). ImpactTracker signals add each row to the boards it
+belongs to, so reading the top of a board or a member's rank never
+aggregates the impact table.
+
+A member whose total drops back to zero leaves the board. Boards are only
+updated once they exist. A missing board is built from the daily
+rollup on first read and expires after LEADERBOARD_TTL, which bounds any
+drift from an update that raced with a build. Past weeks and months simply
+stop being read and expire. Group boards are dropped and rebuilt when the
+group's members change.
+
+The store is picked by LEADERBOARD_BACKEND: Redis sorted sets in
+production, an in-process stand-in for development and tests. Both look up
+a member's rank in O(log n).
+"""
+import bisect
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import rollup
+
+WINDOWS = ('week', 'month', 'all')
+# Totals closer to zero than this are left over from removed rows (amounts have two decimals)
+EMPTY = 0.001
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RedisLeaderboardStore:
+    """Boards as Redis sorted sets of user id scored by total"""
+    # Marks a built board with no entries yet; it sorts below everyone
+    SENTINEL = '-'
+    # Checked and applied in one step: a ZINCRBY on a board that just
+    # expired would create a board with no sentinel and no TTL
+    INCREMENT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #ARGV, 2 do
+    redis.call('zincrby', KEYS[1], ARGV[i + 1], ARGV[i])
+end
+redis.call('zremrangebyscore', KEYS[1], -tonumber(ARGV[1]), ARGV[1])
+return 1
+"""
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(_setting('LEADERBOARD_REDIS_URL', 'redis://127.0.0.1:6379/1'))
+        self.ttl = _setting('LEADERBOARD_TTL', 24 * 60 * 60)
+        self._increment = self.client.register_script(self.INCREMENT)
+
+    def exists(self, key):
+        return bool(self.client.exists(key))
+
+    def increment(self, changes):
+        """Apply {key: {user_id: delta}} to the boards that exist"""
+        pipe = self.client.pipeline(transaction=False)
+        for key, deltas in changes.items():
+            args = [EMPTY]
+            for user_id, delta in deltas.items():
+                args += [user_id, delta]
+            self._increment(keys=[key], args=args, client=pipe)
+        pipe.execute()
+
+    def replace(self, key, scores):
+        members = {str(user_id): float(score) for user_id, score in scores.items()}
+        members[self.SENTINEL] = float('-inf')
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.zadd(key, members)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def top(self, key, limit):
+        rows = self.client.zrevrange(key, 0, limit, withscores=True)
+        return [(int(member), score) for member, score in rows if member != self.SENTINEL.encode()][:limit]
+
+    def position(self, key, user_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, user_id)
+        pipe.zscore(key, user_id)
+        rank, score = pipe.execute()
+        return None if rank is None else (rank + 1, score)
+
+    def discard(self, keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+class LocMemLeaderboardStore:
+    """Per-process stand-in for RedisLeaderboardStore"""
+
+    def __init__(self):
+        self.ttl = _setting('LEADERBOARD_TTL', 24 * 60 * 60)
+        # key -> [expires_at, {user_id: score}, sorted [(-score, user_id)]]
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        board = self._boards.get(key)
+        if board is not None and board[0] < time.monotonic():
+            del self._boards[key]
+            return None
+        return board
+
+    def exists(self, key):
+        with self._lock:
+            return self._live(key) is not None
+
+    def increment(self, changes):
+        with self._lock:
+            for key, deltas in changes.items():
+                board = self._live(key)
+                if board is None:
+                    continue
+                _, scores, ranking = board
+                for user_id, delta in deltas.items():
+                    old = scores.get(user_id)
+                    if old is not None:
+                        del ranking[bisect.bisect_left(ranking, (-old, user_id))]
+                    score = (old or 0) + delta
+                    if abs(score) < EMPTY:
+                        scores.pop(user_id, None)
+                    else:
+                        scores[user_id] = score
+                        bisect.insort(ranking, (-score, user_id))
+
+    def replace(self, key, scores):
+        scores = {user_id: float(score) for user_id, score in scores.items()}
+        with self._lock:
+            self._boards[key] = [
+                time.monotonic() + self.ttl, scores, sorted((-score, user_id) for user_id, score in scores.items())
+            ]
+
+    def top(self, key, limit):
+        with self._lock:
+            board = self._live(key)
+            return [(user_id, -score) for score, user_id in board[2][:limit]] if board else []
+
+    def position(self, key, user_id):
+        with self._lock:
+            board = self._live(key)
+            if board is None or user_id not in board[1]:
+                return None
+            score = board[1][user_id]
+            return bisect.bisect_left(board[2], (-score, user_id)) + 1, score
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._boards.pop(key, None)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(_setting('LEADERBOARD_BACKEND', 'community.leaderboard.LocMemLeaderboardStore'))()
+    return _store
+
+
+def _period(window, when):
+    """Label and first day of the week or month containing `when`"""
+    if window == 'all':
+        return 'all', None
+    day = timezone.localtime(when).date()
+    if window == 'week':
+        start = day - timedelta(days=day.weekday())
+        label = 'w{}-{:02d}'.format(*start.isocalendar()[:2])
+    else:
+        start = day.replace(day=1)
+        label = f'm{start:%Y-%m}'
+    return label, start
+
+
+def _scope(impact_type=None, group_id=None):
+    if group_id is not None:
+        return f'group:{group_id}'
+    if impact_type:
+        return f'type:{impact_type}'
+    return 'all'
+
+
+def _key(window, when, scope):
+    return f'leaderboard:{_period(window, when)[0]}:{scope}'
+
+
+def _build(key, window, when, scope):
+    from .sustainability_features import ImpactDailyRollup
+
+    rows = ImpactDailyRollup.objects.all()
+    start = _period(window, when)[1]
+    if start is not None:
+        rows = rows.filter(day__gte=start)
+    kind, _, value = scope.partition(':')
+    if kind == 'type':
+        rows = rows.filter(impact_type=value)
+    elif kind == 'group':
+        rows = rows.filter(user__local_groups=value)
+    total = Sum('actions') if kind == 'actions' else Sum('amount')
+    totals = rows.values('user_id').annotate(total=total).values_list('user_id', 'total')
+    get_store().replace(key, {user_id: score for user_id, score in totals if abs(score) >= EMPTY})
+
+
+def _board(window, scope):
+    """Key of the current board, built first if it is missing"""
+    if window not in WINDOWS:
+        raise ValueError(f'Unknown leaderboard window {window!r}')
+    now = timezone.now()
+    key = _key(window, now, scope)
+    if not get_store().exists(key):
+        _build(key, window, now, scope)
+    return key
+
+
+def top(window='all', impact_type=None, group_id=None, limit=10):
+    """[{'user_id', 'username', 'total_impact', 'rank'}] for the leaders of a board"""
+    rows = get_store().top(_board(window, _scope(impact_type, group_id)), limit)
+    users = get_user_model().objects.in_bulk([user_id for user_id, _ in rows])
+    return [
+        {'user_id': user_id, 'username': users[user_id].username, 'total_impact': score, 'rank': rank}
+        for rank, (user_id, score) in enumerate(rows, 1) if user_id in users
+    ]
+
+
+def position(user_id, window='all', impact_type=None, group_id=None):
+    """(rank, total) of a member on a board, or None if they logged nothing in it"""
+    return get_store().position(_board(window, _scope(impact_type, group_id)), user_id)
+
+
+def actions(user_id, window='all'):
+    """Number of impact rows a member logged in the window"""
+    found = get_store().position(_board(window, 'actions'), user_id)
+    return int(found[1]) if found else 0
+
+
+def _scopes(impact_type, group_ids):
+    return ['all', f'type:{impact_type}'] + [f'group:{group_id}' for group_id in group_ids]
+
+
+def apply(rows, sign):
+    """Add (sign=1) or remove (sign=-1) rows of (user_id, impact_type, amount, unit, date_recorded)"""
+    from .sustainability_features import LocalImpactGroup
+
+    rows = list(rows)
+    memberships = {}
+    for group_id, user_id in LocalImpactGroup.members.through.objects.filter(
+        user_id__in={row[0] for row in rows}
+    ).values_list('localimpactgroup_id', 'user_id'):
+        memberships.setdefault(user_id, []).append(group_id)
+
+    changes = {}
+    for user_id, impact_type, amount, unit, when in rows:
+        amount = rollup.normalize(impact_type, amount, unit) or 0
+        for window in WINDOWS:
+            for scope in _scopes(impact_type, memberships.get(user_id, [])):
+                deltas = changes.setdefault(_key(window, when, scope), {})
+                deltas[user_id] = deltas.get(user_id, 0) + sign * amount
+            deltas = changes.setdefault(_key(window, when, 'actions'), {})
+            deltas[user_id] = deltas.get(user_id, 0) + sign
+    if changes:
+        get_store().increment(changes)
+
+
+def forget_groups(group_ids):
+    """Drop the current boards of groups whose members changed; they are rebuilt on next read"""
+    now = timezone.now()
+    get_store().discard([_key(window, now, f'group:{group_id}') for window in WINDOWS for group_id in group_ids])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from community import badges
+
+
+class Command(BaseCommand):
+    help = 'Awards every badge whose criteria members now meet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--badge', type=int, action='append', help='Only evaluate this badge id (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report how many members would be awarded')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        awarded = badges.award(badges=options['badge'], dry_run=dry_run)
+        verb = 'Would award' if dry_run else 'Awarded'
+        for badge, count in awarded.items():
+            self.stdout.write(f'{badge}: {count}')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] {verb} {sum(awarded.values())} badges across {len(awarded)} badge rules')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from community import rollup
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily impact rollup for recent days (run nightly) or for all time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Days to recompute, today included')
+        parser.add_argument('--all', action='store_true', help='Rebuild the whole rollup from every impact record')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            rows = rollup.rebuild()
+        else:
+            rows = rollup.rebuild_recent(max(options['days'], 1))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Wrote {rows} daily impact rollup rows')
+        )
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:41
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_reaction_tallies(apps, schema_editor):
+    for reaction_model, target_model, target_field in [
+        ('PostReaction', 'Post', 'post'),
+        ('CommentReaction', 'Comment', 'comment'),
+    ]:
+        Reaction = apps.get_model('community', reaction_model)
+        Target = apps.get_model('community', target_model)
+        tallies = {}
+        rows = Reaction.objects.values_list(f'{target_field}_id', 'reaction_type').annotate(total=Count('id'))
+        for target_id, reaction_type, total in rows:
+            counts = tallies.setdefault(target_id, {'reaction_count': 0})
+            counts['reaction_count'] += total
+            if f'{reaction_type}_count' in {field.name for field in Target._meta.fields}:
+                counts[f'{reaction_type}_count'] = total
+        for target_id, counts in tallies.items():
+            Target.objects.filter(pk=target_id).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0003_alter_challengeparticipation_challenge_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='laugh_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='love_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reaction_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='celebrate_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='inspire_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='love_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reaction_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='support_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reaction_tallies, migrations.RunPython.noop),
+    ]
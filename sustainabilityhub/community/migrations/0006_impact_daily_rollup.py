@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+# Unit conversions as of this migration (community.rollup may change later)
+CANONICAL_UNITS = {
+    'carbon_saved': 'kg',
+    'waste_reduced': 'kg',
+    'energy_saved': 'kWh',
+    'water_saved': 'L',
+    'trees_planted': 'trees',
+    'plastic_avoided': 'kg',
+}
+MASS = {'kg': 1, 'kgs': 1, 'g': 0.001, 't': 1000, 'tonne': 1000, 'tonnes': 1000, 'lb': 0.45359237, 'lbs': 0.45359237}
+UNIT_FACTORS = {
+    'kg': MASS,
+    'kWh': {'kwh': 1, 'wh': 0.001, 'mwh': 1000},
+    'L': {'l': 1, 'litre': 1, 'litres': 1, 'liter': 1, 'liters': 1, 'ml': 0.001, 'm3': 1000,
+          'gal': 3.785411784, 'gallon': 3.785411784, 'gallons': 3.785411784, 'kg': 1},
+}
+
+
+def normalize(impact_type, amount, unit):
+    canonical = CANONICAL_UNITS.get(impact_type)
+    if canonical == 'trees':
+        return float(amount)
+    factor = UNIT_FACTORS.get(canonical, {}).get((unit or '').strip().lower().replace(' ', ''))
+    return None if factor is None else float(amount) * factor
+
+
+def backfill_impact_rollup(apps, schema_editor):
+    ImpactTracker = apps.get_model('community', 'ImpactTracker')
+    ImpactDailyRollup = apps.get_model('community', 'ImpactDailyRollup')
+    totals = {}
+    rows = ImpactTracker.objects.values_list('user_id', 'impact_type', 'amount', 'unit', 'date_recorded')
+    for user_id, impact_type, amount, unit, when in rows.iterator():
+        total = totals.setdefault((user_id, impact_type, timezone.localtime(when).date()), [0.0, 0])
+        total[0] += normalize(impact_type, amount, unit) or 0
+        total[1] += 1
+    ImpactDailyRollup.objects.bulk_create([
+        ImpactDailyRollup(user_id=user_id, impact_type=impact_type, day=day, amount=amount, actions=actions)
+        for (user_id, impact_type, day), (amount, actions) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('community', '0005_comment_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpactDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('impact_type', models.CharField(choices=[('carbon_saved', 'Carbon Footprint Reduced'), ('waste_reduced', 'Waste Reduced'), ('energy_saved', 'Energy Saved'), ('water_saved', 'Water Conserved'), ('trees_planted', 'Trees Planted'), ('plastic_avoided', 'Plastic Avoided')], max_length=50)),
+                ('day', models.DateField()),
+                ('amount', models.FloatField(default=0)),
+                ('actions', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='impact_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['impact_type', 'day'], name='community_i_impact__e699fb_idx'), models.Index(fields=['day'], name='community_i_day_fc2850_idx')],
+                'unique_together': {('user', 'impact_type', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_impact_rollup, migrations.RunPython.noop),
+    ]
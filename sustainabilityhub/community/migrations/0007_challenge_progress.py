@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_challenge_counters(apps, schema_editor):
+    Post = apps.get_model('community', 'Post')
+    ChallengeParticipation = apps.get_model('community', 'ChallengeParticipation')
+    ChallengeParticipation.objects.filter(completed=True, completed_at__isnull=True).update(completed_at=models.F('joined_at'))
+    totals = ChallengeParticipation.objects.filter(challenge_post__isnull=False).values('challenge_post').annotate(
+        joined=Count('id'),
+        finished=Count('id', filter=Q(completed=True)),
+        impact=Sum('impact_achieved', filter=Q(completed=True)),
+    )
+    # participants_count was a read-modify-write and may have drifted
+    Post.objects.filter(participants_count__gt=0).update(participants_count=0)
+    for row in totals:
+        Post.objects.filter(pk=row['challenge_post']).update(
+            participants_count=row['joined'],
+            completions_count=row['finished'],
+            impact_achieved_total=row['impact'] or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0006_impact_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challengeparticipation',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='completions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='impact_achieved_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='challengeparticipation',
+            index=models.Index(condition=models.Q(('completed', True), ('impact_achieved__isnull', False)), fields=['challenge_post', '-impact_achieved', 'completed_at'], name='community_challenge_top_idx'),
+        ),
+        migrations.RunPython(backfill_challenge_counters, migrations.RunPython.noop),
+    ]
@@ -2,9 +2,10 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from sustainabilityhub.reactions import ReactionTallyMixin
 
 
-class Post(models.Model):
+class Post(ReactionTallyMixin, models.Model):
     """Community feed posts"""
     POST_TYPES = [
         ('text', 'Text Post'),
@@ -38,7 +39,10 @@ class Post(models.Model):
     carbon_impact = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="CO2 saved in kg")
     location = models.CharField(max_length=200, blank=True, help_text="Location for local impact")
     challenge_duration = models.PositiveIntegerField(null=True, blank=True, help_text="Challenge duration in days")
+    # Challenge progress, kept in step with ChallengeParticipation by signals (see community.challenges)
     participants_count = models.PositiveIntegerField(default=0)
+    completions_count = models.PositiveIntegerField(default=0)
+    impact_achieved_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     impact_category = models.CharField(max_length=50, choices=[
         ('energy', 'Energy Saving'),
         ('waste', 'Waste Reduction'),
@@ -48,6 +52,14 @@ class Post(models.Model):
         ('biodiversity', 'Biodiversity Protection'),
     ], blank=True)
     
+    # Reaction tallies, kept in step with PostReaction by signals
+    reaction_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    love_count = models.IntegerField(default=0)
+    celebrate_count = models.IntegerField(default=0)
+    support_count = models.IntegerField(default=0)
+    inspire_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['-is_pinned', '-created_at']
         indexes = [
@@ -60,7 +72,7 @@ class Post(models.Model):
     
     @property
     def total_reactions(self):
-        return self.reactions.count()
+        return self.reaction_count
     
     @property
     def total_comments(self):
@@ -92,7 +104,7 @@ class PostReaction(models.Model):
         return f'{self.user.username} {self.get_reaction_type_display()} post {self.post.id}'
 
 
-class Comment(models.Model):
+class Comment(ReactionTallyMixin, models.Model):
     """Comments on community posts"""
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='community_comments')
@@ -102,10 +114,21 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_edited = models.BooleanField(default=False)
     
+    # Materialized thread position, written by signals (see sustainabilityhub.threads)
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    
+    # Reaction tallies, kept in step with CommentReaction by signals
+    reaction_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    love_count = models.IntegerField(default=0)
+    laugh_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['created_at']
         indexes = [
             models.Index(fields=['post', 'created_at']),
+            models.Index(fields=['post', 'path']),
         ]
     
     def __str__(self):
@@ -113,7 +136,7 @@ class Comment(models.Model):
     
     @property
     def total_reactions(self):
-        return self.reactions.count()
+        return self.reaction_count
 
 
 class CommentReaction(models.Model):
@@ -176,11 +199,20 @@ class ChallengeParticipation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     joined_at = models.DateTimeField(auto_now_add=True)
     completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
     completion_proof = models.ImageField(upload_to='challenge_proofs/', null=True, blank=True)
     impact_achieved = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
     class Meta:
         unique_together = ['user', 'challenge_post']
+        indexes = [
+            # Top finishers of a challenge, by the impact they reported
+            models.Index(
+                fields=['challenge_post', '-impact_achieved', 'completed_at'],
+                condition=models.Q(completed=True, impact_achieved__isnull=False),
+                name='community_challenge_top_idx',
+            ),
+        ]
     
     def __str__(self):
         return f'{self.user.username} - Challenge Participation'
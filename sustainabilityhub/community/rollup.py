@@ -0,0 +1,120 @@
+"""
+Daily impact rollup: one ImpactDailyRollup row per member, impact type and day.
+
+ImpactTracker.unit is free-form, so amounts are converted to one canonical
+unit per impact type before they are added up (kg, kWh, litres, trees).
+An amount whose unit cannot be converted still counts as an action but adds
+nothing to the total. Trees are counted whatever the unit says.
+
+Signals keep the rollup current as rows are saved and deleted. The
+rollup_impact command recomputes recent days nightly to correct any drift,
+and backfills everything with --all.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+CANONICAL_UNITS = {
+    'carbon_saved': 'kg',
+    'waste_reduced': 'kg',
+    'energy_saved': 'kWh',
+    'water_saved': 'L',
+    'trees_planted': 'trees',
+    'plastic_avoided': 'kg',
+}
+
+_MASS = {'kg': 1, 'kgs': 1, 'g': 0.001, 't': 1000, 'tonne': 1000, 'tonnes': 1000, 'lb': 0.45359237, 'lbs': 0.45359237}
+# Multiply by these to get the canonical unit
+UNIT_FACTORS = {
+    'kg': _MASS,
+    'kWh': {'kwh': 1, 'wh': 0.001, 'mwh': 1000},
+    # A kilogram of water is a litre
+    'L': {'l': 1, 'litre': 1, 'litres': 1, 'liter': 1, 'liters': 1, 'ml': 0.001, 'm3': 1000,
+          'gal': 3.785411784, 'gallon': 3.785411784, 'gallons': 3.785411784, 'kg': 1},
+}
+
+
+def normalize(impact_type, amount, unit):
+    """`amount` in the canonical unit of `impact_type`, or None if `unit` does not convert"""
+    canonical = CANONICAL_UNITS.get(impact_type)
+    if canonical == 'trees':
+        return float(amount)
+    factor = UNIT_FACTORS.get(canonical, {}).get((unit or '').strip().lower().replace(' ', ''))
+    return None if factor is None else float(amount) * factor
+
+
+def day_of(when):
+    return timezone.localtime(when).date()
+
+
+def _upsert(user_id, impact_type, day, amount, actions):
+    from .sustainability_features import ImpactDailyRollup
+
+    lookup = {'user_id': user_id, 'impact_type': impact_type, 'day': day}
+    changes = {'amount': F('amount') + amount, 'actions': F('actions') + actions}
+    if ImpactDailyRollup.objects.filter(**lookup).update(**changes) or actions < 0:
+        # A removal with no rollup row predates the backfill; the nightly run settles it
+        return
+    try:
+        with transaction.atomic():
+            ImpactDailyRollup.objects.create(amount=amount, actions=actions, **lookup)
+    except IntegrityError:
+        # Another request created the row first
+        ImpactDailyRollup.objects.filter(**lookup).update(**changes)
+
+
+def apply(rows, sign):
+    """Add (sign=1) or remove (sign=-1) rows of (user_id, impact_type, amount, unit, date_recorded)"""
+    totals = defaultdict(lambda: [0.0, 0])
+    for user_id, impact_type, amount, unit, when in rows:
+        total = totals[(user_id, impact_type, day_of(when))]
+        total[0] += sign * (normalize(impact_type, amount, unit) or 0)
+        total[1] += sign
+    for (user_id, impact_type, day), (amount, actions) in totals.items():
+        _upsert(user_id, impact_type, day, amount, actions)
+    if sign < 0:
+        from .sustainability_features import ImpactDailyRollup
+
+        # Days whose last row was removed
+        ImpactDailyRollup.objects.filter(
+            user_id__in={user_id for user_id, _, _ in totals}, day__in={day for _, _, day in totals}, actions__lte=0
+        ).delete()
+
+
+def rebuild(start=None, end=None):
+    """Recompute the rollup for days start..end (local dates, inclusive; None is open-ended)"""
+    from .sustainability_features import ImpactDailyRollup, ImpactTracker
+
+    records = ImpactTracker.objects.annotate(day=TruncDate('date_recorded', tzinfo=timezone.get_current_timezone()))
+    rollups = ImpactDailyRollup.objects.all()
+    if start is not None:
+        records, rollups = records.filter(day__gte=start), rollups.filter(day__gte=start)
+    if end is not None:
+        records, rollups = records.filter(day__lte=end), rollups.filter(day__lte=end)
+
+    totals = defaultdict(lambda: [0.0, 0])
+    grouped = records.values('user_id', 'impact_type', 'day', 'unit').annotate(
+        total=Sum('amount'), count=Count('id')
+    ).values_list('user_id', 'impact_type', 'day', 'unit', 'total', 'count')
+    for user_id, impact_type, day, unit, amount, count in grouped.iterator():
+        total = totals[(user_id, impact_type, day)]
+        total[0] += normalize(impact_type, amount, unit) or 0
+        total[1] += count
+
+    with transaction.atomic():
+        rollups.delete()
+        ImpactDailyRollup.objects.bulk_create([
+            ImpactDailyRollup(user_id=user_id, impact_type=impact_type, day=day, amount=amount, actions=actions)
+            for (user_id, impact_type, day), (amount, actions) in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def rebuild_recent(days):
+    """Recompute the last `days` days, today included"""
+    today = timezone.localdate()
+    return rebuild(today - timedelta(days=days - 1), today)
@@ -1,10 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from .models import Post, PostReaction, Comment, CommentReaction, Follow, HashTag
+from .hydration import hydrate_posts, hydrate_comments
 
 User = get_user_model()
 
 
+def _viewer(context):
+    request = context.get('request')
+    return request.user if request else None
+
+
 class UserBasicSerializer(serializers.ModelSerializer):
     """Basic user info for nested serialization"""
     avatar_url = serializers.SerializerMethodField()
@@ -22,11 +29,17 @@ class UserBasicSerializer(serializers.ModelSerializer):
 
 
 class HashTagSerializer(serializers.ModelSerializer):
-    post_count = serializers.ReadOnlyField()
+    post_count = serializers.SerializerMethodField()
     
     class Meta:
         model = HashTag
         fields = ['id', 'name', 'post_count']
+    
+    def get_post_count(self, obj):
+        # Set in bulk by hydrate_posts when the hashtag is rendered inside a post
+        if hasattr(obj, 'hydrated_post_count'):
+            return obj.hydrated_post_count
+        return obj.post_count
 
 
 class CommentReactionSerializer(serializers.ModelSerializer):
@@ -37,10 +50,20 @@ class CommentReactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'reaction_type', 'created_at']
 
 
+class CommentListSerializer(serializers.ListSerializer):
+    """Hydrates a whole page of comments before serializing it"""
+    
+    def to_representation(self, data):
+        comments = list(data.all() if hasattr(data, 'all') else data)
+        hydrate_comments(comments, _viewer(self.context))
+        return super().to_representation(comments)
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = UserBasicSerializer(read_only=True)
     reactions = CommentReactionSerializer(many=True, read_only=True)
-    total_reactions = serializers.ReadOnlyField()
+    total_reactions = serializers.IntegerField(source='reaction_count', read_only=True)
+    reaction_counts = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     replies = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
     
@@ -48,21 +71,20 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = [
             'id', 'author', 'content', 'parent', 'created_at', 'updated_at',
-            'is_edited', 'reactions', 'total_reactions', 'replies', 'user_reaction'
+            'is_edited', 'reactions', 'total_reactions', 'reaction_counts', 'replies', 'user_reaction'
         ]
         read_only_fields = ['author', 'created_at', 'updated_at', 'is_edited']
+        list_serializer_class = CommentListSerializer
+    
+    def to_representation(self, instance):
+        hydrate_comments([instance], _viewer(self.context))
+        return super().to_representation(instance)
     
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True, context=self.context).data
-        return []
+        return [self.to_representation(reply) for reply in obj.hydrated_replies]
     
     def get_user_reaction(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            reaction = obj.reactions.filter(user=request.user).first()
-            return reaction.reaction_type if reaction else None
-        return None
+        return obj.hydrated_user_reaction
 
 
 class PostReactionSerializer(serializers.ModelSerializer):
@@ -73,13 +95,23 @@ class PostReactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'reaction_type', 'created_at']
 
 
+class PostListSerializer(serializers.ListSerializer):
+    """Hydrates a whole page of posts before serializing it"""
+    
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        hydrate_posts(posts, _viewer(self.context))
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserBasicSerializer(read_only=True)
     reactions = PostReactionSerializer(many=True, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
     hashtags = HashTagSerializer(many=True, read_only=True)
-    total_reactions = serializers.ReadOnlyField()
-    total_comments = serializers.ReadOnlyField()
+    total_reactions = serializers.IntegerField(source='reaction_count', read_only=True)
+    reaction_counts = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    total_comments = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
     content_object_data = serializers.SerializerMethodField()
@@ -90,16 +122,20 @@ class PostSerializer(serializers.ModelSerializer):
             'id', 'author', 'content', 'post_type', 'image', 'image_url',
             'link_url', 'link_title', 'created_at', 'updated_at', 'is_pinned',
             'is_featured', 'reactions', 'comments', 'hashtags', 'total_reactions',
-            'total_comments', 'user_reaction', 'content_object_data'
+            'reaction_counts', 'total_comments', 'user_reaction', 'content_object_data'
         ]
         read_only_fields = ['author', 'created_at', 'updated_at']
+        list_serializer_class = PostListSerializer
+    
+    def to_representation(self, instance):
+        hydrate_posts([instance], _viewer(self.context))
+        return super().to_representation(instance)
+    
+    def get_total_comments(self, obj):
+        return obj.hydrated_total_comments
     
     def get_user_reaction(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            reaction = obj.reactions.filter(user=request.user).first()
-            return reaction.reaction_type if reaction else None
-        return None
+        return obj.hydrated_user_reaction
     
     def get_image_url(self, obj):
         if obj.image:
@@ -112,7 +148,7 @@ class PostSerializer(serializers.ModelSerializer):
         if obj.content_object:
             # Return basic info about linked object (project, event, etc.)
             return {
-                'type': obj.content_type.model,
+                'type': ContentType.objects.get_for_id(obj.content_type_id).model,
                 'id': obj.object_id,
                 'title': getattr(obj.content_object, 'title', str(obj.content_object))
             }
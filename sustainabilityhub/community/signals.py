@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from profiles.models import Follow
+from sustainabilityhub.cache import connect_cached_table
+from sustainabilityhub.reactions import connect_reaction_tallies
+from sustainabilityhub.threads import connect_comment_paths
+from .models import Post, Comment, PostReaction, CommentReaction, ChallengeParticipation
+from .sustainability_features import ImpactTracker, LocalImpactGroup, SustainabilityBadge
+from . import badges, challenges, leaderboard, rollup, tasks, timeline
+
+connect_reaction_tallies(PostReaction, 'post')
+connect_reaction_tallies(CommentReaction, 'comment')
+connect_comment_paths(Comment)
+connect_cached_table(SustainabilityBadge)
+post_init.connect(challenges.remember, sender=ChallengeParticipation)
+post_save.connect(challenges.count, sender=ChallengeParticipation)
+post_delete.connect(challenges.uncount, sender=ChallengeParticipation)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    """Push new posts to follower timelines once the row is committed"""
+    if created and not raw:
+        # The author sees their post straight away; followers get it from the task
+        transaction.on_commit(lambda: timeline.get_store().push([instance.author_id], instance.pk))
+        tasks.fan_out_post.delay(instance.pk, instance.author_id)
+        _check_badges(instance.author_id, 'post')
+
+
+def _check_badges(user_id, kind):
+    if badges.watches(kind):
+        tasks.check_badges.delay(user_id, kind)
+
+
+@receiver(post_save, sender=ChallengeParticipation)
+def check_challenge_badges(sender, instance, raw=False, **kwargs):
+    if instance.completed and not raw:
+        _check_badges(instance.user_id, 'challenge')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follower_timeline(sender, instance, **kwargs):
+    """The follower's timeline no longer matches who they follow; rebuild it on next read"""
+    timeline.invalidate(instance.follower_id)
+
+
+def _impact_row(instance):
+    return (instance.user_id, instance.impact_type, instance.amount, instance.unit, instance.date_recorded)
+
+
+@receiver(post_init, sender=ImpactTracker)
+def remember_impact(sender, instance, **kwargs):
+    """Keep the loaded row so an edit can be taken off the totals it was counted in"""
+    if instance.pk is not None:
+        instance._impact_row = _impact_row(instance)
+
+
+@receiver(post_save, sender=ImpactTracker)
+def count_impact(sender, instance, created, raw=False, **kwargs):
+    """Add new impact to the daily rollup and leaderboards; an edit (e.g. on verification) moves it"""
+    if raw:
+        return
+    before = None if created else getattr(instance, '_impact_row', None)
+    after = _impact_row(instance)
+    if before == after:
+        return
+    if before is not None:
+        rollup.apply([before], -1)
+        transaction.on_commit(lambda: leaderboard.apply([before], -1))
+    rollup.apply([after], 1)
+    transaction.on_commit(lambda: leaderboard.apply([after], 1))
+    instance._impact_row = after
+    _check_badges(instance.user_id, 'impact')
+
+
+@receiver(post_delete, sender=ImpactTracker)
+def uncount_impact(sender, instance, **kwargs):
+    row = getattr(instance, '_impact_row', None) or _impact_row(instance)
+    rollup.apply([row], -1)
+    transaction.on_commit(lambda: leaderboard.apply([row], -1))
+
+
+@receiver(m2m_changed, sender=LocalImpactGroup.members.through)
+def reset_group_leaderboards(sender, instance, action, reverse, pk_set, **kwargs):
+    """Group boards follow membership; rebuild them on next read"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        group_ids = [instance.pk]
+    elif action == 'pre_clear':
+        group_ids = list(instance.local_groups.values_list('pk', flat=True))
+    else:
+        group_ids = list(pk_set)
+    transaction.on_commit(lambda: leaderboard.forget_groups(group_ids))
@@ -6,18 +6,21 @@ from django.conf import settings
 from .models import Post
 
 
+IMPACT_TYPES = [
+    ('carbon_saved', 'Carbon Footprint Reduced'),
+    ('waste_reduced', 'Waste Reduced'),
+    ('energy_saved', 'Energy Saved'),
+    ('water_saved', 'Water Conserved'),
+    ('trees_planted', 'Trees Planted'),
+    ('plastic_avoided', 'Plastic Avoided'),
+]
+
+
 class ImpactTracker(models.Model):
     """Track environmental impact of user actions"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='impact_records')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True)
-    impact_type = models.CharField(max_length=50, choices=[
-        ('carbon_saved', 'Carbon Footprint Reduced'),
-        ('waste_reduced', 'Waste Reduced'),
-        ('energy_saved', 'Energy Saved'),
-        ('water_saved', 'Water Conserved'),
-        ('trees_planted', 'Trees Planted'),
-        ('plastic_avoided', 'Plastic Avoided'),
-    ])
+    impact_type = models.CharField(max_length=50, choices=IMPACT_TYPES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     unit = models.CharField(max_length=20, default='kg')
     date_recorded = models.DateTimeField(auto_now_add=True)
@@ -27,6 +30,22 @@ class ImpactTracker(models.Model):
         ordering = ['-date_recorded']
 
 
+class ImpactDailyRollup(models.Model):
+    """A member's impact of one type on one day, in the type's canonical unit (see community.rollup)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='impact_rollups')
+    impact_type = models.CharField(max_length=50, choices=IMPACT_TYPES)
+    day = models.DateField()
+    amount = models.FloatField(default=0)
+    actions = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'impact_type', 'day']
+        indexes = [
+            models.Index(fields=['impact_type', 'day']),
+            models.Index(fields=['day']),
+        ]
+
+
 class EcoTip(models.Model):
     """Daily eco tips and sustainability advice"""
     title = models.CharField(max_length=200)
@@ -0,0 +1,14 @@
+from sustainabilityhub.tasks import task
+from . import badges, timeline
+
+
+@task
+def fan_out_post(post_id, author_id):
+    timeline.fan_out_post(post_id, author_id)
+
+
+@task(batch=True)
+def check_badges(calls):
+    """Award badges to the members touched by a transaction's events; calls are [user_id, kind]"""
+    user_ids = sorted({user_id for user_id, _ in calls})
+    badges.award(user_ids, kinds={kind for _, kind in calls})
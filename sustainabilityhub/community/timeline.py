@@ -0,0 +1,254 @@
+"""
+Materialized home timelines for the community feed.
+
+Each user's timeline is a capped, newest-first set of post ids. New posts
+are pushed to the timelines of the author's followers when the post is
+created (fan-out on write). Only timelines that already exist are pushed
+to. Timelines expire after TIMELINE_TTL without reads and are rebuilt
+from the database on the next read, so inactive users cost nothing.
+
+A timeline keeps the newest TIMELINE_SIZE ids and is marked capped once
+older ids have been trimmed. Only a capped timeline falls back to the
+database when a reader scrolls past its end; otherwise a read is one id
+range lookup.
+
+Authors with more than TIMELINE_FANOUT_LIMIT followers are not fanned out.
+Their recent posts are merged in when a follower reads (fan-out on read).
+Which of a user's followees those are is cached until their follows change,
+or for at most CELEBRITY_TTL seconds.
+
+The store is picked by TIMELINE_BACKEND: Redis sorted sets in production,
+an in-process dict for development and tests.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+CELEBRITY_TTL = 60 * 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RedisTimelineStore:
+    """Timelines as Redis sorted sets scored by post id"""
+    # Marks an empty but valid timeline so users who follow nobody are not rebuilt on every read
+    SENTINEL = 0
+    # Present once older ids were trimmed; scored below the sentinel
+    CAPPED = 'capped'
+    # Checked and applied in one step so a push never recreates an expired
+    # timeline without its sentinel and TTL
+    PUSH = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('zadd', KEYS[1], ARGV[1], ARGV[1])
+local markers = redis.call('zcount', KEYS[1], '-inf', 0)
+local extra = redis.call('zcard', KEYS[1]) - markers - tonumber(ARGV[2])
+if extra > 0 then
+    redis.call('zremrangebyrank', KEYS[1], markers, markers + extra - 1)
+    redis.call('zadd', KEYS[1], -1, ARGV[3])
+end
+return 1
+"""
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(_setting('TIMELINE_REDIS_URL', 'redis://127.0.0.1:6379/1'))
+        self.size = _setting('TIMELINE_SIZE', 500)
+        self.ttl = _setting('TIMELINE_TTL', 7 * 24 * 60 * 60)
+        self._push = self.client.register_script(self.PUSH)
+
+    def _key(self, user_id):
+        return f'timeline:{user_id}'
+
+    def exists(self, user_id):
+        return bool(self.client.exists(self._key(user_id)))
+
+    def push(self, user_ids, post_id):
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            self._push(keys=[self._key(user_id)], args=[post_id, self.size, self.CAPPED], client=pipe)
+        pipe.execute()
+
+    def replace(self, user_id, post_ids):
+        """Store the newest ids; pass more than TIMELINE_SIZE to mark the timeline capped"""
+        key = self._key(user_id)
+        members = {post_id: post_id for post_id in post_ids[:self.size]}
+        members[self.SENTINEL] = self.SENTINEL
+        if len(post_ids) > self.size:
+            members[self.CAPPED] = -1
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.zadd(key, members)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def range(self, user_id, before=None, limit=20):
+        """(ids older than `before`, newest first; whether older ids were trimmed)"""
+        key = self._key(user_id)
+        upper = f'({before}' if before else '+inf'
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrangebyscore(key, upper, f'({self.SENTINEL}', start=0, num=limit)
+        pipe.zscore(key, self.CAPPED)
+        pipe.expire(key, self.ttl)
+        ids, capped, _ = pipe.execute()
+        return [int(post_id) for post_id in ids], capped is not None
+
+    def discard(self, user_id):
+        self.client.delete(self._key(user_id))
+
+
+class LocMemTimelineStore:
+    """Per-process stand-in for RedisTimelineStore"""
+
+    def __init__(self):
+        self.size = _setting('TIMELINE_SIZE', 500)
+        self.ttl = _setting('TIMELINE_TTL', 7 * 24 * 60 * 60)
+        self._timelines = {}  # user_id -> [expires_at, ascending post ids, capped]
+        self._lock = threading.Lock()
+
+    def _live(self, user_id):
+        entry = self._timelines.get(user_id)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._timelines[user_id]
+            return None
+        return entry
+
+    def exists(self, user_id):
+        with self._lock:
+            return self._live(user_id) is not None
+
+    def push(self, user_ids, post_id):
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._live(user_id)
+                if entry is None:
+                    continue
+                ids = entry[1]
+                position = bisect.bisect_left(ids, post_id)
+                if position == len(ids) or ids[position] != post_id:
+                    ids.insert(position, post_id)
+                if len(ids) > self.size:
+                    del ids[:-self.size]
+                    entry[2] = True
+
+    def replace(self, user_id, post_ids):
+        with self._lock:
+            self._timelines[user_id] = [
+                time.monotonic() + self.ttl, sorted(post_ids[:self.size]), len(post_ids) > self.size
+            ]
+
+    def range(self, user_id, before=None, limit=20):
+        with self._lock:
+            entry = self._live(user_id)
+            if entry is None:
+                return [], False
+            entry[0] = time.monotonic() + self.ttl
+            ids = entry[1]
+            end = bisect.bisect_left(ids, int(before)) if before else len(ids)
+            return ids[max(end - limit, 0):end][::-1], entry[2]
+
+    def discard(self, user_id):
+        with self._lock:
+            self._timelines.pop(user_id, None)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(_setting('TIMELINE_BACKEND', 'community.timeline.LocMemTimelineStore'))()
+    return _store
+
+
+def _fanout_limit():
+    return _setting('TIMELINE_FANOUT_LIMIT', 5000)
+
+
+def _followed_ids(user_id, **filters):
+    from profiles.models import Follow
+    return list(Follow.objects.filter(follower_id=user_id, **filters).values_list('following_id', flat=True))
+
+
+def is_high_follower(user_id):
+    from stats.models import UserCounters
+    return UserCounters.objects.filter(user_id=user_id, followers__gt=_fanout_limit()).exists()
+
+
+def fan_out_post(post_id, author_id):
+    """Push a new post onto the author's and their followers' timelines"""
+    from profiles.models import Follow
+
+    recipients = [author_id]
+    if not is_high_follower(author_id):
+        recipients += Follow.objects.filter(following_id=author_id).values_list('follower_id', flat=True)
+    get_store().push(recipients, post_id)
+
+
+def rebuild(user_id):
+    """Materialize a timeline from the database"""
+    from .models import Post
+
+    authors = _followed_ids(user_id) + [user_id]
+    # One id past the cap tells the store older posts exist
+    post_ids = list(
+        Post.objects.filter(author_id__in=authors).order_by('-id')
+        .values_list('id', flat=True)[:_setting('TIMELINE_SIZE', 500) + 1]
+    )
+    get_store().replace(user_id, post_ids)
+
+
+def _celebrity_key(user_id):
+    return f'timeline:celebrities:{user_id}'
+
+
+def _celebrities(user_id):
+    """Followees of `user_id` too large to fan out, cached until their follows change"""
+    followed = cache.get(_celebrity_key(user_id))
+    if followed is None:
+        followed = _followed_ids(user_id, following__counters__followers__gt=_fanout_limit())
+        cache.set(_celebrity_key(user_id), followed, CELEBRITY_TTL)
+    return followed
+
+
+def read_timeline(user_id, before=None, limit=20):
+    """Return up to `limit` post ids older than `before`, newest first"""
+    from .models import Post
+
+    store = get_store()
+    if not store.exists(user_id):
+        rebuild(user_id)
+    post_ids, capped = store.range(user_id, before=before, limit=limit)
+
+    # Scrolled past a timeline that was trimmed; continue straight from the database
+    if len(post_ids) < limit and capped:
+        oldest = post_ids[-1] if post_ids else before
+        older = Post.objects.filter(author_id__in=_followed_ids(user_id) + [user_id])
+        post_ids += _recent_ids(older, oldest, limit - len(post_ids))
+
+    # Accounts too large to fan out are read at request time
+    celebrities = _celebrities(user_id)
+    if celebrities:
+        recent = _recent_ids(Post.objects.filter(author_id__in=celebrities), before, limit)
+        post_ids = sorted(set(post_ids) | set(recent), reverse=True)[:limit]
+    return post_ids
+
+
+def _recent_ids(queryset, before, limit):
+    if before:
+        queryset = queryset.filter(id__lt=before)
+    return list(queryset.order_by('-id').values_list('id', flat=True)[:limit])
+
+
+def invalidate(user_id):
+    """Drop a timeline so it is rebuilt on the next read (e.g. after a follow change)"""
+    get_store().discard(user_id)
+    cache.delete(_celebrity_key(user_id))
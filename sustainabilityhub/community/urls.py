@@ -17,10 +17,12 @@ urlpatterns = [
     path('discover/', views.discover_posts, name='discover'),
     path('post/<int:post_id>/react/', views.toggle_post_reaction, name='toggle_post_reaction'),
     path('post/<int:post_id>/join/', views.join_challenge, name='join_challenge'),
+    path('post/<int:post_id>/progress/', views.challenge_progress, name='challenge_progress'),
     path('challenges/', views.challenges_list, name='challenges'),
     path('challenges/create/', views.create_challenge, name='create_challenge'),
     path('user/<int:user_id>/follow/', views.toggle_follow, name='toggle_follow'),
     
     # API endpoints
+    path('api/impact/analytics/', views.impact_analytics, name='impact_analytics'),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
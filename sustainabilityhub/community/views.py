@@ -4,13 +4,19 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Prefetch, Sum
-from django.db import models
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from .models import Post, PostReaction, Comment, CommentReaction, Follow, HashTag, ChallengeParticipation
-from .sustainability_features import ImpactTracker
+from trending.engine import get_trending
+from search.typeahead import autocomplete
+from sustainabilityhub.pagination import KeysetCursorPagination
+from sustainabilityhub.threads import load_thread
+from sustainabilityhub.toggles import toggle
+from rest_framework.utils.urls import replace_query_param
+from . import analytics, challenges, discovery, leaderboard, timeline
+from .hydration import hydrate_thread
 from .serializers import (
     PostSerializer, PostCreateSerializer, CommentSerializer,
     PostReactionSerializer, CommentReactionSerializer, FollowSerializer,
@@ -24,8 +30,6 @@ User = get_user_model()
 @login_required
 def community_dashboard(request):
     """Main community dashboard - challenges and fitness focused"""
-    from .sustainability_features import ImpactTracker
-    
     if request.method == 'POST':
         # Handle challenge creation
         content = request.POST.get('content')
@@ -67,42 +71,54 @@ def community_dashboard(request):
         user=request.user
     ).select_related('challenge_post').order_by('-joined_at')[:5]
     
-    # Get user's impact stats
-    user_impact = ImpactTracker.objects.filter(user=request.user).aggregate(
-        total_carbon=models.Sum('amount'),
-        total_actions=models.Count('id')
-    )
-    
-    # Get leaderboard
-    leaderboard = ImpactTracker.objects.values('user__username').annotate(
-        total_impact=models.Sum('amount')
-    ).order_by('-total_impact')[:10]
+    # Get user's impact stats and the leaderboard from the running totals
+    window = request.GET.get('window')
+    if window not in leaderboard.WINDOWS:
+        window = 'all'
+    total = leaderboard.position(request.user.pk)
+    user_impact = {
+        'total_carbon': total[1] if total else 0,
+        'total_actions': leaderboard.actions(request.user.pk),
+    }
     
     context = {
         'active_challenges': active_challenges,
         'user_challenges': user_challenges,
         'user_impact': user_impact,
-        'leaderboard': leaderboard,
+        'leaderboard': leaderboard.top(window),
+        'leaderboard_window': window,
+        'leaderboard_position': leaderboard.position(request.user.pk, window),
     }
     return render(request, 'community/dashboard.html', context)
 
 
+def _int_param(request, name, default, low, high):
+    try:
+        return min(max(int(request.GET.get(name, default)), low), high)
+    except ValueError:
+        return default
+
+
+@login_required
+def impact_analytics(request):
+    """The member's impact time series, moving averages, breakdown and community percentiles"""
+    days = _int_param(request, 'days', 90, 1, 366)
+    window = _int_param(request, 'window', 7, 1, days)
+    impact_type = request.GET.get('impact_type', 'carbon_saved')
+    if impact_type not in analytics.TYPES:
+        return JsonResponse({'error': 'Unknown impact type'}, status=400)
+    return JsonResponse(analytics.impact_report(request.user.pk, days, window, impact_type))
+
+
 @login_required
 def discover_posts(request):
     """Discover new posts and users"""
-    # Get posts from users not followed
-    following_users = list(request.user.community_following.values_list('following', flat=True))
-    following_users.append(request.user.id)
-    
-    posts = Post.objects.exclude(
-        author__in=following_users
-    ).select_related('author').prefetch_related(
-        'reactions__user', 'comments__author', 'hashtags'
-    ).order_by('-created_at')
-    
-    paginator = Paginator(posts, 10)
+    # Ranked pool minus the viewer and the users they follow
+    paginator = Paginator(discovery.ranked_ids(discovery.hidden_authors(request.user)), 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author').annotate(comment_total=Count('comments')).in_bulk(page_obj.object_list)
+    page_obj.object_list = [posts[post_id] for post_id in page_obj.object_list if post_id in posts]
     
     context = {'posts': page_obj}
     return render(request, 'community/discover.html', context)
@@ -114,29 +130,29 @@ def join_challenge(request, post_id):
     """Join a sustainability challenge"""
 
     
-    post = get_object_or_404(Post, id=post_id, post_type='challenge')
-    
-    participation, created = ChallengeParticipation.objects.get_or_create(
-        user=request.user,
-        challenge_post=post
-    )
+    post = get_object_or_404(Post.objects.only('id'), id=post_id, post_type='challenge')
+    created, participants = challenges.join(request.user, post)
     
     if created:
-        post.participants_count += 1
-        post.save()
         return JsonResponse({
             'action': 'joined',
             'message': 'Successfully joined challenge!',
-            'participants': post.participants_count
+            'participants': participants
         })
     else:
         return JsonResponse({
             'action': 'already_joined',
             'message': 'Already participating in this challenge',
-            'participants': post.participants_count
+            'participants': participants
         })
 
 
+def challenge_progress(request, post_id):
+    """Participant and completion counts, total impact and top finishers of a challenge"""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id, post_type='challenge')
+    return JsonResponse(challenges.progress(post, request.user))
+
+
 @login_required
 def create_challenge(request):
     """Create a new challenge"""
@@ -194,24 +210,16 @@ def toggle_post_reaction(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     reaction_type = request.POST.get('reaction_type', 'like')
     
-    reaction, created = PostReaction.objects.get_or_create(
-        post=post,
-        user=request.user,
-        defaults={'reaction_type': reaction_type}
-    )
-    
-    if not created:
-        if reaction.reaction_type == reaction_type:
-            reaction.delete()
-            return JsonResponse({'action': 'removed', 'total': post.total_reactions})
-        else:
-            reaction.reaction_type = reaction_type
-            reaction.save()
+    result = toggle(PostReaction, {'post': post, 'user': request.user}, field='reaction_type', value=reaction_type)
+    post.apply_reaction_toggle(result)
+    if not result.active:
+        return JsonResponse({'action': 'removed', 'total': post.total_reactions, 'counts': post.reaction_counts})
     
     return JsonResponse({
-        'action': 'added' if created else 'updated',
-        'reaction_type': reaction_type,
-        'total': post.total_reactions
+        'action': 'added' if result.delta else 'updated',
+        'reaction_type': result.value,
+        'total': post.total_reactions,
+        'counts': post.reaction_counts
     })
 
 
@@ -224,13 +232,8 @@ def toggle_follow(request, user_id):
     if user_to_follow == request.user:
         return JsonResponse({'error': 'Cannot follow yourself'}, status=400)
     
-    follow, created = Follow.objects.get_or_create(
-        follower=request.user,
-        following=user_to_follow
-    )
-    
-    if not created:
-        follow.delete()
+    result = toggle(Follow, {'follower': request.user, 'following': user_to_follow})
+    if not result.active:
         return JsonResponse({'action': 'unfollowed'})
     
     return JsonResponse({'action': 'followed'})
@@ -243,6 +246,8 @@ class PostViewSet(viewsets.ModelViewSet):
         'reactions__user', 'comments__author', 'hashtags'
     ).order_by('-is_pinned', '-created_at')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('-is_pinned', '-created_at', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -253,8 +258,10 @@ class PostViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
+        return self._apply_list_filters(super().get_queryset())
+    
+    def _apply_list_filters(self, queryset):
+        """Apply the ?hashtag=, ?type= and ?author= list filters"""
         # Filter by hashtag
         hashtag = self.request.query_params.get('hashtag')
         if hashtag:
@@ -278,60 +285,102 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         reaction_type = request.data.get('reaction_type', 'like')
         
-        reaction, created = PostReaction.objects.get_or_create(
-            post=post,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
+        result = toggle(PostReaction, {'post': post, 'user': request.user}, field='reaction_type', value=reaction_type)
+        post.apply_reaction_toggle(result)
+        if not result.active:
+            return Response({'action': 'removed', 'reaction_counts': post.reaction_counts})
         
-        if not created:
-            if reaction.reaction_type == reaction_type:
-                reaction.delete()
-                return Response({'action': 'removed'})
-            else:
-                reaction.reaction_type = reaction_type
-                reaction.save()
-        
-        serializer = PostReactionSerializer(reaction, context={'request': request})
+        serializer = PostReactionSerializer(result.instance, context={'request': request})
         return Response({
-            'action': 'added' if created else 'updated',
-            'reaction': serializer.data
+            'action': 'added' if result.delta else 'updated',
+            'reaction': serializer.data,
+            'reaction_counts': post.reaction_counts
         })
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def feed(self, request):
         """Get personalized feed for authenticated user"""
-        following_users = request.user.following.values_list('following', flat=True)
-        queryset = self.get_queryset().filter(
-            Q(author__in=following_users) | Q(author=request.user)
-        )
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
+        if 'page' in request.query_params:
+            # Page-number compatibility mode
+            following_users = request.user.following.values_list('following', flat=True)
+            queryset = self.get_queryset().filter(
+                Q(author__in=following_users) | Q(author=request.user)
+            )
+            page = self.paginate_queryset(queryset)
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Materialized timeline: one id range lookup, then one batched fetch
+        try:
+            before = int(request.query_params.get('before', 0)) or None
+        except ValueError:
+            return Response({'error': 'before must be a post id'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.paginator.get_page_size(request)
+        post_ids = timeline.read_timeline(request.user.pk, before=before, limit=limit)
+        posts = self.get_queryset().in_bulk(post_ids)
+        page = [posts[post_id] for post_id in post_ids if post_id in posts]
+        
+        serializer = self.get_serializer(page, many=True)
+        next_link = None
+        if len(post_ids) == limit:
+            next_link = replace_query_param(request.build_absolute_uri(), 'before', post_ids[-1])
+        return Response({'next': next_link, 'previous': None, 'results': serializer.data})
     
     @action(detail=False, methods=['get'])
     def discover(self, request):
-        """Get posts for discovery (from non-followed users)"""
-        if request.user.is_authenticated:
-            following_users = list(request.user.following.values_list('following', flat=True))
-            following_users.append(request.user.id)
-            queryset = self.get_queryset().exclude(author__in=following_users)
-        else:
-            queryset = self.get_queryset()
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        """Get posts for discovery (from non-followed users), best ranked first"""
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'offset must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.paginator.get_page_size(request)
+        ranked = discovery.ranked_ids(discovery.hidden_authors(request.user))
+        if {'hashtag', 'type', 'author'} & set(request.query_params):
+            # Filter the whole ranking before slicing so pages stay full
+            matching = set(self._apply_list_filters(Post.objects.filter(pk__in=ranked)).values_list('pk', flat=True))
+            ranked = [post_id for post_id in ranked if post_id in matching]
+        post_ids = ranked[offset:offset + limit]
+        posts = self.get_queryset().in_bulk(post_ids)
+        page = [posts[post_id] for post_id in post_ids if post_id in posts]
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(page, many=True)
+        next_link = previous_link = None
+        if offset + limit < len(ranked):
+            next_link = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        if offset:
+            previous_link = replace_query_param(request.build_absolute_uri(), 'offset', max(offset - limit, 0))
+        return Response({'next': next_link, 'previous': previous_link, 'results': serializer.data})
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Get trending posts"""
+        posts = get_trending('post', limit=20, queryset=super().get_queryset())
+        serializer = self.get_serializer(posts, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def thread(self, request, pk=None):
+        """Top-level comments with their replies, paged with ?after= and cut at ?depth="""
+        post = get_object_or_404(Post.objects.only('id'), pk=pk)
+        try:
+            max_depth = int(request.query_params['depth']) if 'depth' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'depth must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # One range query on (post, path) for the whole page of threads
+        comments, next_after = load_thread(
+            Comment.objects.select_related('author'), post.pk, max_depth=max_depth,
+            limit=self.paginator.get_page_size(request), after=request.query_params.get('after')
+        )
+        hydrate_thread(comments, request.user)
+        roots = [comment for comment in comments if comment.depth == 0]
+        
+        serializer = CommentSerializer(roots, many=True, context=self.get_serializer_context())
+        next_link = None
+        if next_after:
+            next_link = replace_query_param(request.build_absolute_uri(), 'after', next_after)
+        return Response({'next': next_link, 'previous': None, 'results': serializer.data})
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def join_challenge(self, request, pk=None):
         """Join a sustainability challenge"""
@@ -340,17 +389,12 @@ class PostViewSet(viewsets.ModelViewSet):
         if post.post_type != 'challenge':
             return Response({'error': 'This is not a challenge post'}, status=status.HTTP_400_BAD_REQUEST)
         
-        participation, created = ChallengeParticipation.objects.get_or_create(
-            user=request.user,
-            challenge_post=post
-        )
+        created, participants = challenges.join(request.user, post)
         
         if created:
-            post.participants_count += 1
-            post.save()
-            return Response({'message': 'Successfully joined challenge!', 'participants': post.participants_count})
+            return Response({'message': 'Successfully joined challenge!', 'participants': participants})
         else:
-            return Response({'message': 'Already participating in this challenge', 'participants': post.participants_count})
+            return Response({'message': 'Already participating in this challenge', 'participants': participants})
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def complete_challenge(self, request, pk=None):
@@ -358,18 +402,24 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         
         try:
-            participation = ChallengeParticipation.objects.get(
-                user=request.user,
-                challenge_post=post
-            )
+            impact_achieved = challenges.parse_impact(request.data.get('impact_achieved'))
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            challenges.complete(request.user, post, impact_achieved)
         except ChallengeParticipation.DoesNotExist:
             return Response({'error': 'You are not participating in this challenge'}, status=status.HTTP_400_BAD_REQUEST)
         
-        participation.completed = True
-        participation.impact_achieved = request.data.get('impact_achieved')
-        participation.save()
-        
         return Response({'message': 'Challenge completed successfully!'})
+    
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """Participant and completion counts, total impact and top finishers of a challenge"""
+        post = get_object_or_404(Post.objects.only('id', 'post_type'), pk=pk)
+        if post.post_type != 'challenge':
+            return Response({'error': 'This is not a challenge post'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(challenges.progress(post, request.user))
 
 
 class CommentViewSet(viewsets.ModelViewSet):
@@ -377,6 +427,8 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all().select_related('author', 'post').prefetch_related('reactions__user')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetCursorPagination
+    cursor_ordering = ('created_at', 'id')
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -394,24 +446,16 @@ class CommentViewSet(viewsets.ModelViewSet):
         comment = self.get_object()
         reaction_type = request.data.get('reaction_type', 'like')
         
-        reaction, created = CommentReaction.objects.get_or_create(
-            comment=comment,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
-        
-        if not created:
-            if reaction.reaction_type == reaction_type:
-                reaction.delete()
-                return Response({'action': 'removed'})
-            else:
-                reaction.reaction_type = reaction_type
-                reaction.save()
+        result = toggle(CommentReaction, {'comment': comment, 'user': request.user}, field='reaction_type', value=reaction_type)
+        comment.apply_reaction_toggle(result)
+        if not result.active:
+            return Response({'action': 'removed', 'reaction_counts': comment.reaction_counts})
         
-        serializer = CommentReactionSerializer(reaction, context={'request': request})
+        serializer = CommentReactionSerializer(result.instance, context={'request': request})
         return Response({
-            'action': 'added' if created else 'updated',
-            'reaction': serializer.data
+            'action': 'added' if result.delta else 'updated',
+            'reaction': serializer.data,
+            'reaction_counts': comment.reaction_counts
         })
 
 
@@ -420,6 +464,7 @@ class FollowViewSet(viewsets.ModelViewSet):
     queryset = Follow.objects.all().select_related('follower', 'following')
     serializer_class = FollowSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetCursorPagination
     
     def perform_create(self, serializer):
         serializer.save(follower=self.request.user)
@@ -454,16 +499,11 @@ class FollowViewSet(viewsets.ModelViewSet):
         if user_to_follow == request.user:
             return Response({'error': 'Cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
         
-        follow, created = Follow.objects.get_or_create(
-            follower=request.user,
-            following=user_to_follow
-        )
-        
-        if not created:
-            follow.delete()
+        result = toggle(Follow, {'follower': request.user, 'following': user_to_follow})
+        if not result.active:
             return Response({'action': 'unfollowed'})
         
-        serializer = self.get_serializer(follow)
+        serializer = self.get_serializer(result.instance)
         return Response({
             'action': 'followed',
             'follow': serializer.data
@@ -478,11 +518,25 @@ class HashTagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = HashTagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Hashtags starting with ?q=, most used first, for the hashtag picker"""
+        entries = autocomplete(request.query_params.get('q', ''), ['hashtag'], limit=20)
+        found = HashTag.objects.in_bulk([entry.object_id for entry in entries])
+        hashtags = []
+        for entry in entries:
+            if entry.object_id in found:
+                hashtag = found[entry.object_id]
+                hashtag.hydrated_post_count = entry.weight
+                hashtags.append(hashtag)
+        serializer = self.get_serializer(hashtags, many=True)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def trending(self, request):
         """Get trending hashtags"""
-        queryset = self.get_queryset().filter(post_count__gt=0)[:20]
-        serializer = self.get_serializer(queryset, many=True)
+        hashtags = get_trending('hashtag', limit=20)
+        serializer = self.get_serializer(hashtags, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
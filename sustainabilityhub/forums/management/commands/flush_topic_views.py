@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from forums import view_counter
+from forums.models import Topic
+
+
+class Command(BaseCommand):
+    help = 'Writes buffered topic view counts back to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Topics checked per cache round trip')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        topic_ids = list(Topic.objects.values_list('pk', flat=True))
+        
+        flushed = 0
+        for start in range(0, len(topic_ids), batch_size):
+            flushed += view_counter.flush_all(topic_ids[start:start + batch_size])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Flushed buffered views for {flushed} topics')
+        )
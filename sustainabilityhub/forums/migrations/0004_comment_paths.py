@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+def backfill_comment_paths(apps, schema_editor):
+    Comment = apps.get_model('forums', 'Comment')
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    step, max_depth = 6, 255 // 6 - 1
+
+    def segment(pk):
+        encoded = ''
+        while pk:
+            pk, remainder = divmod(pk, 36)
+            encoded = digits[remainder] + encoded
+        return encoded.rjust(step, '0')
+
+    # Parents are created before their replies, so id order sees every parent first
+    paths = {}
+    updated = []
+    for comment in Comment.objects.order_by('id').only('id', 'parent_id'):
+        parent_path = paths.get(comment.parent_id, '')
+        if len(parent_path) // step > max_depth:
+            parent_path = parent_path[:-step]
+        comment.path = paths[comment.id] = parent_path + segment(comment.id)
+        comment.depth = len(comment.path) // step - 1
+        updated.append(comment)
+    Comment.objects.bulk_update(updated, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0003_reaction_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='forums_comm_post_id_2c038a_idx'),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from sustainabilityhub.reactions import ReactionTallyMixin
 
 
 class Category(models.Model):
@@ -15,7 +16,7 @@ class Category(models.Model):
         return self.name
 
 
-class Post(models.Model):
+class Post(ReactionTallyMixin, models.Model):
     POST_TYPES = [
         ('text', 'Text Post'),
         ('image', 'Image Post'),
@@ -38,6 +39,15 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_edited = models.BooleanField(default=False)
     
+    # Reaction tallies, kept in step with PostReaction by signals
+    reaction_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    love_count = models.IntegerField(default=0)
+    laugh_count = models.IntegerField(default=0)
+    wow_count = models.IntegerField(default=0)
+    sad_count = models.IntegerField(default=0)
+    angry_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -67,7 +77,7 @@ class PostReaction(models.Model):
         return f'{self.user.username} {self.get_reaction_type_display()} {self.post.id}'
 
 
-class Comment(models.Model):
+class Comment(ReactionTallyMixin, models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments'
@@ -80,8 +90,21 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_edited = models.BooleanField(default=False)
     
+    # Materialized thread position, written by signals (see sustainabilityhub.threads)
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    
+    # Reaction tallies, kept in step with CommentReaction by signals
+    reaction_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    love_count = models.IntegerField(default=0)
+    laugh_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
     
     def __str__(self):
         return f'Comment by {self.author.username} on post {self.post.id}'
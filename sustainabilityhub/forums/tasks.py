@@ -0,0 +1,25 @@
+from django.urls import reverse
+
+from notifications.utils import create_coalesced_notification
+from sustainabilityhub.tasks import task
+from .models import TopicPost
+
+
+@task
+def notify_topic_reply(post_id):
+    """Notify the topic's author of a reply by someone else"""
+    instance = TopicPost.objects.select_related('author', 'topic__author').filter(pk=post_id).first()
+    if instance is None or instance.topic.author_id == instance.author_id:
+        return
+
+    create_coalesced_notification(
+        recipient=instance.topic.author,
+        notification_type='topic_reply',
+        actor=instance.author,
+        target=instance.topic,
+        verb=f'replied to "{instance.topic.title}"',
+        title=f'New reply to "{instance.topic.title}"',
+        message=f'{instance.author.username} replied: {instance.content[:100]}...' if len(instance.content) > 100 else f'{instance.author.username} replied: {instance.content}',
+        url=reverse('forums:topic_detail', kwargs={'pk': instance.topic.pk}),
+        content_object=instance
+    )
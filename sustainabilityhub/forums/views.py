@@ -161,33 +161,49 @@ from django.contrib.auth.decorators import user_passes_test, login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
 from .models import Category, Topic, Post, TopicPost, TopicLike, PostReaction, Comment
+from . import view_counter
+from sustainabilityhub.toggles import toggle
+from sustainabilityhub.cache import cached_table
+from sustainabilityhub.computations import cached_computation
+
+
+@cached_computation('home:site_stats', ttl=60)
+def home_site_stats():
+    from stats.models import SiteStatsSnapshot
+    return SiteStatsSnapshot.get()
+
+
+@cached_computation('home:trending_topics', ttl=60)
+def home_trending_topics():
+    from trending.engine import get_trending
+    return get_trending('topic', limit=5)
 
 
 def home_view(request):
     from projects.models import Project
     from events.models import Event
-    from resources.models import Resource
     from notifications.models import Notification
     from rms.models import Report
-    from django.contrib.auth import get_user_model
+    from stats.models import UserCounters
     from django.db.models import Q
     
-    User = get_user_model()
+    # Site-wide counts come from one precomputed row, shared by all requests for a minute
+    snapshot = home_site_stats()
     
     # Base statistics for all users
     stats = {
-        'total_projects': Project.objects.count(),
-        'total_topics': Topic.objects.count(),
-        'total_events': Event.objects.count(),
-        'total_resources': Resource.objects.count(),
-        'total_users': User.objects.filter(is_active=True).count(),
+        'total_projects': snapshot.total_projects,
+        'total_topics': snapshot.total_topics,
+        'total_events': snapshot.total_events,
+        'total_resources': snapshot.total_resources,
+        'total_users': snapshot.total_users,
     }
     
     context = {'stats': stats}
@@ -195,18 +211,19 @@ def home_view(request):
     if request.user.is_authenticated:
         user = request.user
         
+        counters = UserCounters.for_user(user)
+        
         # User warnings count (only unviewed warnings for banner)
-        user_warnings_count = user.warnings.filter(is_active=True, viewed_at__isnull=True).count()
-        context['user_warnings_count'] = user_warnings_count
+        context['user_warnings_count'] = counters.unviewed_warnings
         
         # Personal statistics
         user_stats = {
-            'projects_created': user.created_projects.count(),
-            'projects_joined': user.joined_projects.count(),
-            'topics_created': user.topics.count(),
-            'forum_posts': user.forum_posts.count(),
-            'events_attending': user.attending_events.count(),
-            'resources_shared': user.resources_created.count() if hasattr(user, 'resources_created') else 0,
+            'projects_created': counters.projects_created,
+            'projects_joined': counters.projects_joined,
+            'topics_created': counters.topics_created,
+            'forum_posts': counters.forum_posts,
+            'events_attending': counters.events_attending,
+            'resources_shared': counters.resources_shared,
         }
         
         # Activity feed - recent activities from user's network
@@ -229,10 +246,8 @@ def home_view(request):
             start_date__gte=timezone.now()
         ).exclude(participants=user).order_by('start_date')[:4]
         
-        # Trending content
-        trending_topics = Topic.objects.annotate(
-            engagement=Count('posts') + Count('likes')
-        ).order_by('-engagement', '-created_at')[:5]
+        # Trending content, ranked by the periodic trending job
+        trending_topics = home_trending_topics()
         
         # User's pending tasks/notifications
         pending_notifications = Notification.objects.filter(
@@ -241,15 +256,9 @@ def home_view(request):
         
         # Recent community highlights
         community_highlights = {
-            'new_members': User.objects.filter(
-                date_joined__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-            'active_projects': Project.objects.filter(
-                status='active', updated_at__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-            'recent_events': Event.objects.filter(
-                created_at__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
+            'new_members': snapshot.new_members_week,
+            'active_projects': snapshot.active_projects_week,
+            'recent_events': snapshot.new_events_week,
         }
         
         context.update({
@@ -264,17 +273,15 @@ def home_view(request):
         # Admin-specific data (admins get both member experience + admin controls)
         if user.is_superuser:
             admin_stats = {
-                'pending_reports': Report.objects.filter(status='pending').count(),
-                'new_users_today': User.objects.filter(
-                    date_joined__date=timezone.now().date()
-                ).count(),
+                'pending_reports': snapshot.pending_reports,
+                'new_users_today': snapshot.new_users_today,
                 'active_warnings': user.warnings_issued.filter(is_active=True).count() if hasattr(user, 'warnings_issued') else 0,
-                'total_users': User.objects.count(),
-                'inactive_users': User.objects.filter(is_active=False).count(),
+                'total_users': snapshot.all_users,
+                'inactive_users': snapshot.inactive_users,
                 'recent_activity': {
-                    'new_projects': Project.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
-                    'new_topics': Topic.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
-                    'new_events': Event.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
+                    'new_projects': snapshot.new_projects_week,
+                    'new_topics': snapshot.new_topics_week,
+                    'new_events': snapshot.new_events_week,
                 }
             }
             
@@ -284,13 +291,11 @@ def home_view(request):
             
             # Admin quick actions data
             admin_quick_actions = {
-                'users_needing_attention': User.objects.filter(
-                    is_active=True, last_login__lt=timezone.now() - timezone.timedelta(days=30)
-                ).count(),
-                'flagged_content': Topic.objects.filter(is_locked=True).count(),
+                'users_needing_attention': snapshot.users_needing_attention,
+                'flagged_content': snapshot.locked_topics,
                 'system_health': {
-                    'active_projects': Project.objects.filter(status='active').count(),
-                    'upcoming_events': Event.objects.filter(start_date__gte=timezone.now()).count(),
+                    'active_projects': snapshot.active_projects,
+                    'upcoming_events': snapshot.upcoming_events,
                 }
             }
             
@@ -357,11 +362,11 @@ class TopicListView(ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return Post.objects.select_related('author', 'category').prefetch_related('reactions', 'comments').order_by('-created_at')
+        return Post.objects.select_related('author', 'category').prefetch_related('comments').order_by('-created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = cached_table(Category)
         return context
 
 
@@ -375,8 +380,9 @@ class TopicDetailView(DetailView):
 
     def get_object(self):
         topic = get_object_or_404(Topic, pk=self.kwargs['pk'])
-        topic.views += 1
-        topic.save(update_fields=['views'])
+        # Buffered in the cache and flushed in bulk, so a read never locks the row
+        view_counter.record_view(topic.pk)
+        topic.views = view_counter.current_views(topic)
         return topic
 
     def get_context_data(self, **kwargs):
@@ -401,7 +407,7 @@ class TopicCreateView(LoginRequiredMixin, CreateView):
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         # Make category optional if no categories exist
-        if not Category.objects.exists():
+        if not cached_table(Category):
             form.fields['category'].required = False
             form.fields['category'].queryset = Category.objects.none()
         return form
@@ -558,22 +564,14 @@ def toggle_reaction(request, post_id):
         data = json.loads(request.body)
         reaction_type = data.get('reaction_type', 'like')
         
-        reaction, created = PostReaction.objects.get_or_create(
-            post=post,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
-        
-        if not created:
-            if reaction.reaction_type == reaction_type:
-                reaction.delete()
-                return JsonResponse({'success': True, 'action': 'removed'})
-            else:
-                reaction.reaction_type = reaction_type
-                reaction.save()
-                return JsonResponse({'success': True, 'action': 'updated'})
-        
-        return JsonResponse({'success': True, 'action': 'added'})
+        result = toggle(PostReaction, {'post': post, 'user': request.user}, field='reaction_type', value=reaction_type)
+        post.apply_reaction_toggle(result)
+        return JsonResponse({
+            'success': True,
+            'action': result.action,
+            'total': post.reaction_count,
+            'counts': post.reaction_counts
+        })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -661,9 +659,8 @@ def delete_post(request, post_id):
 def like_topic(request, pk):
     topic = get_object_or_404(Topic, pk=pk)
     if request.user.is_authenticated:
-        like, created = TopicLike.objects.get_or_create(topic=topic, user=request.user)
-        if not created:
-            like.delete()
+        result = toggle(TopicLike, {'topic': topic, 'user': request.user})
+        if not result.active:
             messages.info(request, 'You unliked this topic.')
         else:
             messages.success(request, 'You liked this topic!')
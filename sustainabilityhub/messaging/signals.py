@@ -1,32 +1,47 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Message
-from notifications.utils import create_notification
+from .models import Conversation, Message
+from notifications import unread
+from . import tasks
 
 
 @receiver(post_save, sender=Message)
-def notify_new_message(sender, instance, created, **kwargs):
-    """Send notification when a new message is received"""
-    if created:
-        # Get the other participant(s) in the conversation
-        conversation = instance.conversation
-        recipient = None
-        
-        for participant in conversation.participants.all():
-            if participant != instance.sender:
-                recipient = participant
-                break
-        
-        if recipient:
-            from django.urls import reverse
-            url = reverse('messaging:conversation_detail', kwargs={'pk': conversation.pk})
-            
-            create_notification(
-                recipient=recipient,
-                notification_type='message',
-                title=f'New message from {instance.sender.username}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+def count_new_message(sender, instance, created, raw=False, **kwargs):
+    """A new message is unread for every participant but the sender"""
+    if created and not raw and not instance.is_read:
+        recipients = instance.conversation.participants.exclude(pk=instance.sender_id).values_list('pk', flat=True)
+        unread.adjust('messages', recipients, 1)
+
+
+@receiver(post_delete, sender=Message)
+def uncount_deleted_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        recipients = Conversation.participants.through.objects.filter(
+            conversation_id=instance.conversation_id
+        ).exclude(user_id=instance.sender_id).values_list('user_id', flat=True)
+        unread.adjust('messages', recipients, -1)
+
+
+@receiver(pre_delete, sender=Conversation)
+def recount_deleted_conversation(sender, instance, **kwargs):
+    # Participant rows are gone by the time the messages' post_delete runs
+    unread.reset('messages', instance.participants.values_list('pk', flat=True))
 
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def recount_changed_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    """Joining or leaving a conversation changes which messages count; recount on next read"""
+    if action in ('post_add', 'post_remove'):
+        unread.reset('messages', [instance.pk] if reverse else pk_set)
+    elif action == 'pre_clear':
+        if reverse:
+            unread.reset('messages', [instance.pk])
+        else:
+            unread.reset('messages', instance.participants.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Message)
+def notify_new_message(sender, instance, created, raw=False, **kwargs):
+    """Send notification when a new message is received"""
+    if created and not raw:
+        tasks.notify_new_message.delay(instance.pk)
@@ -0,0 +1,30 @@
+from django.urls import reverse
+
+from notifications.utils import create_coalesced_notification
+from sustainabilityhub.tasks import task
+from .models import Message
+
+
+@task
+def notify_new_message(message_id):
+    """Notify the other participant of a new message"""
+    instance = Message.objects.select_related('sender', 'conversation').filter(pk=message_id).first()
+    if instance is None:
+        return
+    conversation = instance.conversation
+    recipient = conversation.participants.exclude(pk=instance.sender_id).first()
+    if recipient is None:
+        return
+
+    # Further messages in the conversation update the same unread notification
+    create_coalesced_notification(
+        recipient=recipient,
+        notification_type='message',
+        actor=instance.sender,
+        target=conversation,
+        verb='sent you messages',
+        title=f'New message from {instance.sender.username}',
+        message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
+        url=reverse('messaging:conversation_detail', kwargs={'pk': conversation.pk}),
+        content_object=instance
+    )
@@ -3,8 +3,10 @@ from django.views.generic import ListView, DetailView, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Max
+from django.db.models import Max
 from django.utils import timezone
+from search.typeahead import matching_ids
+from notifications import unread
 from .models import Conversation, Message
 
 
@@ -25,10 +27,7 @@ class ConversationListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Add total unread messages count
-        context['total_unread'] = Message.objects.filter(
-            conversation__participants=self.request.user,
-            is_read=False
-        ).exclude(sender=self.request.user).count()
+        context['total_unread'] = unread.unread_counts(self.request.user.pk)['messages']
         return context
 
 
@@ -44,9 +43,10 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         context['message_list'] = self.object.messages.all().select_related('sender')
         # Mark messages as read
-        self.object.messages.exclude(
+        marked = self.object.messages.exclude(
             sender=self.request.user
         ).filter(is_read=False).update(is_read=True, read_at=timezone.now())
+        unread.adjust('messages', [self.request.user.pk], -marked)
         return context
 
 
@@ -110,6 +110,7 @@ def mark_all_read(request):
             is_read=True,
             read_at=timezone.now()
         )
+        unread.reset('messages', [request.user.pk], 0)
         messages.success(request, 'All messages marked as read!')
     
     return redirect('messaging:conversations')
@@ -130,12 +131,8 @@ class FindUsersView(LoginRequiredMixin, ListView):
         
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search)
-            )
+            # Username and name word prefixes from the typeahead index
+            queryset = queryset.filter(id__in=matching_ids('user', search))
         
         # Order by recent activity (last_login) then username
         return queryset.order_by('-last_login', 'username')
@@ -22,8 +22,14 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     url = models.URLField(blank=True)
     
+    # Coalesced notifications: one row stands for every event with the same group_key in a window
+    group_key = models.CharField(max_length=100, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    actors = models.JSONField(default=list, blank=True, help_text="Most recent distinct actors as [id, username]")
+    
     # Generic foreign key for linking to various content types
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
@@ -31,6 +37,13 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'group_key', 'is_read'], name='notification_group_idx'),
+        ]
     
     def __str__(self):
         return f'{self.notification_type} notification for {self.recipient.username}'
+    
+    @property
+    def is_aggregate(self):
+        return self.actor_count > 1
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Notification
+from . import unread
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_read:
+        unread.adjust('notifications', [instance.recipient_id], 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        unread.adjust('notifications', [instance.recipient_id], -1)
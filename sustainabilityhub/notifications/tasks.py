@@ -0,0 +1,14 @@
+import json
+
+from sustainabilityhub.tasks import task
+from .utils import _insert_many
+
+
+@task(batch=True)
+def send_notifications(calls):
+    """Insert notifications queued by queue_notifications(); identical ones share one bulk insert"""
+    recipients = {}
+    for recipient_ids, fields in calls:
+        recipients.setdefault(json.dumps(fields, sort_keys=True), []).extend(recipient_ids)
+    for fields, recipient_ids in recipients.items():
+        _insert_many(recipient_ids, json.loads(fields))
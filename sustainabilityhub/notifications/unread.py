@@ -0,0 +1,81 @@
+"""
+Per-user unread counts for notifications and messages, kept in the cache.
+
+The counts shown on every page are read from two cache keys per user
+instead of two COUNT queries. Writers adjust them: new notifications and
+messages add one, and the read paths subtract the rows they flipped. A
+missing key is recounted from the database on the next read. Keys expire
+after UNREAD_COUNTER_TTL, which bounds any drift from a write that raced
+with a recount.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+KINDS = ('notifications', 'messages')
+
+
+def _key(kind, user_id):
+    return f'unread:{kind}:{user_id}'
+
+
+def _ttl():
+    return getattr(settings, 'UNREAD_COUNTER_TTL', 60 * 60)
+
+
+def _count(kind, user_id):
+    if kind == 'notifications':
+        from .models import Notification
+        return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    from messaging.models import Message
+    return Message.objects.filter(
+        conversation__participants=user_id, is_read=False
+    ).exclude(sender_id=user_id).count()
+
+
+def unread_counts(user_id):
+    """{'notifications': n, 'messages': n} for a user, recounting whatever is not cached"""
+    keys = {kind: _key(kind, user_id) for kind in KINDS}
+    cached = cache.get_many(keys.values())
+    counts = {}
+    for kind, key in keys.items():
+        if key in cached:
+            counts[kind] = cached[key]
+        else:
+            counts[kind] = _count(kind, user_id)
+            cache.add(key, counts[kind], _ttl())
+    return counts
+
+
+def adjust(kind, user_ids, delta):
+    """Add `delta` to the cached counts once the current transaction commits"""
+    user_ids = list(user_ids)
+
+    def apply():
+        for user_id in user_ids:
+            key = _key(kind, user_id)
+            try:
+                value = cache.incr(key, delta)
+            except ValueError:
+                # Not cached; the next read recounts
+                continue
+            if value < 0:
+                cache.delete(key)
+
+    if user_ids and delta:
+        transaction.on_commit(apply)
+
+
+def reset(kind, user_ids, value=None):
+    """Set the cached counts to `value`, or drop them so the next read recounts"""
+    user_ids = list(user_ids)
+
+    def apply():
+        keys = [_key(kind, user_id) for user_id in user_ids]
+        if value is None:
+            cache.delete_many(keys)
+        else:
+            cache.set_many(dict.fromkeys(keys, value), _ttl())
+
+    if user_ids:
+        transaction.on_commit(apply)
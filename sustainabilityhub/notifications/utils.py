@@ -1,22 +1,144 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.urls import reverse
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
 from .models import Notification
+from . import unread
+
+# Distinct actors remembered on a coalesced notification, newest first
+ACTOR_SAMPLE = 3
+
+
+def _content_fields(content_object):
+    """Generic foreign key columns for the linked object, set before the INSERT"""
+    if content_object is None:
+        return {}
+    return {
+        'content_type': ContentType.objects.get_for_model(content_object),
+        'object_id': content_object.pk,
+    }
 
 
 def create_notification(recipient, notification_type, title, message, url='', content_object=None):
     """Helper function to create notifications"""
-    notification = Notification.objects.create(
+    return Notification.objects.create(
         recipient=recipient,
         notification_type=notification_type,
         title=title,
         message=message,
         url=url,
+        **_content_fields(content_object)
+    )
+
+
+def create_notifications_bulk(recipients, notification_type, title, message, url='', content_object=None):
+    """
+    Create the same notification for many recipients (users or user ids).
+
+    Rows are inserted with bulk_create in batches of NOTIFICATION_BATCH_SIZE,
+    so post_save is not sent; unread counters are updated here instead.
+    """
+    fields = dict(
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        url=url,
+        **_content_fields(content_object)
     )
-    
-    if content_object:
-        notification.content_type = ContentType.objects.get_for_model(content_object)
-        notification.object_id = content_object.pk
-        notification.save()
-    
-    return notification
+    return _insert_many(recipients, fields)
+
+
+def _insert_many(recipients, fields):
+    recipient_ids = list(dict.fromkeys(getattr(recipient, 'pk', recipient) for recipient in recipients))
+    if not recipient_ids:
+        return []
+    notifications = [Notification(recipient_id=recipient_id, **fields) for recipient_id in recipient_ids]
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(
+            notifications, batch_size=getattr(settings, 'NOTIFICATION_BATCH_SIZE', 50)
+        )
+        unread.adjust('notifications', recipient_ids, 1)
+    return created
+
+
+def queue_notifications(recipients, notification_type, title, message, url='', content_object=None):
+    """
+    create_notifications_bulk() in a background task, after the current transaction commits.
+
+    Notifications queued in the same transaction are inserted together.
+    """
+    recipient_ids = list(dict.fromkeys(getattr(recipient, 'pk', recipient) for recipient in recipients))
+    if not recipient_ids:
+        return
+    fields = dict(notification_type=notification_type, title=title, message=message, url=url)
+    if content_object is not None:
+        fields['content_type_id'] = ContentType.objects.get_for_model(content_object).pk
+        fields['object_id'] = content_object.pk
+    from .tasks import send_notifications
+    send_notifications.delay(recipient_ids, fields)
+
+
+def _actor_names(actors, count):
+    """'alice', 'alice and bob' or 'alice, bob and 3 others'"""
+    names = [username for _, username in actors]
+    others = count - len(names)
+    if others > 0:
+        return f"{', '.join(names)} and {others} other{'s' if others != 1 else ''}"
+    if len(names) == 1:
+        return names[0]
+    return f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+def create_coalesced_notification(recipient, notification_type, actor, target, verb, title, message,
+                                  url='', content_object=None):
+    """
+    Create a notification, or fold it into a recent unread one about the same target.
+
+    Events of the same type on the same target (a post, topic, conversation...)
+    for the same recipient within NOTIFICATION_COALESCE_WINDOW seconds share
+    one row. The row counts distinct actors, keeps a sample of the latest
+    ones and is retitled "alice, bob and 3 others <verb>". A single event
+    keeps `title`. actor_count is approximate: an actor who drops out of the
+    sample is counted again on their next event.
+    """
+    target_type = ContentType.objects.get_for_model(target)
+    group_key = f'{notification_type}:{target_type.pk}:{target.pk}'
+    window = getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 6 * 60 * 60)
+
+    with transaction.atomic():
+        existing = Notification.objects.select_for_update().filter(
+            recipient=recipient,
+            group_key=group_key,
+            is_read=False,
+            updated_at__gte=timezone.now() - timedelta(seconds=window),
+        ).order_by('-updated_at').first()
+
+        if existing is None:
+            return Notification.objects.create(
+                recipient=recipient,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                url=url,
+                group_key=group_key,
+                actors=[[actor.pk, actor.username]],
+                **_content_fields(content_object)
+            )
 
+        known = [entry for entry in existing.actors if entry[0] != actor.pk]
+        if len(known) == len(existing.actors):
+            existing.actor_count += 1
+        existing.actors = ([[actor.pk, actor.username]] + known)[:ACTOR_SAMPLE]
+        if existing.actor_count > 1:
+            existing.title = f'{_actor_names(existing.actors, existing.actor_count)} {verb}'[:200]
+        existing.message = message
+        existing.url = url or existing.url
+        for field, value in _content_fields(content_object).items():
+            setattr(existing, field, value)
+        existing.save(update_fields=[
+            'actor_count', 'actors', 'title', 'message', 'url', 'content_type', 'object_id', 'updated_at'
+        ])
+        return existing
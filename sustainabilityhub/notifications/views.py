@@ -4,6 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse
 from .models import Notification
+from . import unread
 
 
 class NotificationListView(LoginRequiredMixin, ListView):
@@ -13,16 +14,14 @@ class NotificationListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
+        # Coalesced notifications move back to the top when they receive new events
         return Notification.objects.filter(
             recipient=self.request.user
-        ).order_by('-created_at')
+        ).order_by('-updated_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['unread_count'] = Notification.objects.filter(
-            recipient=self.request.user,
-            is_read=False
-        ).count()
+        context['unread_count'] = unread.unread_counts(self.request.user.pk)['notifications']
         return context
 
 
@@ -32,8 +31,9 @@ def mark_as_read(request, pk):
         pk=pk,
         recipient=request.user
     )
-    notification.is_read = True
-    notification.save()
+    # Only the request that flips the flag lowers the unread count
+    if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+        unread.adjust('notifications', [request.user.pk], -1)
     
     if notification.url:
         return redirect(notification.url)
@@ -46,6 +46,7 @@ def mark_all_as_read(request):
             recipient=request.user,
             is_read=False
         ).update(is_read=True)
+        unread.reset('notifications', [request.user.pk], 0)
         messages.success(request, 'All notifications marked as read.')
     return redirect('notifications:list')
 
@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 from django.http import JsonResponse
 from .models import Profile, Follow, Bookmark, Activity
 from django.views.decorators.http import require_POST
+from stats.models import UserCounters
+from sustainabilityhub.toggles import toggle
 
 User = get_user_model()
 
@@ -16,11 +18,12 @@ def profile_detail(request, username):
     if request.user.is_authenticated:
         is_following = Follow.objects.filter(follower=request.user, following=user).exists()
     
+    counters = UserCounters.for_user(user)
     stats = {
-        'followers': user.followers.count(),
-        'following': user.following.count(),
-        'topics': user.topics.count(),
-        'projects': user.created_projects.count(),
+        'followers': counters.followers,
+        'following': counters.following,
+        'topics': counters.topics_created,
+        'projects': counters.projects_created,
     }
     
     activities = Activity.objects.filter(user=user).select_related('user')[:20]
@@ -60,20 +63,17 @@ def follow_user(request, username):
     if user_to_follow == request.user:
         return JsonResponse({'error': 'Cannot follow yourself'}, status=400)
     
-    follow, created = Follow.objects.get_or_create(
-        follower=request.user,
-        following=user_to_follow
-    )
-    
-    if created:
-        Activity.objects.create(
-            user=request.user,
-            activity_type='user_followed',
-            description=f'Started following {user_to_follow.username}'
-        )
+    result = toggle(Follow, {'follower': request.user, 'following': user_to_follow})
+    
+    if result.active:
+        if result.delta:
+            Activity.objects.create(
+                user=request.user,
+                activity_type='user_followed',
+                description=f'Started following {user_to_follow.username}'
+            )
         return JsonResponse({'status': 'followed', 'message': f'Now following {user_to_follow.username}'})
     else:
-        follow.delete()
         return JsonResponse({'status': 'unfollowed', 'message': f'Unfollowed {user_to_follow.username}'})
 
 @login_required
@@ -85,14 +85,9 @@ def toggle_bookmark(request):
     if not content_type or not object_id:
         return JsonResponse({'error': 'Missing parameters'}, status=400)
     
-    bookmark, created = Bookmark.objects.get_or_create(
-        user=request.user,
-        content_type=content_type,
-        object_id=int(object_id)
-    )
+    result = toggle(Bookmark, {'user': request.user, 'content_type': content_type, 'object_id': int(object_id)})
     
-    if not created:
-        bookmark.delete()
+    if not result.active:
         return JsonResponse({'status': 'removed', 'message': 'Bookmark removed'})
     
     return JsonResponse({'status': 'added', 'message': 'Bookmark added'})
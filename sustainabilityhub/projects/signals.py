@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import ProjectUpdate
-from notifications.utils import create_notification
+from notifications.utils import queue_notifications
 
 
 @receiver(post_save, sender=ProjectUpdate)
@@ -12,25 +12,17 @@ def notify_project_update(sender, instance, created, **kwargs):
         from django.urls import reverse
         url = reverse('projects:detail', kwargs={'pk': project.pk})
         
-        # Notify all project members except the author
-        for member in project.members.exclude(id=instance.author.id):
-            create_notification(
-                recipient=member,
-                notification_type='project_update',
-                title=f'Update on {project.title}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+        # Notify all project members and the creator, except the author
+        recipients = set(project.members.values_list('id', flat=True))
+        recipients.add(project.creator_id)
+        recipients.discard(instance.author_id)
         
-        # Also notify the creator if they're not a member
-        if project.creator not in project.members.all() and project.creator != instance.author:
-            create_notification(
-                recipient=project.creator,
-                notification_type='project_update',
-                title=f'Update on {project.title}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+        queue_notifications(
+            sorted(recipients),
+            notification_type='project_update',
+            title=f'Update on {project.title}',
+            message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
+            url=url,
+            content_object=instance
+        )
 
@@ -110,7 +110,7 @@ class ProjectDeleteView(LoginRequiredMixin, DeleteView):
 
 def request_to_join(request, pk):
     """Create a join request instead of direct join"""
-    from notifications.utils import create_notification
+    from notifications.utils import queue_notifications
     project = get_object_or_404(Project, pk=pk)
     
     if not request.user.is_authenticated:
@@ -145,8 +145,8 @@ def request_to_join(request, pk):
     )
     
     # Notify project creator
-    create_notification(
-        recipient=project.creator,
+    queue_notifications(
+        [project.creator_id],
         notification_type='project_join_request',
         title='New Project Join Request',
         message=f'{request.user.username} wants to join "{project.title}"',
@@ -181,7 +181,7 @@ class ManageJoinRequestsView(LoginRequiredMixin, ListView):
 
 def approve_request(request, pk):
     """Approve a join request"""
-    from notifications.utils import create_notification
+    from notifications.utils import queue_notifications
     join_request = get_object_or_404(ProjectJoinRequest, pk=pk)
     
     if join_request.project.creator != request.user:
@@ -202,8 +202,8 @@ def approve_request(request, pk):
     join_request.project.members.add(join_request.user)
     
     # Notify user
-    create_notification(
-        recipient=join_request.user,
+    queue_notifications(
+        [join_request.user_id],
         notification_type='project_request_approved',
         title='Project Request Approved',
         message=f'Your request to join "{join_request.project.title}" was approved',
@@ -216,7 +216,7 @@ def approve_request(request, pk):
 
 def reject_request(request, pk):
     """Reject a join request"""
-    from notifications.utils import create_notification
+    from notifications.utils import queue_notifications
     join_request = get_object_or_404(ProjectJoinRequest, pk=pk)
     
     if join_request.project.creator != request.user:
@@ -234,8 +234,8 @@ def reject_request(request, pk):
     join_request.save()
     
     # Notify user
-    create_notification(
-        recipient=join_request.user,
+    queue_notifications(
+        [join_request.user_id],
         notification_type='project_request_rejected',
         title='Project Request Declined',
         message=f'Your request to join "{join_request.project.title}" was declined',
@@ -0,0 +1,4 @@
+from sustainabilityhub.cache import connect_cached_table
+from .models import ResourceCategory
+
+connect_cached_table(ResourceCategory)
@@ -4,6 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.db.models import Q, Avg
+from sustainabilityhub.cache import cached_table
 from .models import ResourceCategory, Resource, ResourceRating
 
 
@@ -40,7 +41,7 @@ class ResourceListView(ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = ResourceCategory.objects.all()
+        context['categories'] = cached_table(ResourceCategory)
         return context
 
 
@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['doc_type', 'object_id', 'title', 'length', 'updated_at']
+    list_filter = ['doc_type']
+    search_fields = ['title']
+    readonly_fields = [field.name for field in SearchDocument._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
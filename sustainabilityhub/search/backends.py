@@ -0,0 +1,213 @@
+"""
+Ranking backends for the search index.
+
+All backends rank the SearchDocument table. They return
+[(document_id, score, snippet_html or None)] with the best match first.
+
+PythonBackend keeps its own inverted index in SearchPosting and scores
+with BM25. SQLiteFTSBackend reads an FTS5 table, which triggers keep in
+step with SearchDocument, and ranks with FTS5's built-in bm25(). PostgresBackend
+matches a GIN-indexed tsvector expression and ranks with ts_rank_cd. The
+FTS5 table and the GIN index are created by migration 0002 only on
+databases that support them.
+
+time_budget() bounds how long a search may keep the database busy.
+"""
+import heapq
+import math
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Avg, Count
+
+from .models import SearchDocument, SearchPosting
+from .text import MATCH_END, MATCH_START, TITLE_WEIGHT, analyze, document_terms, mark_matches, tokenize
+
+FTS_TABLE = 'search_fts'
+PG_VECTOR = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B')"
+)
+
+
+# PostgreSQL's query_canceled, raised when statement_timeout fires
+PG_QUERY_CANCELED = '57014'
+# SQLite virtual machine steps between deadline checks
+PROGRESS_STEPS = 1000
+
+
+class SearchTimeout(Exception):
+    """A search ran past its time budget and was cancelled"""
+
+
+@contextmanager
+def time_budget(seconds):
+    """Cancel database work inside the block once it has run for `seconds`"""
+    if not seconds or connection.vendor not in ('sqlite', 'postgresql'):
+        yield
+        return
+
+    if connection.vendor == 'sqlite':
+        deadline = time.monotonic() + seconds
+        connection.ensure_connection()
+        raw = connection.connection
+        # A true result from the progress handler interrupts the running statement
+        raw.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+        try:
+            yield
+        except OperationalError as error:
+            if time.monotonic() > deadline:
+                raise SearchTimeout() from error
+            raise
+        finally:
+            raw.set_progress_handler(None, 0)
+        return
+
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [int(seconds * 1000)])
+            yield
+    except OperationalError as error:
+        cause = error.__cause__
+        if getattr(cause, 'pgcode', None) == PG_QUERY_CANCELED or getattr(cause, 'sqlstate', None) == PG_QUERY_CANCELED:
+            raise SearchTimeout() from error
+        raise
+
+
+def _type_filter(doc_types, column):
+    if not doc_types:
+        return '', []
+    return f' AND {column} IN ({", ".join(["%s"] * len(doc_types))})', list(doc_types)
+
+
+class PythonBackend:
+    """BM25 over the SearchPosting inverted index; works on any database"""
+    k1 = 1.2
+    b = 0.75
+
+    def index(self, document, frequencies=None):
+        frequencies = frequencies or document_terms(document.title, document.body)
+        SearchPosting.objects.filter(document=document).delete()
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for term, frequency in frequencies.items()
+        ])
+
+    def rebuild(self, documents):
+        SearchPosting.objects.all().delete()
+        postings = [
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for document in documents
+            for term, frequency in document_terms(document.title, document.body).items()
+        ]
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+
+    def search(self, query, limit, doc_types=None):
+        terms = set(analyze(query))
+        if not terms:
+            return []
+        documents = SearchDocument.objects.all()
+        postings = SearchPosting.objects.filter(term__in=terms)
+        if doc_types:
+            documents = documents.filter(doc_type__in=doc_types)
+            postings = postings.filter(document__doc_type__in=doc_types)
+
+        corpus = documents.aggregate(total=Count('id'), average=Avg('length'))
+        if not corpus['total']:
+            return []
+        average_length = corpus['average'] or 1
+
+        rows = list(postings.values_list('term', 'document_id', 'frequency', 'document__length'))
+        document_frequency = Counter(term for term, _, _, _ in rows)
+        scores = defaultdict(float)
+        for term, document_id, frequency, length in rows:
+            df = document_frequency[term]
+            idf = math.log(1 + (corpus['total'] - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            scores[document_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(document_id, score, None) for document_id, score in top]
+
+
+class SQLiteFTSBackend:
+    """FTS5 external-content table over SearchDocument, ranked with bm25()"""
+
+    def index(self, document, frequencies=None):
+        # Triggers on the document table keep FTS5 current
+        pass
+
+    def rebuild(self, documents):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def search(self, query, limit, doc_types=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Quoted tokens joined with OR: FTS5 query syntax in the input is never interpreted
+        match = ' OR '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+        type_sql, type_params = _type_filter(doc_types, 'document.doc_type')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, %s, 1.0) AS rank, "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+                f"FROM {FTS_TABLE} JOIN {SearchDocument._meta.db_table} AS document "
+                f"ON document.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s{type_sql} ORDER BY rank LIMIT %s",
+                [float(TITLE_WEIGHT), MATCH_START, MATCH_END, match, *type_params, limit]
+            )
+            # bm25() is lower-is-better; flip it so scores read like the other backends
+            return [(document_id, -rank, mark_matches(snippet)) for document_id, rank, snippet in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """Weighted tsvector expression with a GIN index, ranked with ts_rank_cd"""
+
+    def index(self, document, frequencies=None):
+        pass
+
+    def rebuild(self, documents):
+        pass
+
+    def search(self, query, limit, doc_types=None):
+        if not tokenize(query):
+            return []
+        type_sql, type_params = _type_filter(doc_types, 'doc_type')
+        headline = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=30, MinWords=12'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, ts_rank_cd({PG_VECTOR}, query, 32) AS rank, "
+                f"ts_headline('english', body, query, %s) "
+                f"FROM {SearchDocument._meta.db_table}, websearch_to_tsquery('english', %s) AS query "
+                f"WHERE ({PG_VECTOR}) @@ query{type_sql} ORDER BY rank DESC LIMIT %s",
+                [headline, query, *type_params, limit]
+            )
+            return [(document_id, rank, mark_matches(snippet)) for document_id, rank, snippet in cursor.fetchall()]
+
+
+_backend = None
+
+
+def get_backend():
+    """Pick the backend from SEARCH_BACKEND ('auto' uses what the database offers)"""
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if choice == 'auto':
+            if connection.vendor == 'postgresql':
+                choice = 'postgres'
+            elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+                choice = 'sqlite_fts5'
+            else:
+                choice = 'python'
+        _backend = {
+            'python': PythonBackend,
+            'sqlite_fts5': SQLiteFTSBackend,
+            'postgres': PostgresBackend,
+        }[choice]()
+    return _backend
@@ -0,0 +1,154 @@
+"""
+Search index maintenance and querying.
+
+Every searchable object (see sources.SEARCH_SOURCES) has one SearchDocument
+row holding its title, plain-text body and URL. Signals reindex an object
+when one of its indexed fields changes. search() asks the active backend
+for the top documents and returns ranked SearchHit tuples of mixed types,
+each with an HTML snippet.
+
+Results are cached for SEARCH_CACHE_TTL seconds under the normalized query,
+so repeated popular queries skip the database. Each document type has a
+generation counter in the cache, bumped whenever a document of that type
+changes. The counters are part of the cache key, so an edit makes the
+cached results that could include it unreachable at once.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+from .backends import get_backend, time_budget
+from .models import DOC_TYPES, SearchDocument
+from .sources import SEARCH_SOURCES, source_model
+from .text import analyze, document_terms, make_snippet
+
+MAX_QUERY_LENGTH = 200
+
+GENERATION_KEY = 'search:generation:{}'
+
+SearchHit = namedtuple('SearchHit', ['doc_type', 'type_label', 'object_id', 'title', 'url', 'snippet', 'score'])
+
+
+def generations(doc_types):
+    keys = [GENERATION_KEY.format(doc_type) for doc_type in doc_types]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def bump_generations(doc_types):
+    """Invalidate cached results for these document types once the current transaction commits"""
+    def bump():
+        for doc_type in doc_types:
+            key = GENERATION_KEY.format(doc_type)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Evicted between add and incr; cached results still expire with their TTL
+                pass
+    transaction.on_commit(bump)
+
+
+def _document_values(source, instance):
+    values = source.document(instance)
+    if values is None:
+        return None
+    title, body, url = values
+    terms = document_terms(title, body)
+    return {'title': title[:255], 'body': body, 'url': url, 'length': sum(terms.values())}, terms
+
+
+def index_instance(source, instance):
+    """Create, refresh or drop the document for one object"""
+    lookup = {'doc_type': source.doc_type, 'object_id': instance.pk}
+    prepared = _document_values(source, instance)
+    if prepared is None:
+        if SearchDocument.objects.filter(**lookup).delete()[0]:
+            bump_generations([source.doc_type])
+        return
+    values, terms = prepared
+
+    existing = SearchDocument.objects.filter(**lookup).first()
+    if existing is not None and all(getattr(existing, field) == value for field, value in values.items()):
+        return
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(defaults=values, **lookup)
+        get_backend().index(document, terms)
+    bump_generations([source.doc_type])
+
+
+def remove_instance(source, object_id):
+    if SearchDocument.objects.filter(doc_type=source.doc_type, object_id=object_id).delete()[0]:
+        bump_generations([source.doc_type])
+
+
+def rebuild():
+    """Reindex every searchable object from scratch; returns the document count"""
+    documents = []
+    for source in SEARCH_SOURCES:
+        for instance in source_model(source).objects.all().iterator():
+            prepared = _document_values(source, instance)
+            if prepared is not None:
+                documents.append(SearchDocument(doc_type=source.doc_type, object_id=instance.pk, **prepared[0]))
+
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        documents = SearchDocument.objects.bulk_create(documents, batch_size=500)
+        if documents and documents[0].pk is None:
+            # Backends without RETURNING; reload to get primary keys for the postings
+            documents = list(SearchDocument.objects.all())
+        get_backend().rebuild(documents)
+    bump_generations([doc_type for doc_type, _ in DOC_TYPES])
+    return len(documents)
+
+
+def normalize_query(query):
+    return ' '.join(query.split())[:MAX_QUERY_LENGTH]
+
+
+def _results_key(query, limit, doc_types):
+    searched = doc_types or [doc_type for doc_type, _ in DOC_TYPES]
+    raw = '|'.join([query.casefold(), str(limit), ','.join(doc_types)] + [str(g) for g in generations(searched)])
+    return 'search:results:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def search(query, limit=20, doc_types=None):
+    """
+    Ranked hits across all document types (or only `doc_types`).
+
+    Raises SearchTimeout when the backend runs past SEARCH_TIME_BUDGET.
+    """
+    query = normalize_query(query)
+    if not query:
+        return []
+    doc_types = sorted(set(doc_types or []))
+    key = _results_key(query, limit, doc_types)
+    hits = cache.get(key)
+    if hits is None:
+        hits = _search(query, limit, doc_types)
+        cache.set(key, hits, getattr(settings, 'SEARCH_CACHE_TTL', 60))
+    return hits
+
+
+def _search(query, limit, doc_types):
+    with time_budget(getattr(settings, 'SEARCH_TIME_BUDGET', None)):
+        ranked = get_backend().search(query, limit, doc_types)
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _, _ in ranked])
+
+    terms = analyze(query)
+    hits = []
+    for document_id, score, snippet in ranked:
+        document = documents.get(document_id)
+        if document is None:
+            continue
+        if snippet is None:
+            snippet = make_snippet(document.body, terms)
+        hits.append(SearchHit(
+            document.doc_type, document.get_doc_type_display(), document.object_id,
+            document.title, document.url, mark_safe(snippet), score
+        ))
+    return hits
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from search.backends import get_backend
+from search.engine import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from every searchable object'
+
+    def handle(self, *args, **options):
+        documents = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Indexed {documents} documents with {type(get_backend()).__name__}')
+        )
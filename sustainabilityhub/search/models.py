@@ -0,0 +1,40 @@
+from django.db import models
+
+
+DOC_TYPES = [
+    ('topic', 'Forum topic'),
+    ('project', 'Project'),
+    ('event', 'Event'),
+    ('resource', 'Resource'),
+    ('user', 'Member'),
+]
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one object, kept in step with the source row by signals"""
+    doc_type = models.CharField(max_length=20, choices=DOC_TYPES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=255)
+    length = models.PositiveIntegerField(default=0, help_text="Weighted term count, used for BM25 length normalization")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['doc_type', 'object_id']
+    
+    def __str__(self):
+        return f'{self.doc_type} {self.object_id}: {self.title}'
+
+
+class SearchPosting(models.Model):
+    """Inverted index entry: how often a term occurs in a document (pure-Python backend)"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField(help_text="Weighted occurrences; title matches count extra")
+    
+    class Meta:
+        unique_together = ['term', 'document']
+    
+    def __str__(self):
+        return f'{self.term} in {self.document_id} x{self.frequency}'
@@ -0,0 +1,82 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from profiles.models import Follow
+from . import typeahead
+from .engine import index_instance, remove_instance
+from .sources import SEARCH_SOURCES, source_model
+
+
+def _search_receivers(source):
+    def reindex(sender, instance, raw=False, update_fields=None, **kwargs):
+        # e.g. a login only saves last_login
+        if raw or (update_fields is not None and not set(update_fields) & set(source.fields)):
+            return
+        index_instance(source, instance)
+
+    def unindex(sender, instance, **kwargs):
+        remove_instance(source, instance.pk)
+
+    return reindex, unindex
+
+
+for _source in SEARCH_SOURCES:
+    _reindex, _unindex = _search_receivers(_source)
+    _model = source_model(_source)
+    post_save.connect(_reindex, sender=_model, weak=False, dispatch_uid=f'search_index_{_source.doc_type}')
+    post_delete.connect(_unindex, sender=_model, weak=False, dispatch_uid=f'search_unindex_{_source.doc_type}')
+
+
+def _typeahead_receivers(source):
+    def refresh(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and not set(update_fields) & set(source.fields)):
+            return
+        typeahead.update_entry(source, instance)
+
+    def drop(sender, instance, **kwargs):
+        typeahead.remove_entry(source, instance.pk)
+
+    return refresh, drop
+
+
+def _typeahead_weight_receiver(source, through):
+    field = apps.get_model(source.model)._meta.get_field(source.m2m)
+    owner_attname = field.m2m_field_name() + '_id'
+    target_attname = field.m2m_reverse_field_name() + '_id'
+
+    def reweigh(sender, instance, action, reverse, pk_set, **kwargs):
+        if action == 'post_add' and pk_set:
+            # pk_set only contains rows that were actually inserted
+            deltas = dict.fromkeys(pk_set, 1) if reverse else {instance.pk: len(pk_set)}
+            typeahead.adjust_weights(source.kind, deltas)
+        elif action in ('pre_remove', 'pre_clear'):
+            rows = through.objects.filter(**{target_attname if reverse else owner_attname: instance.pk})
+            if action == 'pre_remove':
+                rows = rows.filter(**{f'{owner_attname if reverse else target_attname}__in': pk_set})
+            deltas = Counter(rows.values_list(owner_attname, flat=True))
+            typeahead.adjust_weights(source.kind, {pk: -count for pk, count in deltas.items()})
+
+    return reweigh
+
+
+def _follow_weight(sender, instance, created=False, raw=False, signal=None, **kwargs):
+    if raw or (signal is post_save and not created):
+        return
+    typeahead.adjust_weights('user', {instance.following_id: 1 if signal is post_save else -1})
+
+
+for _source in typeahead.TYPEAHEAD_SOURCES:
+    _refresh, _drop = _typeahead_receivers(_source)
+    _model = apps.get_model(_source.model)
+    post_save.connect(_refresh, sender=_model, weak=False, dispatch_uid=f'typeahead_save_{_source.kind}')
+    post_delete.connect(_drop, sender=_model, weak=False, dispatch_uid=f'typeahead_delete_{_source.kind}')
+    if _source.m2m:
+        _through = getattr(_model, _source.m2m).through
+        m2m_changed.connect(
+            _typeahead_weight_receiver(_source, _through), sender=_through, weak=False,
+            dispatch_uid=f'typeahead_weight_{_source.kind}'
+        )
+
+post_save.connect(_follow_weight, sender=Follow, dispatch_uid='typeahead_follow_save')
+post_delete.connect(_follow_weight, sender=Follow, dispatch_uid='typeahead_follow_delete')
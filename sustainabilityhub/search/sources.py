@@ -0,0 +1,69 @@
+"""
+What gets indexed for each searchable model.
+
+Each source names the document type, the model, the fields whose changes
+require reindexing, and a function turning an instance into
+(title, body, url), or None when the object should not be searchable.
+"""
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import reverse
+
+from .text import clean
+
+SearchSource = namedtuple('SearchSource', ['doc_type', 'model', 'fields', 'document'])
+
+
+def _tags(tags):
+    if isinstance(tags, (list, tuple)):
+        return ' '.join(str(tag) for tag in tags)
+    return str(tags or '')
+
+
+def _topic(topic):
+    return topic.title, clean(topic.content), reverse('forums:topic_detail', kwargs={'pk': topic.pk})
+
+
+def _project(project):
+    body = f'{clean(project.description)} {_tags(project.tags)}'
+    return project.title, body, reverse('projects:detail', kwargs={'pk': project.pk})
+
+
+def _event(event):
+    body = f'{clean(event.description)} {event.location}'
+    return event.title, body, reverse('events:detail', kwargs={'pk': event.pk})
+
+
+def _resource(resource):
+    body = f'{clean(resource.description)} {_tags(resource.tags)}'
+    return resource.title, body, reverse('resources:detail', kwargs={'pk': resource.pk})
+
+
+def _user(user):
+    if not user.is_active:
+        return None
+    body = f'{user.get_full_name()} {clean(getattr(user, "bio", ""))}'
+    return user.username, body, reverse('profiles:detail', kwargs={'username': user.username})
+
+
+SEARCH_SOURCES = [
+    SearchSource('topic', 'forums.Topic', ['title', 'content'], _topic),
+    SearchSource('project', 'projects.Project', ['title', 'description', 'tags'], _project),
+    SearchSource('event', 'events.Event', ['title', 'description', 'location'], _event),
+    SearchSource('resource', 'resources.Resource', ['title', 'description', 'tags'], _resource),
+    SearchSource('user', settings.AUTH_USER_MODEL, ['username', 'first_name', 'last_name', 'bio', 'is_active'], _user),
+]
+
+
+def source_for(model):
+    label = model._meta.label_lower
+    for source in SEARCH_SOURCES:
+        if source.model.lower() == label:
+            return source
+    return None
+
+
+def source_model(source):
+    return apps.get_model(source.model)
@@ -0,0 +1,150 @@
+"""
+Text analysis for the search index: tokenizing, stop words, stemming and
+snippets. Documents and queries go through the same analyze() so their
+terms match.
+"""
+import html
+import re
+from collections import Counter
+
+from django.utils.html import escape, strip_tags
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or
+so that the their then there these this to was were will with
+""".split())
+
+VOWELS = frozenset('aeiou')
+
+# Porter step 2/3 suffixes, applied when the remaining stem has measure > 0
+SUFFIX_RULES = [
+    ('ational', 'ate'), ('tional', 'tion'), ('ization', 'ize'), ('iveness', 'ive'),
+    ('fulness', 'ful'), ('ousness', 'ous'), ('ation', 'ate'), ('alism', 'al'),
+    ('aliti', 'al'), ('iviti', 'ive'), ('biliti', 'ble'), ('icate', 'ic'),
+    ('ative', ''), ('alize', 'al'), ('iciti', 'ic'), ('ical', 'ic'), ('ness', ''),
+    ('ful', ''), ('ator', 'ate'), ('ement', ''), ('ment', ''),
+]
+
+# Title matches count this many times a body match
+TITLE_WEIGHT = 4
+
+# Marks a match in snippets built by the database backends; escaped text never contains them
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+
+
+def clean(text):
+    """Plain text from stored content, which may be HTML from the rich text editor"""
+    return ' '.join(html.unescape(strip_tags(text or '')).split())
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TERM_LENGTH
+    ]
+
+
+def _is_consonant(word, i):
+    if word[i] in VOWELS:
+        return False
+    if word[i] == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    """Number of vowel-consonant sequences, the m in Porter's [C](VC)^m[V]"""
+    forms = ''.join('c' if _is_consonant(stem, i) else 'v' for i in range(len(stem)))
+    return forms.count('vc')
+
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_cvc(word):
+    return (
+        len(word) >= 3 and _is_consonant(word, -3) and not _is_consonant(word, -2)
+        and _is_consonant(word, -1) and word[-1] not in 'wxy'
+    )
+
+
+def stem(word):
+    """Light Porter stemmer: plurals, -ed/-ing, -y and the common derivational suffixes"""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ing', 'ed'):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif len(word) > 1 and word[-1] == word[-2] and word[-1] not in 'lsz' and _is_consonant(word, -1):
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += 'e'
+                break
+
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    for suffix, replacement in SUFFIX_RULES:
+        if word.endswith(suffix):
+            if _measure(word[:-len(suffix)]) > 0:
+                word = word[:-len(suffix)] + replacement
+            break
+    return word
+
+
+def analyze(text):
+    """Index terms for a piece of text"""
+    return [stem(token) for token in tokenize(text)]
+
+
+def document_terms(title, body):
+    """{term: weighted frequency} for a document"""
+    frequencies = Counter(analyze(body))
+    for term in analyze(title):
+        frequencies[term] += TITLE_WEIGHT
+    return frequencies
+
+
+def make_snippet(text, terms, words=24):
+    """Escaped HTML excerpt of `text` around the first match of `terms`, with matches in <mark>"""
+    matches = list(TOKEN_RE.finditer(text))
+    if not matches:
+        return ''
+    terms = set(terms)
+    hits = [i for i, match in enumerate(matches) if stem(match.group().lower()) in terms]
+    first = max((hits[0] if hits else 0) - words // 3, 0)
+    hits = set(hits)
+    window = matches[first:first + words]
+
+    parts = ['…' if first else '']
+    position = window[0].start()
+    for i, match in enumerate(window, start=first):
+        parts.append(escape(text[position:match.start()]))
+        word = escape(match.group())
+        parts.append(f'<mark>{word}</mark>' if i in hits else word)
+        position = match.end()
+    if first + words < len(matches):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def mark_matches(snippet):
+    """Escape a database-built snippet and turn its match markers into <mark>"""
+    return escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
@@ -0,0 +1,301 @@
+"""
+In-memory prefix index for autocomplete.
+
+Members (username and name), hashtags, project titles and event titles are
+entries with a popularity weight: followers, tagged posts, members and
+participants. Every word of an entry's label is a key in one sorted list of
+(key, entry) pairs, so the entries for a prefix are one bisect away. The
+matches are ranked by weight. The one- and two-letter prefixes have the most
+matches, so their rankings are memoized until the next write that touches
+them.
+
+Each process builds its index the first time it is used. Signals publish
+every committed change to a change log in the shared cache: the change
+takes the next version number and is stored under it for LOG_TTL seconds.
+Every process, the writer included, replays the changes after the last
+version it applied, in order. Others check at most every TYPEAHEAD_REFRESH
+seconds. A process only rebuilds its copy when it cannot replay: it is more
+than LOG_SIZE changes behind, a change has expired or never appeared, or
+the version counter was lost.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.urls import reverse
+
+Entry = namedtuple('Entry', ['kind', 'object_id', 'label', 'detail', 'url', 'weight'])
+# `m2m` names the many-to-many field whose size is the weight, if any
+TypeaheadSource = namedtuple('TypeaheadSource', ['kind', 'model', 'fields', 'm2m', 'load', 'entry'])
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+MEMO_LENGTH = 2
+MEMO_SIZE = 100
+VERSION_KEY = 'typeahead:version'
+CHANGE_KEY = 'typeahead:change:{}'
+LOG_SIZE = 1000  # Changes a process may replay before it rebuilds instead
+LOG_TTL = 60 * 60
+KINDS = ['user', 'hashtag', 'project', 'event']
+
+
+def words(text):
+    return WORD_RE.findall((text or '').casefold())
+
+
+def _user_entry(user, weight=0):
+    if not user.is_active:
+        return None
+    return Entry('user', user.pk, user.username, user.get_full_name(),
+                 reverse('profiles:detail', kwargs={'username': user.username}), weight)
+
+
+def _hashtag_entry(hashtag, weight=0):
+    return Entry('hashtag', hashtag.pk, hashtag.name, '',
+                 f"{reverse('community:dashboard')}?hashtag={hashtag.name}", weight)
+
+
+def _project_entry(project, weight=0):
+    return Entry('project', project.pk, project.title, project.get_status_display(),
+                 reverse('projects:detail', kwargs={'pk': project.pk}), weight)
+
+
+def _event_entry(event, weight=0):
+    return Entry('event', event.pk, event.title, event.location,
+                 reverse('events:detail', kwargs={'pk': event.pk}), weight)
+
+
+def _load_users(model):
+    rows = model.objects.filter(is_active=True).values_list('pk', 'counters__followers')
+    weights = {pk: followers or 0 for pk, followers in rows}
+    return model.objects.filter(pk__in=weights), weights
+
+
+def _load_counted(relation):
+    def load(model):
+        weights = dict(model.objects.annotate(weight=Count(relation)).values_list('pk', 'weight'))
+        return model.objects.all(), weights
+    return load
+
+
+TYPEAHEAD_SOURCES = [
+    TypeaheadSource('user', settings.AUTH_USER_MODEL, ['username', 'first_name', 'last_name', 'is_active'],
+                    None, _load_users, _user_entry),
+    TypeaheadSource('hashtag', 'community.HashTag', ['name'], 'posts', _load_counted('posts'), _hashtag_entry),
+    TypeaheadSource('project', 'projects.Project', ['title', 'status'], 'members',
+                    _load_counted('members'), _project_entry),
+    TypeaheadSource('event', 'events.Event', ['title', 'location'], 'participants',
+                    _load_counted('participants'), _event_entry),
+]
+
+
+class PrefixIndex:
+    """Sorted (word, entry key) pairs over weighted entries"""
+
+    def __init__(self):
+        self.entries = {}
+        self.keys = []
+        self.memo = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def entry_words(entry):
+        return set(words(entry.label)) | set(words(entry.detail if entry.kind == 'user' else ''))
+
+    def load(self, entries):
+        with self.lock:
+            self.entries = {(entry.kind, entry.object_id): entry for entry in entries}
+            self.keys = sorted(
+                (word, ref) for ref, entry in self.entries.items() for word in self.entry_words(entry)
+            )
+            self.memo = {}
+
+    def put(self, entry):
+        ref = (entry.kind, entry.object_id)
+        with self.lock:
+            self.discard(*ref)
+            self.entries[ref] = entry
+            for word in self.entry_words(entry):
+                insort(self.keys, (word, ref))
+            self._forget(self.entry_words(entry))
+
+    def discard(self, kind, object_id):
+        ref = (kind, object_id)
+        with self.lock:
+            entry = self.entries.pop(ref, None)
+            if entry is None:
+                return
+            for word in self.entry_words(entry):
+                i = bisect_left(self.keys, (word, ref))
+                if i < len(self.keys) and self.keys[i] == (word, ref):
+                    del self.keys[i]
+            self._forget(self.entry_words(entry))
+
+    def reweight(self, kind, object_id, delta):
+        with self.lock:
+            entry = self.entries.get((kind, object_id))
+            if entry is not None:
+                self.entries[(kind, object_id)] = entry._replace(weight=max(entry.weight + delta, 0))
+                self._forget(self.entry_words(entry))
+
+    def _forget(self, changed_words):
+        """Drop memoized rankings for prefixes of the changed words"""
+        prefixes = {word[:n] for word in changed_words for n in range(1, MEMO_LENGTH + 1)}
+        if prefixes & {prefix for prefix, _ in self.memo}:
+            self.memo = {key: ranked for key, ranked in self.memo.items() if key[0] not in prefixes}
+
+    def _matching(self, prefix):
+        lo = bisect_left(self.keys, (prefix,))
+        hi = bisect_left(self.keys, (prefix + '\U0010ffff',))
+        return {ref for _, ref in self.keys[lo:hi]}
+
+    def _rank(self, refs, kinds):
+        if kinds:
+            refs = [ref for ref in refs if ref[0] in kinds]
+        return sorted(refs, key=lambda ref: (-self.entries[ref].weight, self.entries[ref].label.casefold(), ref))
+
+    def lookup(self, query, kinds=None, limit=10):
+        """Entries with a word starting with each word of `query`, most popular first"""
+        terms = sorted(set(words(query)), key=len, reverse=True)
+        if not terms:
+            return []
+        kinds = tuple(sorted(kinds)) if kinds else ()
+        with self.lock:
+            if len(terms) == 1 and len(terms[0]) <= MEMO_LENGTH and limit and limit <= MEMO_SIZE:
+                key = (terms[0], kinds)
+                if key not in self.memo:
+                    self.memo[key] = self._rank(self._matching(terms[0]), kinds)[:MEMO_SIZE]
+                ranked = self.memo[key]
+            else:
+                refs = self._matching(terms[0])
+                for term in terms[1:]:
+                    refs &= self._matching(term)
+                ranked = self._rank(refs, kinds)
+            return [self.entries[ref] for ref in ranked[:limit]]
+
+
+_index = None
+_version = None
+_checked_at = 0.0
+# Log key found missing while replaying, and when; its writer may not have stored it yet
+_gap = None
+_lock = threading.Lock()
+
+
+def build_index():
+    entries = []
+    for source in TYPEAHEAD_SOURCES:
+        model = apps.get_model(source.model)
+        objects, weights = source.load(model)
+        for obj in objects.iterator():
+            entry = source.entry(obj, weights.get(obj.pk, 0))
+            if entry is not None:
+                entries.append(entry)
+    index = PrefixIndex()
+    index.load(entries)
+    return index
+
+
+def apply_change(index, change):
+    """Apply one logged change: ('put', kind, id, label, detail, url), ('discard', kind, id) or ('reweight', kind, deltas)"""
+    operation, kind, *args = change
+    if operation == 'put':
+        object_id, label, detail, url = args
+        current = index.entries.get((kind, object_id))
+        index.put(Entry(kind, object_id, label, detail, url, current.weight if current else 0))
+    elif operation == 'discard':
+        index.discard(kind, args[0])
+    else:
+        for object_id, delta in args[0].items():
+            index.reweight(kind, object_id, delta)
+
+
+def _rebuild(version):
+    # Changes logged while this loads are replayed on top of it. A put or
+    # discard is idempotent; a reweight may count twice until the next rebuild.
+    global _index, _version, _gap
+    _index = build_index()
+    _version = version
+    _gap = None
+
+
+def _replay(version, now):
+    """Apply the logged changes up to `version`; rebuild if one is gone for good"""
+    global _version, _gap
+    keys = [CHANGE_KEY.format(number) for number in range(_version + 1, version + 1)]
+    changes = cache.get_many(keys)
+    for key in keys:
+        if key not in changes:
+            if _gap is not None and _gap[0] == key and now - _gap[1] >= getattr(settings, 'TYPEAHEAD_REFRESH', 30):
+                _rebuild(version)
+            elif _gap is None or _gap[0] != key:
+                _gap = (key, now)
+            return
+        apply_change(_index, changes[key])
+        _version += 1
+    _gap = None
+
+
+def get_index():
+    """This process's index, with the changes other processes logged since the last check"""
+    global _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < getattr(settings, 'TYPEAHEAD_REFRESH', 30):
+        return _index
+    with _lock:
+        version = cache.get(VERSION_KEY, 0)
+        if _index is None or version < _version or version - _version > LOG_SIZE:
+            _rebuild(version)
+        elif version > _version:
+            _replay(version, now)
+        _checked_at = now
+    return _index
+
+
+def _publish(change):
+    """Log a change once the current transaction commits"""
+    def publish():
+        global _checked_at
+        cache.add(VERSION_KEY, 0, None)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            # The counter was evicted; every process rebuilds on its next check
+            return
+        cache.set(CHANGE_KEY.format(version), change, LOG_TTL)
+        # The writer reads its own change at its next lookup
+        _checked_at = 0.0
+    transaction.on_commit(publish)
+
+
+def update_entry(source, instance):
+    entry = source.entry(instance)
+    if entry is None:
+        _publish(('discard', source.kind, instance.pk))
+    else:
+        _publish(('put', entry.kind, entry.object_id, entry.label, entry.detail, entry.url))
+
+
+def remove_entry(source, object_id):
+    _publish(('discard', source.kind, object_id))
+
+
+def adjust_weights(kind, deltas):
+    """Apply {object_id: change} to the weights of `kind` entries"""
+    if deltas:
+        _publish(('reweight', kind, dict(deltas)))
+
+
+def autocomplete(query, kinds=None, limit=10):
+    return get_index().lookup(query, kinds, limit)
+
+
+def matching_ids(kind, query, limit=None):
+    """Ids of `kind` entries matching `query`, best first"""
+    return [entry.object_id for entry in get_index().lookup(query, [kind], limit)]
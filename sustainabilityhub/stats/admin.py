@@ -0,0 +1,21 @@
+from django.contrib import admin
+from .models import SiteStatsSnapshot, UserCounters
+
+
+@admin.register(SiteStatsSnapshot)
+class SiteStatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['total_users', 'total_projects', 'total_topics', 'total_events', 'total_resources', 'pending_reports', 'refreshed_at']
+    readonly_fields = [field.name for field in SiteStatsSnapshot._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(UserCounters)
+class UserCountersAdmin(admin.ModelAdmin):
+    list_display = ['user', 'projects_created', 'projects_joined', 'topics_created', 'forum_posts', 'community_posts', 'followers', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = [field.name for field in UserCounters._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,200 @@
+"""
+Counter definitions backing SiteStatsSnapshot and UserCounters.
+
+Each counter names the column it feeds, the model it counts, the instance
+attributes its predicate depends on, a predicate used by the signal handlers
+to compute +1/-1 deltas, and the queryset used for a full recount. Per-user
+counters also name the foreign key pointing at the user being counted.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+
+SiteCounter = namedtuple('SiteCounter', ['field', 'model', 'fields', 'test', 'query'])
+
+WEEK = timedelta(days=7)
+INACTIVE_AFTER = timedelta(days=30)
+
+
+def _model(label):
+    return apps.get_model(label)
+
+
+def _always(values, now):
+    return True
+
+
+def _within_week(attname):
+    def test(values, now):
+        value = values.get(attname)
+        return value is not None and value >= now - WEEK
+    return test
+
+
+def _created_this_week(label):
+    return lambda now: _model(label).objects.filter(created_at__gte=now - WEEK)
+
+
+def _user_joined_today(values, now):
+    joined = values.get('date_joined')
+    return joined is not None and timezone.localtime(joined).date() == timezone.localdate(now)
+
+
+def _user_needs_attention(values, now):
+    last_login = values.get('last_login')
+    return bool(values.get('is_active')) and last_login is not None and last_login < now - INACTIVE_AFTER
+
+
+def _active_project_this_week(values, now):
+    updated_at = values.get('updated_at')
+    return values.get('status') == 'active' and updated_at is not None and updated_at >= now - WEEK
+
+
+SITE_COUNTERS = [
+    # Projects
+    SiteCounter('total_projects', 'projects.Project', [], _always,
+                lambda now: _model('projects.Project').objects.all()),
+    SiteCounter('active_projects', 'projects.Project', ['status'],
+                lambda values, now: values.get('status') == 'active',
+                lambda now: _model('projects.Project').objects.filter(status='active')),
+    SiteCounter('active_projects_week', 'projects.Project', ['status', 'updated_at'], _active_project_this_week,
+                lambda now: _model('projects.Project').objects.filter(status='active', updated_at__gte=now - WEEK)),
+    SiteCounter('new_projects_week', 'projects.Project', ['created_at'], _within_week('created_at'),
+                _created_this_week('projects.Project')),
+
+    # Forum topics
+    SiteCounter('total_topics', 'forums.Topic', [], _always,
+                lambda now: _model('forums.Topic').objects.all()),
+    SiteCounter('locked_topics', 'forums.Topic', ['is_locked'],
+                lambda values, now: bool(values.get('is_locked')),
+                lambda now: _model('forums.Topic').objects.filter(is_locked=True)),
+    SiteCounter('new_topics_week', 'forums.Topic', ['created_at'], _within_week('created_at'),
+                _created_this_week('forums.Topic')),
+
+    # Events
+    SiteCounter('total_events', 'events.Event', [], _always,
+                lambda now: _model('events.Event').objects.all()),
+    SiteCounter('upcoming_events', 'events.Event', ['start_date'],
+                lambda values, now: values.get('start_date') is not None and values['start_date'] >= now,
+                lambda now: _model('events.Event').objects.filter(start_date__gte=now)),
+    SiteCounter('new_events_week', 'events.Event', ['created_at'], _within_week('created_at'),
+                _created_this_week('events.Event')),
+
+    # Resources
+    SiteCounter('total_resources', 'resources.Resource', [], _always,
+                lambda now: _model('resources.Resource').objects.all()),
+
+    # Users
+    SiteCounter('all_users', settings.AUTH_USER_MODEL, [], _always,
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.all()),
+    SiteCounter('total_users', settings.AUTH_USER_MODEL, ['is_active'],
+                lambda values, now: bool(values.get('is_active')),
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.filter(is_active=True)),
+    SiteCounter('inactive_users', settings.AUTH_USER_MODEL, ['is_active'],
+                lambda values, now: not values.get('is_active'),
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.filter(is_active=False)),
+    SiteCounter('new_members_week', settings.AUTH_USER_MODEL, ['date_joined'], _within_week('date_joined'),
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.filter(date_joined__gte=now - WEEK)),
+    SiteCounter('new_users_today', settings.AUTH_USER_MODEL, ['date_joined'], _user_joined_today,
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.filter(date_joined__date=timezone.localdate(now))),
+    SiteCounter('users_needing_attention', settings.AUTH_USER_MODEL, ['is_active', 'last_login'], _user_needs_attention,
+                lambda now: _model(settings.AUTH_USER_MODEL).objects.filter(
+                    is_active=True, last_login__lt=now - INACTIVE_AFTER
+                )),
+
+    # Reports
+    SiteCounter('pending_reports', 'rms.Report', ['status'],
+                lambda values, now: values.get('status') == 'pending',
+                lambda now: _model('rms.Report').objects.filter(status='pending')),
+]
+
+
+def counters_for(model):
+    """Return the counters that track the given model class"""
+    label = model._meta.label_lower
+    return [counter for counter in SITE_COUNTERS if counter.model.lower() == label]
+
+
+def tracked_models():
+    """Return the distinct model classes tracked by SITE_COUNTERS"""
+    seen = {}
+    for counter in SITE_COUNTERS:
+        model = _model(counter.model)
+        seen[model._meta.label_lower] = model
+    return list(seen.values())
+
+
+UserCounter = namedtuple('UserCounter', ['field', 'model', 'user_field', 'fields', 'test', 'query'])
+UserM2MCounter = namedtuple('UserM2MCounter', ['field', 'model', 'm2m_field', 'query'])
+
+
+USER_COUNTERS = [
+    # Projects
+    UserCounter('projects_created', 'projects.Project', 'creator', [], _always,
+                lambda user: _model('projects.Project').objects.filter(creator=user)),
+    UserCounter('projects_active', 'projects.Project', 'creator', ['status'],
+                lambda values, now: values.get('status') == 'active',
+                lambda user: _model('projects.Project').objects.filter(creator=user, status='active')),
+
+    # Forums
+    UserCounter('topics_created', 'forums.Topic', 'author', [], _always,
+                lambda user: _model('forums.Topic').objects.filter(author=user)),
+    UserCounter('forum_posts', 'forums.TopicPost', 'author', [], _always,
+                lambda user: _model('forums.TopicPost').objects.filter(author=user)),
+
+    # Community
+    UserCounter('community_posts', 'community.Post', 'author', [], _always,
+                lambda user: _model('community.Post').objects.filter(author=user)),
+    UserCounter('community_comments', 'community.Comment', 'author', [], _always,
+                lambda user: _model('community.Comment').objects.filter(author=user)),
+
+    # Events and resources
+    UserCounter('events_created', 'events.Event', 'organizer', [], _always,
+                lambda user: _model('events.Event').objects.filter(organizer=user)),
+    UserCounter('resources_shared', 'resources.Resource', 'author', [], _always,
+                lambda user: _model('resources.Resource').objects.filter(author=user)),
+
+    # Follows
+    UserCounter('followers', 'profiles.Follow', 'following', [], _always,
+                lambda user: _model('profiles.Follow').objects.filter(following=user)),
+    UserCounter('following', 'profiles.Follow', 'follower', [], _always,
+                lambda user: _model('profiles.Follow').objects.filter(follower=user)),
+
+    # Warnings
+    UserCounter('warnings_total', 'accounts.UserWarning', 'user', [], _always,
+                lambda user: _model('accounts.UserWarning').objects.filter(user=user)),
+    UserCounter('active_warnings', 'accounts.UserWarning', 'user', ['is_active'],
+                lambda values, now: bool(values.get('is_active')),
+                lambda user: _model('accounts.UserWarning').objects.filter(user=user, is_active=True)),
+    UserCounter('unviewed_warnings', 'accounts.UserWarning', 'user', ['is_active', 'viewed_at'],
+                lambda values, now: bool(values.get('is_active')) and values.get('viewed_at') is None,
+                lambda user: _model('accounts.UserWarning').objects.filter(
+                    user=user, is_active=True, viewed_at__isnull=True
+                )),
+]
+
+USER_M2M_COUNTERS = [
+    UserM2MCounter('projects_joined', 'projects.Project', 'members',
+                   lambda user: _model('projects.Project').objects.filter(members=user)),
+    UserM2MCounter('events_attending', 'events.Event', 'participants',
+                   lambda user: _model('events.Event').objects.filter(participants=user)),
+]
+
+
+def user_counters_for(model):
+    """Return the per-user counters that track the given model class"""
+    label = model._meta.label_lower
+    return [counter for counter in USER_COUNTERS if counter.model.lower() == label]
+
+
+def user_tracked_models():
+    """Return the distinct model classes tracked by USER_COUNTERS"""
+    seen = {}
+    for counter in USER_COUNTERS:
+        model = _model(counter.model)
+        seen[model._meta.label_lower] = model
+    return list(seen.values())
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from stats.models import UserCounters
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recounts per-user activity counters and reports drift from the incremental counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild these users (default: everyone)')
+
+    def handle(self, *args, **options):
+        users = User.objects.select_related('counters')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        
+        fields = UserCounters.counter_fields()
+        rebuilt = drifted = 0
+        for user in users.iterator():
+            try:
+                previous = {field: getattr(user.counters, field) for field in fields}
+            except UserCounters.DoesNotExist:
+                previous = None
+            
+            counters = UserCounters.rebuild(user)
+            rebuilt += 1
+            if previous is None:
+                continue
+            
+            changes = [
+                f'{field}: {previous[field]} -> {getattr(counters, field)}'
+                for field in fields if previous[field] != getattr(counters, field)
+            ]
+            if changes:
+                drifted += 1
+                self.stdout.write(self.style.WARNING(f'[-] {user.username}: ' + ', '.join(changes)))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'\nRebuilt counters for {rebuilt} users. {drifted} users corrected.')
+        )
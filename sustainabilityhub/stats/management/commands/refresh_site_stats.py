@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from stats.counters import SITE_COUNTERS
+from stats.models import SiteStatsSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Recounts the site stats snapshot and reports drift from the incremental counters'
+
+    def handle(self, *args, **options):
+        previous = SiteStatsSnapshot.objects.filter(pk=SiteStatsSnapshot.SINGLETON_PK).first()
+        snapshot = SiteStatsSnapshot.rebuild()
+        
+        drifted = 0
+        for counter in SITE_COUNTERS:
+            new_value = getattr(snapshot, counter.field)
+            old_value = getattr(previous, counter.field) if previous else None
+            if old_value is not None and old_value != new_value:
+                drifted += 1
+                self.stdout.write(
+                    self.style.WARNING(f'[-] {counter.field}: {old_value} -> {new_value}')
+                )
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'\nSite stats refreshed. {drifted} counters corrected.')
+        )
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_projects', models.IntegerField(default=0)),
+                ('active_projects', models.IntegerField(default=0)),
+                ('active_projects_week', models.IntegerField(default=0)),
+                ('new_projects_week', models.IntegerField(default=0)),
+                ('total_topics', models.IntegerField(default=0)),
+                ('locked_topics', models.IntegerField(default=0)),
+                ('new_topics_week', models.IntegerField(default=0)),
+                ('total_events', models.IntegerField(default=0)),
+                ('upcoming_events', models.IntegerField(default=0)),
+                ('new_events_week', models.IntegerField(default=0)),
+                ('total_resources', models.IntegerField(default=0)),
+                ('all_users', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0, help_text='Active users')),
+                ('inactive_users', models.IntegerField(default=0)),
+                ('new_members_week', models.IntegerField(default=0)),
+                ('new_users_today', models.IntegerField(default=0)),
+                ('users_needing_attention', models.IntegerField(default=0, help_text='Active users not seen for 30 days')),
+                ('pending_reports', models.IntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, help_text='Last full recount', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Site stats snapshot',
+            },
+        ),
+    ]
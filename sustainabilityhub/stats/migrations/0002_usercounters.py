@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('projects_created', models.IntegerField(default=0)),
+                ('projects_active', models.IntegerField(default=0, help_text='Created projects with status active')),
+                ('projects_joined', models.IntegerField(default=0)),
+                ('topics_created', models.IntegerField(default=0)),
+                ('forum_posts', models.IntegerField(default=0)),
+                ('community_posts', models.IntegerField(default=0)),
+                ('community_comments', models.IntegerField(default=0)),
+                ('events_created', models.IntegerField(default=0)),
+                ('events_attending', models.IntegerField(default=0)),
+                ('resources_shared', models.IntegerField(default=0)),
+                ('followers', models.IntegerField(default=0)),
+                ('following', models.IntegerField(default=0)),
+                ('warnings_total', models.IntegerField(default=0)),
+                ('active_warnings', models.IntegerField(default=0)),
+                ('unviewed_warnings', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User counters',
+            },
+        ),
+    ]
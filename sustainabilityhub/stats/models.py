@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class SiteStatsSnapshot(models.Model):
+    """Single precomputed row of site-wide counts read by the home page"""
+    SINGLETON_PK = 1
+    REBUILD_LOCK_KEY = 'stats:site_snapshot:rebuild'
+
+    # Projects
+    total_projects = models.IntegerField(default=0)
+    active_projects = models.IntegerField(default=0)
+    active_projects_week = models.IntegerField(default=0)
+    new_projects_week = models.IntegerField(default=0)
+
+    # Forum topics
+    total_topics = models.IntegerField(default=0)
+    locked_topics = models.IntegerField(default=0)
+    new_topics_week = models.IntegerField(default=0)
+
+    # Events
+    total_events = models.IntegerField(default=0)
+    upcoming_events = models.IntegerField(default=0)
+    new_events_week = models.IntegerField(default=0)
+
+    # Resources
+    total_resources = models.IntegerField(default=0)
+
+    # Users
+    all_users = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0, help_text="Active users")
+    inactive_users = models.IntegerField(default=0)
+    new_members_week = models.IntegerField(default=0)
+    new_users_today = models.IntegerField(default=0)
+    users_needing_attention = models.IntegerField(default=0, help_text="Active users not seen for 30 days")
+
+    # Reports
+    pending_reports = models.IntegerField(default=0)
+
+    refreshed_at = models.DateTimeField(null=True, blank=True, help_text="Last full recount")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Site stats snapshot'
+
+    def __str__(self):
+        return f'Site stats (refreshed {self.refreshed_at})'
+
+    @classmethod
+    def get(cls):
+        """Return the snapshot row, building it on first use"""
+        snapshot = cls.objects.filter(pk=cls.SINGLETON_PK).first()
+        if snapshot is None:
+            return cls.rebuild()
+
+        # Time-window counters only age out on a recount; if the periodic
+        # refresh_site_stats job is not running, let one request do it.
+        max_age = getattr(settings, 'SITE_STATS_MAX_AGE', None)
+        if max_age and snapshot.is_stale(max_age) and cache.add(cls.REBUILD_LOCK_KEY, True, timeout=60):
+            snapshot = cls.rebuild()
+        return snapshot
+
+    def is_stale(self, max_age):
+        if self.refreshed_at is None:
+            return True
+        return (timezone.now() - self.refreshed_at).total_seconds() > max_age
+
+    @classmethod
+    def rebuild(cls, now=None):
+        """Recount every counter from the source tables and store the result"""
+        from .counters import SITE_COUNTERS
+
+        now = now or timezone.now()
+        values = {counter.field: counter.query(now).count() for counter in SITE_COUNTERS}
+        values['refreshed_at'] = now
+
+        with transaction.atomic():
+            snapshot, _ = cls.objects.update_or_create(pk=cls.SINGLETON_PK, defaults=values)
+        return snapshot
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Atomically add the given per-field deltas to the snapshot row"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        cls.objects.filter(pk=cls.SINGLETON_PK).update(
+            **{field: F(field) + delta for field, delta in deltas.items()},
+            updated_at=timezone.now()
+        )
+
+
+class UserCounters(models.Model):
+    """Denormalized per-user activity counts shared by profile and stats views"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='counters')
+
+    projects_created = models.IntegerField(default=0)
+    projects_active = models.IntegerField(default=0, help_text="Created projects with status active")
+    projects_joined = models.IntegerField(default=0)
+    topics_created = models.IntegerField(default=0)
+    forum_posts = models.IntegerField(default=0)
+    community_posts = models.IntegerField(default=0)
+    community_comments = models.IntegerField(default=0)
+    events_created = models.IntegerField(default=0)
+    events_attending = models.IntegerField(default=0)
+    resources_shared = models.IntegerField(default=0)
+    followers = models.IntegerField(default=0)
+    following = models.IntegerField(default=0)
+    warnings_total = models.IntegerField(default=0)
+    active_warnings = models.IntegerField(default=0)
+    unviewed_warnings = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'User counters'
+
+    def __str__(self):
+        return f'Counters for user {self.user_id}'
+
+    @classmethod
+    def counter_fields(cls):
+        from .counters import USER_COUNTERS, USER_M2M_COUNTERS
+        return [counter.field for counter in USER_COUNTERS + USER_M2M_COUNTERS]
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the counters row for a user, building it from source tables if missing"""
+        try:
+            return user.counters
+        except cls.DoesNotExist:
+            return cls.rebuild(user)
+
+    @classmethod
+    def for_users(cls, users):
+        """Return {user_id: counters} for many users in one query (plus rebuilds for missing rows)"""
+        users = list(users)
+        rows = {row.user_id: row for row in cls.objects.filter(user__in=users)}
+        for user in users:
+            if user.pk not in rows:
+                rows[user.pk] = cls.rebuild(user)
+        return rows
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recount every counter for one user and store the result"""
+        from .counters import USER_COUNTERS, USER_M2M_COUNTERS
+
+        values = {counter.field: counter.query(user).count() for counter in USER_COUNTERS + USER_M2M_COUNTERS}
+        with transaction.atomic():
+            counters, _ = cls.objects.update_or_create(user=user, defaults=values)
+        user.counters = counters
+        return counters
+
+    @classmethod
+    def apply_deltas(cls, user_id, deltas):
+        """Atomically add the given per-field deltas to one user's row"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas or user_id is None:
+            return
+
+        cls.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()},
+            updated_at=timezone.now()
+        )
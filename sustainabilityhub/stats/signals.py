@@ -0,0 +1,176 @@
+from collections import Counter, defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.db.models.base import DEFERRED
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
+from django.utils import timezone
+from .counters import (
+    counters_for, tracked_models, user_counters_for, user_tracked_models, USER_M2M_COUNTERS
+)
+from .models import SiteStatsSnapshot, UserCounters
+
+
+def _user_attname(model, counter):
+    return model._meta.get_field(counter.user_field).attname
+
+
+def _tracked_attnames(model, counters, user_counters):
+    names = set()
+    for counter in counters:
+        names.update(counter.fields)
+    for counter in user_counters:
+        names.update(counter.fields)
+        names.add(_user_attname(model, counter))
+    return names
+
+
+# model class -> (site counters, user counters, attnames), built once since post_init is hot
+_TRACKED = {}
+for _model in set(tracked_models()) | set(user_tracked_models()):
+    _site = counters_for(_model)
+    _user = user_counters_for(_model)
+    _TRACKED[_model] = (_site, _user, _tracked_attnames(_model, _site, _user))
+
+
+def _current_values(instance, attnames):
+    return {name: instance.__dict__.get(name, DEFERRED) for name in attnames}
+
+
+def _is_deferred(values, names):
+    return any(values.get(name) is DEFERRED for name in names)
+
+
+def remember_tracked_values(sender, instance, **kwargs):
+    """Keep the loaded values of counted fields so saves can compute deltas"""
+    attnames = _TRACKED[sender][2]
+    if attnames:
+        instance._stats_values = _current_values(instance, attnames)
+
+
+def count_saved_instance(sender, instance, created, raw=False, **kwargs):
+    """Apply +1/-1 deltas to the site snapshot and per-user counters for a saved row"""
+    if raw:
+        return
+
+    site_counters, user_counters, attnames = _TRACKED[sender]
+    before = getattr(instance, '_stats_values', None)
+    after = _current_values(instance, attnames)
+    now = timezone.now()
+
+    site_deltas = {}
+    for counter in site_counters:
+        if created:
+            was_counted = False
+        elif before is None or _is_deferred(before, counter.fields):
+            # Loaded with .only()/.defer(); leave it to the periodic recount
+            continue
+        else:
+            was_counted = counter.test(before, now)
+        site_deltas[counter.field] = int(counter.test(after, now)) - int(was_counted)
+
+    user_deltas = defaultdict(dict)
+    for counter in user_counters:
+        user_attname = _user_attname(sender, counter)
+        if created:
+            was_counted, old_user = False, None
+        elif before is None or _is_deferred(before, counter.fields + [user_attname]):
+            continue
+        else:
+            was_counted, old_user = counter.test(before, now), before[user_attname]
+        is_counted, new_user = counter.test(after, now), after[user_attname]
+
+        if was_counted:
+            user_deltas[old_user][counter.field] = user_deltas[old_user].get(counter.field, 0) - 1
+        if is_counted:
+            user_deltas[new_user][counter.field] = user_deltas[new_user].get(counter.field, 0) + 1
+
+    SiteStatsSnapshot.apply_deltas(site_deltas)
+    for user_id, deltas in user_deltas.items():
+        UserCounters.apply_deltas(user_id, deltas)
+    instance._stats_values = after
+
+
+def count_deleted_instance(sender, instance, **kwargs):
+    """Remove a deleted row from the site snapshot and per-user counters"""
+    site_counters, user_counters, attnames = _TRACKED[sender]
+    values = getattr(instance, '_stats_values', None) or _current_values(instance, attnames)
+    now = timezone.now()
+
+    site_deltas = {}
+    for counter in site_counters:
+        if not _is_deferred(values, counter.fields) and counter.test(values, now):
+            site_deltas[counter.field] = -1
+
+    user_deltas = defaultdict(dict)
+    for counter in user_counters:
+        user_attname = _user_attname(sender, counter)
+        if not _is_deferred(values, counter.fields + [user_attname]) and counter.test(values, now):
+            user_deltas[values[user_attname]][counter.field] = -1
+
+    SiteStatsSnapshot.apply_deltas(site_deltas)
+    for user_id, deltas in user_deltas.items():
+        UserCounters.apply_deltas(user_id, deltas)
+
+
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    """New users start with an all-zero counters row"""
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+def _m2m_counter_receivers(counter):
+    """Build receivers keeping a per-user counter in step with a user M2M field"""
+    model = apps.get_model(counter.model)
+    through = model._meta.get_field(counter.m2m_field).remote_field.through
+    # Auto-created through rows never send delete signals, so work from the join table
+    user_attname = model_attname = None
+    for field in through._meta.get_fields():
+        if getattr(field, 'related_model', None) is None:
+            continue
+        if field.related_model._meta.label == settings.AUTH_USER_MODEL:
+            user_attname = field.attname
+        elif field.related_model is model:
+            model_attname = field.attname
+
+    def decrement_rows(rows):
+        for user_id, count in Counter(rows.values_list(user_attname, flat=True)).items():
+            UserCounters.apply_deltas(user_id, {counter.field: -count})
+
+    def count_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if action == 'post_add' and pk_set:
+            # pk_set only contains rows that were actually inserted
+            if reverse:
+                UserCounters.apply_deltas(instance.pk, {counter.field: len(pk_set)})
+            else:
+                for user_id in pk_set:
+                    UserCounters.apply_deltas(user_id, {counter.field: 1})
+        elif action in ('pre_remove', 'pre_clear'):
+            # pk_set holds what was asked for; only count rows that exist
+            if reverse:
+                rows = through.objects.filter(**{user_attname: instance.pk})
+                if action == 'pre_remove':
+                    rows = rows.filter(**{f'{model_attname}__in': pk_set})
+            else:
+                rows = through.objects.filter(**{model_attname: instance.pk})
+                if action == 'pre_remove':
+                    rows = rows.filter(**{f'{user_attname}__in': pk_set})
+            decrement_rows(rows)
+
+    def count_cascaded(sender, instance, **kwargs):
+        decrement_rows(through.objects.filter(**{model_attname: instance.pk}))
+
+    return model, through, count_changed, count_cascaded
+
+
+for _model, (_site, _user, _attnames) in _TRACKED.items():
+    _label = _model._meta.label_lower
+    post_init.connect(remember_tracked_values, sender=_model, dispatch_uid=f'stats_init_{_label}')
+    post_save.connect(count_saved_instance, sender=_model, dispatch_uid=f'stats_save_{_label}')
+    post_delete.connect(count_deleted_instance, sender=_model, dispatch_uid=f'stats_delete_{_label}')
+
+post_save.connect(create_user_counters, sender=settings.AUTH_USER_MODEL, dispatch_uid='stats_user_counters_create')
+
+for _counter in USER_M2M_COUNTERS:
+    _owner, _through, _count_changed, _count_cascaded = _m2m_counter_receivers(_counter)
+    m2m_changed.connect(_count_changed, sender=_through, weak=False, dispatch_uid=f'stats_m2m_{_counter.field}')
+    pre_delete.connect(_count_cascaded, sender=_owner, weak=False, dispatch_uid=f'stats_m2m_cascade_{_counter.field}')
@@ -0,0 +1,301 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of a shared cache.
+
+Reads are answered from the process's LRU while the entry is fresh, so hot
+read-mostly values cost no I/O. Misses fall through to the shared cache
+(Redis in production) and are copied into the LRU. Writes go to the shared
+cache first and are then broadcast so other processes drop their copies.
+
+Every stored value carries the token of the write that produced it, and
+invalidations name that token. A process keeps its copy when it already
+holds the announced write. The writer therefore keeps what it just stored,
+and a late message cannot evict a newer value. A dropped Redis subscription
+may have missed messages, so the LRU is cleared whenever it (re)subscribes.
+LOCAL_TIMEOUT bounds how stale a local copy can get in any case.
+
+    'hot': {
+        'BACKEND': 'sustainabilityhub.cache.TieredCache',
+        'OPTIONS': {
+            'REMOTE': 'default',    # alias of the shared cache
+            'BROADCAST': 'redis',   # 'local' when everything runs in one process
+            'REDIS_URL': 'redis://127.0.0.1:6379/1',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+        },
+    },
+
+incr() is a read followed by a write here; keep counters in the shared cache.
+clear() clears the shared cache too.
+
+cached_table() keeps all rows of a small reference table (categories,
+badges) in this cache. Rows are served from the LRU without I/O, and the
+entry is invalidated by the model's save and delete signals.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger(__name__)
+
+HOT_CACHE = 'hot'
+MISSING = object()
+
+
+class LocalTier:
+    """LRU of key -> (value, token, expires_at), shared by the threads of a process"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return MISSING
+            if item[2] <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, token, ttl):
+        if ttl is not None and ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (value, token, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def drop(self, key, token=None):
+        """Forget `key` unless the local copy already comes from the write `token`"""
+        with self.lock:
+            item = self.entries.get(key)
+            if item is not None and (token is None or item[1] != token):
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def receive(self, message):
+        if message.get('clear'):
+            self.clear()
+        for key, token in message.get('keys', {}).items():
+            self.drop(key, token)
+
+
+class LocalBroadcast:
+    """Delivers invalidations to the tiers of this process; stands in for Redis in development and tests"""
+    subscribers = defaultdict(list)
+
+    def __init__(self, channel, options):
+        self.channel = channel
+
+    def subscribe(self, tier):
+        self.subscribers[self.channel].append(tier)
+
+    def publish(self, message):
+        for tier in list(self.subscribers[self.channel]):
+            tier.receive(message)
+
+
+class RedisBroadcast:
+    """Invalidations over Redis pub/sub, received by a daemon thread per process"""
+
+    def __init__(self, channel, options):
+        import redis
+        self.channel = channel
+        self.errors = redis.RedisError
+        self.client = redis.Redis.from_url(options.get('REDIS_URL', 'redis://127.0.0.1:6379/1'))
+
+    def subscribe(self, tier):
+        thread = threading.Thread(target=self._listen, args=(tier,), name=f'cache-{self.channel}', daemon=True)
+        thread.start()
+
+    def _listen(self, tier):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything published while unsubscribed was missed
+                tier.clear()
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        tier.receive(json.loads(message['data']))
+            except self.errors:
+                logger.warning('Lost cache invalidation channel %s, reconnecting', self.channel, exc_info=True)
+                tier.clear()
+                time.sleep(1)
+
+    def publish(self, message):
+        try:
+            self.client.publish(self.channel, json.dumps(message))
+        except self.errors:
+            logger.warning('Could not publish cache invalidation on %s', self.channel, exc_info=True)
+
+
+BROADCASTS = {
+    'local': LocalBroadcast,
+    'redis': RedisBroadcast,
+}
+
+# cache name -> (pid, tier, broadcast); rebuilt after a fork, since threads do not survive it
+_processes = {}
+_processes_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """Per-process LRU in front of the cache named by OPTIONS['REMOTE']"""
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = name or 'tiered'
+        self.remote_alias = options.get('REMOTE', 'default')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self.options = options
+
+    @property
+    def remote(self):
+        return caches[self.remote_alias]
+
+    def _process(self):
+        pid = os.getpid()
+        state = _processes.get(self.name)
+        if state is None or state[0] != pid:
+            with _processes_lock:
+                state = _processes.get(self.name)
+                if state is None or state[0] != pid:
+                    tier = LocalTier(self._max_entries)
+                    broadcast = BROADCASTS[self.options.get('BROADCAST', 'redis')](f'cache:{self.name}', self.options)
+                    broadcast.subscribe(tier)
+                    state = _processes[self.name] = (pid, tier, broadcast)
+        return state[1], state[2]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _local_ttl(self, timeout):
+        return self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        tier, _ = self._process()
+        value = tier.get(key)
+        if value is not MISSING:
+            return value
+        envelope = self.remote.get(key)
+        if envelope is None:
+            return default
+        token, value = envelope
+        tier.put(key, value, token, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        tier, _ = self._process()
+        found, missing = {}, {}
+        for key in keys:
+            full_key = self.make_and_validate_key(key, version=version)
+            value = tier.get(full_key)
+            if value is MISSING:
+                missing[full_key] = key
+            else:
+                found[key] = value
+        if missing:
+            for full_key, (token, value) in self.remote.get_many(list(missing)).items():
+                tier.put(full_key, value, token, self.local_timeout)
+                found[missing[full_key]] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        tier, broadcast = self._process()
+        timeout = self._timeout(timeout)
+        tokens = {}
+        envelopes = {}
+        for key, value in data.items():
+            full_key = self.make_and_validate_key(key, version=version)
+            tokens[full_key] = uuid.uuid4().hex
+            envelopes[full_key] = (tokens[full_key], value)
+        self.remote.set_many(envelopes, timeout)
+        for full_key, (token, value) in envelopes.items():
+            tier.put(full_key, value, token, self._local_ttl(timeout))
+        broadcast.publish({'keys': tokens})
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        tier, broadcast = self._process()
+        timeout = self._timeout(timeout)
+        token = uuid.uuid4().hex
+        if not self.remote.add(key, (token, value), timeout):
+            return False
+        tier.put(key, value, token, self._local_ttl(timeout))
+        broadcast.publish({'keys': {key: token}})
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.remote.touch(key, self._timeout(timeout))
+
+    def has_key(self, key, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        tier, _ = self._process()
+        return tier.get(full_key) is not MISSING or self.remote.has_key(full_key)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        tier, broadcast = self._process()
+        deleted = self.remote.delete(key)
+        tier.drop(key)
+        broadcast.publish({'keys': {key: None}})
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        tier, broadcast = self._process()
+        self.remote.delete_many(keys)
+        for key in keys:
+            tier.drop(key)
+        broadcast.publish({'keys': dict.fromkeys(keys)})
+
+    def clear(self):
+        tier, broadcast = self._process()
+        self.remote.clear()
+        tier.clear()
+        broadcast.publish({'clear': True})
+
+
+def cached_table(model, alias=HOT_CACHE):
+    """Every row of a small reference table, read through the hot cache"""
+    key = f'table:{model._meta.label_lower}'
+    rows = caches[alias].get(key)
+    if rows is None:
+        rows = list(model._default_manager.all())
+        caches[alias].set(key, rows, None)
+    return rows
+
+
+def connect_cached_table(model, alias=HOT_CACHE):
+    """Invalidate cached_table(model) whenever a row is saved or deleted"""
+    key = f'table:{model._meta.label_lower}'
+
+    def invalidate(sender, **kwargs):
+        transaction.on_commit(lambda: caches[alias].delete(key))
+
+    post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=f'cached_table_save_{key}')
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=f'cached_table_delete_{key}')
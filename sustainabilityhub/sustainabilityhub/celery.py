@@ -0,0 +1,31 @@
+"""
+Celery app for sustainabilityhub.tasks.CeleryBackend.
+
+Start a worker with:
+
+    celery -A sustainabilityhub worker -l info
+
+Every queued task goes through run_task, which looks the task up by its
+dotted name, so task modules need no Celery-specific registration.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sustainabilityhub.settings')
+
+app = Celery('sustainabilityhub')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+
+@app.task(name='sustainabilityhub.run_task', bind=True, acks_late=True)
+def run_task(self, name, args):
+    """Run the task registered as `name`, retrying with backoff on failure"""
+    from django.utils.module_loading import import_string
+    from .tasks import backoff
+
+    task = import_string(name)
+    try:
+        return task.function(*args)
+    except Exception as error:
+        raise self.retry(exc=error, countdown=backoff(self.request.retries), max_retries=task.max_retries)
@@ -0,0 +1,127 @@
+"""
+Cached results of expensive computations, recomputed by one worker at a time.
+
+cached_computation() stores a value together with the time it took to
+compute and the moment it goes stale. It guards against stampedes in three
+ways:
+
+- Early refresh (XFetch): each read may decide to recompute before the value
+  goes stale. The chance rises as expiry nears and is higher for values that
+  are slow to compute. Refreshes are therefore spread out instead of all
+  landing at the expiry instant.
+- Single flight within a process: threads that need the same key share one
+  computation through a per-key future.
+- Single flight across processes: the recomputing worker holds a lock key in
+  the shared cache with a lease. Other workers keep serving the stale value,
+  which stays in the cache for STALE_GRACE after it expires. A worker with
+  nothing to serve waits for the holder's result, and computes the value
+  itself if the wait runs out.
+
+    @cached_computation('community:leaderboard', ttl=300)
+    def leaderboard():
+        ...
+"""
+import functools
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from django.core.cache import caches
+
+BETA = 1.0  # > 1 refreshes earlier, < 1 later
+STALE_GRACE = 300  # Seconds a stale value is still served while one worker recomputes
+LOCK_LEASE = 30  # Seconds before an abandoned recompute lock expires
+WAIT_TIMEOUT = 5  # Seconds a worker with no value waits for another worker's result
+POLL_INTERVAL = 0.05
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _refresh_due(envelope, now, beta):
+    """XFetch: recompute once now - delta * beta * ln(rand) passes the expiry"""
+    _, delta, expires_at = envelope
+    return now - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _compute_and_store(cache, key, compute, ttl):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    cache.set(key, (value, delta, time.time() + ttl), ttl + STALE_GRACE)
+    return value
+
+
+def _compute_shared(cache, key, compute, ttl, stale):
+    """Recompute under the cross-process lock, or fall back to the stale value or the holder's result"""
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, LOCK_LEASE):
+        try:
+            return _compute_and_store(cache, key, compute, ttl)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+    if stale is not None:
+        return stale[0]
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        envelope = cache.get(key)
+        if envelope is not None:
+            return envelope[0]
+    return _compute_and_store(cache, key, compute, ttl)
+
+
+def get_or_compute(key, compute, ttl, alias='default', beta=BETA):
+    """The cached value of `compute()` under `key`, refreshed about every `ttl` seconds"""
+    cache = caches[alias]
+    envelope = cache.get(key)
+    now = time.time()
+    if envelope is not None and not _refresh_due(envelope, now, beta):
+        return envelope[0]
+    stale = envelope if envelope is not None and now < envelope[2] + STALE_GRACE else None
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Future()
+    if not leader:
+        if stale is not None:
+            return stale[0]
+        return flight.result()
+
+    try:
+        value = _compute_shared(cache, key, compute, ttl, stale)
+    except BaseException as error:
+        flight.set_exception(error)
+        raise
+    else:
+        flight.set_result(value)
+        return value
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+def cached_computation(key, ttl, alias='default', beta=BETA):
+    """
+    Decorator form of get_or_compute().
+
+    Positional arguments of the decorated function are appended to the key,
+    so they must have stable string forms (ids, not objects).
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            full_key = ':'.join([key, *map(str, args)])
+            return get_or_compute(full_key, lambda: function(*args), ttl, alias, beta)
+
+        wrapper.invalidate = lambda *args: caches[alias].delete(':'.join([key, *map(str, args)]))
+        return wrapper
+    return decorator
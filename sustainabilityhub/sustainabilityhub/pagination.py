@@ -0,0 +1,152 @@
+"""
+Keyset (cursor) pagination for DRF viewsets.
+
+Pages are selected with a WHERE on the ordering columns of the last row
+seen, e.g. (created_at, id) < (last_created_at, last_id), so every page
+costs the same no matter how deep the client scrolls, and no COUNT(*) is
+issued. Cursors are opaque base64 tokens. Requests that pass ?page= keep
+getting the old page-number responses.
+
+Viewsets choose their key with `cursor_ordering`; every field must be
+non-null and the last one unique (normally the primary key).
+"""
+import base64
+import json
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Clients that still send ?page= are served by this class
+    page_number_class = PageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        if self.page_number_class and self.page_number_class.page_query_param in request.query_params:
+            self.legacy = self.page_number_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.get('r'))
+        ordering = self._reversed(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, ordering, cursor['v']))
+
+        # One extra row tells us whether there is another page
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = bool(cursor) if not reverse else has_more
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        values = [self._field(row._meta, name).value_to_string(row) for name in self._names(self.ordering)]
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(token).encode()))
+            if not isinstance(payload.get('v'), list) or len(payload['v']) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+    def _after(self, model, ordering, raw_values):
+        """Rows strictly after the cursor in the given ordering, as (a > x) or (a = x and b > y) ..."""
+        try:
+            values = [
+                self._field(model._meta, name).to_python(raw)
+                for name, raw in zip(self._names(ordering), raw_values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for position, term in enumerate(ordering):
+            name = term.lstrip('-')
+            step = Q(**{f'{name}__{"lt" if term.startswith("-") else "gt"}': values[position]})
+            for previous_term, value in zip(ordering[:position], values):
+                step &= Q(**{previous_term.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def _names(ordering):
+        return [term.lstrip('-') for term in ordering]
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+    @staticmethod
+    def _field(opts, name):
+        return opts.pk if name == 'pk' else opts.get_field(name)
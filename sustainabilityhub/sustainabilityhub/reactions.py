@@ -0,0 +1,81 @@
+"""
+Per-type reaction tallies stored on the reacted-to row.
+
+Posts and comments carry a reaction_count column plus one <type>_count
+column per entry in their reaction model's REACTION_TYPES. The signal
+handlers connected here keep those columns in step with the reaction rows
+using F() updates, so rendering a reaction bar never needs a COUNT.
+"""
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete
+
+
+def tally_field(reaction_type):
+    return f'{reaction_type}_count'
+
+
+class ReactionTallyMixin:
+    """Read helpers for models with reaction tally columns"""
+    
+    @property
+    def reaction_counts(self):
+        """{reaction_type: count} for every type this row can receive"""
+        return {
+            reaction_type: getattr(self, tally_field(reaction_type))
+            for reaction_type, _ in self.reactions.model.REACTION_TYPES
+        }
+    
+    def apply_reaction_toggle(self, result):
+        """Move the loaded tallies by a toggles.ToggleResult without re-reading the row"""
+        self.reaction_count += result.delta
+        for reaction_type, delta in ((result.previous, -1), (result.value, 1)):
+            if reaction_type is not None and result.previous != result.value and hasattr(self, tally_field(reaction_type)):
+                setattr(self, tally_field(reaction_type), getattr(self, tally_field(reaction_type)) + delta)
+
+
+def apply_reaction_delta(target_model, pk, old_type=None, new_type=None):
+    """Move one reaction between tallies: add (None -> type), remove (type -> None) or change type"""
+    if old_type == new_type:
+        return
+    columns = {field.name for field in target_model._meta.concrete_fields}
+    deltas = {}
+    if old_type is None:
+        deltas['reaction_count'] = 1
+    if new_type is None:
+        deltas['reaction_count'] = -1
+    for reaction_type, delta in ((old_type, -1), (new_type, 1)):
+        # Types outside REACTION_TYPES only move the total
+        if reaction_type is not None and tally_field(reaction_type) in columns:
+            deltas[tally_field(reaction_type)] = deltas.get(tally_field(reaction_type), 0) + delta
+
+    target_model.objects.filter(pk=pk).update(**{
+        field: F(field) + delta for field, delta in deltas.items() if delta
+    })
+
+
+def connect_reaction_tallies(reaction_model, target_field):
+    """Keep the tallies on `reaction_model.<target_field>` rows in step with reaction_model"""
+    target_model = reaction_model._meta.get_field(target_field).related_model
+    target_attname = reaction_model._meta.get_field(target_field).attname
+    uid = reaction_model._meta.label_lower
+
+    def remember_type(sender, instance, **kwargs):
+        instance._tallied_type = instance.__dict__.get('reaction_type')
+
+    def count_saved(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        old_type = None if created else getattr(instance, '_tallied_type', None)
+        if not created and old_type is None:
+            # Loaded without reaction_type (.only()/.defer()); nothing reliable to compare
+            return
+        apply_reaction_delta(target_model, getattr(instance, target_attname), old_type, instance.reaction_type)
+        instance._tallied_type = instance.reaction_type
+
+    def count_deleted(sender, instance, **kwargs):
+        old_type = getattr(instance, '_tallied_type', None) or instance.reaction_type
+        apply_reaction_delta(target_model, getattr(instance, target_attname), old_type=old_type)
+
+    post_init.connect(remember_type, sender=reaction_model, weak=False, dispatch_uid=f'tally_init_{uid}')
+    post_save.connect(count_saved, sender=reaction_model, weak=False, dispatch_uid=f'tally_save_{uid}')
+    post_delete.connect(count_deleted, sender=reaction_model, weak=False, dispatch_uid=f'tally_delete_{uid}')
@@ -1,49 +1,57 @@
 from django.shortcuts import render
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from forums.models import Topic
-from projects.models import Project
-from events.models import Event
-from resources.models import Resource
-from django.contrib.auth import get_user_model
+from search import typeahead
+from search.backends import SearchTimeout
+from search.engine import search
+from search.models import DOC_TYPES
+
+RESULT_LIMIT = 30
+SUGGESTION_LIMIT = 10
 
-User = get_user_model()
 
 @login_required
 def global_search(request):
     query = request.GET.get('q', '').strip()
-    results = {
-        'topics': [],
-        'projects': [],
-        'events': [],
-        'resources': [],
-        'users': [],
-    }
+    doc_types = [doc_type for doc_type in request.GET.getlist('type') if doc_type in dict(DOC_TYPES)]
+    
+    # One ranked list across topics, projects, events, resources and members
+    timed_out = False
+    try:
+        hits = search(query, limit=RESULT_LIMIT, doc_types=doc_types) if query else []
+    except SearchTimeout:
+        hits, timed_out = [], True
     
-    if query:
-        # Search topics
-        results['topics'] = Topic.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        ).select_related('author', 'category')[:10]
-        
-        # Search projects
-        results['projects'] = Project.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(tags__icontains=query)
-        ).select_related('creator')[:10]
-        
-        # Search events
-        results['events'] = Event.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(location__icontains=query)
-        ).select_related('organizer')[:10]
-        
-        # Search resources
-        results['resources'] = Resource.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(tags__icontains=query)
-        ).select_related('author')[:10]
-        
-        # Search users
-        results['users'] = User.objects.filter(
-            Q(username__icontains=query) | Q(first_name__icontains=query) | Q(last_name__icontains=query)
-        ).filter(is_active=True)[:10]
+    return render(request, 'search_results.html', {
+        'query': query,
+        'hits': hits,
+        'timed_out': timed_out,
+        'doc_types': DOC_TYPES,
+        'selected_types': doc_types,
+    })
+
+
+@login_required
+def autocomplete(request):
+    """Prefix suggestions for members, hashtags, projects and events"""
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.getlist('type') if kind in typeahead.KINDS]
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGESTION_LIMIT)), 1), typeahead.MEMO_SIZE)
+    except ValueError:
+        limit = SUGGESTION_LIMIT
     
-    return render(request, 'search_results.html', {'query': query, 'results': results})
+    suggestions = typeahead.autocomplete(query, kinds, limit) if query else []
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'type': entry.kind,
+                'id': entry.object_id,
+                'label': entry.label,
+                'detail': entry.detail,
+                'url': entry.url,
+            }
+            for entry in suggestions
+        ],
+    })
@@ -47,6 +47,9 @@ LOCAL_APPS = [
     'rms',
     'community',  # New app for community feed
     'activity_logs',  # New app for activity tracking
+    'stats',  # Precomputed site-wide counters
+    'trending',  # Time-decayed trending rankings
+    'search',  # Full-text search index
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -60,7 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # 'activity_logs.middleware.ActivityLogMiddleware',  # Custom middleware
+    'activity_logs.middleware.ActivityLogMiddleware',  # Queues page views for the buffered activity log writer
 ]
 
 ROOT_URLCONF = 'sustainabilityhub.urls'
@@ -138,14 +141,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Caching
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         },
         'KEY_PREFIX': 'ecoconnect',
         'TIMEOUT': 300,
-    }
+    },
+    # Read-mostly reference data, served from process memory (see sustainabilityhub/cache.py)
+    'hot': {
+        'BACKEND': 'sustainabilityhub.cache.TieredCache',
+        'LOCATION': 'hot',
+        'OPTIONS': {
+            'REMOTE': 'default',
+            'BROADCAST': 'redis',
+            'REDIS_URL': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+        },
+        'TIMEOUT': 3600,
+    },
 }
 
 # Session configuration
@@ -249,4 +265,37 @@ LOGGING = {
 # Custom settings
 ACTIVITY_LOG_ENABLED = True
 NOTIFICATION_BATCH_SIZE = 50
-COMMUNITY_FEED_PAGE_SIZE = 20
\ No newline at end of file
+COMMUNITY_FEED_PAGE_SIZE = 20
+SITE_STATS_MAX_AGE = 60 * 60  # Recount the site stats snapshot at least hourly
+TOPIC_VIEW_FLUSH_INTERVAL = 30  # Seconds between write-behind flushes of topic view counts
+TRENDING_WINDOW_HOURS = 72  # Engagement older than this no longer counts towards trending
+TRENDING_GRAVITY = 1.8  # Higher values make trending favour newer engagement
+TRENDING_SIZE = 50  # Ranked items kept per type
+TRENDING_MAX_AGE = 15 * 60  # Recompute on read if compute_trending has not run for this long
+TIMELINE_BACKEND = 'community.timeline.RedisTimelineStore'
+TIMELINE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')
+TIMELINE_SIZE = 500  # Post ids kept per home timeline
+TIMELINE_TTL = 7 * 24 * 60 * 60  # Unread timelines expire and are rebuilt on next read
+TIMELINE_FANOUT_LIMIT = 5000  # Authors with more followers are merged in at read time
+DISCOVERY_WINDOW_HOURS = 7 * 24  # Only posts this recent enter the discovery pool
+DISCOVERY_POOL_SIZE = 1000  # Ranked posts kept in the discovery pool
+DISCOVERY_REFRESH = 300  # Seconds between recomputations of the discovery pool
+LEADERBOARD_BACKEND = 'community.leaderboard.RedisLeaderboardStore'
+LEADERBOARD_REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')
+LEADERBOARD_TTL = 24 * 60 * 60  # Seconds before a leaderboard is rebuilt from the impact table
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')  # 'postgres', 'sqlite_fts5', 'python' or 'auto' to pick by database
+TYPEAHEAD_REFRESH = 30  # Seconds between checks for autocomplete index changes made by other processes
+SEARCH_CACHE_TTL = 60  # Seconds a search result page is reused; edits invalidate it sooner
+SEARCH_TIME_BUDGET = 2.0  # Seconds a search query may run before it is cancelled
+UNREAD_COUNTER_TTL = 60 * 60  # Seconds before cached unread counts are recounted from the database
+NOTIFICATION_COALESCE_WINDOW = 6 * 60 * 60  # Seconds in which same-target notifications merge into one row
+TASK_BACKEND = 'sustainabilityhub.tasks.CeleryBackend'  # Where queued side effects run; see sustainabilityhub/tasks.py
+TASK_MAX_RETRIES = 3  # Retries of a failing task before it is logged and dropped
+TASK_THREADS = 4  # Worker threads of the in-process ThreadBackend
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'))
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # Tasks are acked late; do not hoard them on one worker
+ACTIVITY_LOG_BATCH_SIZE = 500  # Activity rows per bulk insert; a full batch is written without waiting
+ACTIVITY_LOG_FLUSH_INTERVAL = 2  # Seconds between background writes of queued activity rows
+ACTIVITY_LOG_MAX_PENDING = 10000  # Queued activity rows per process before new ones are dropped
+ACTIVITY_LOG_FLUSH_ON_REQUEST = False  # Write queued rows at the end of each request instead of on a thread
\ No newline at end of file
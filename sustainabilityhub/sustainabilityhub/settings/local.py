@@ -23,9 +23,30 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    'hot': {
+        'BACKEND': 'sustainabilityhub.cache.TieredCache',
+        'LOCATION': 'hot',
+        'OPTIONS': {
+            'REMOTE': 'default',
+            'BROADCAST': 'local',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+        },
+        'TIMEOUT': 3600,
+    },
 }
 
+# Home timelines and leaderboards kept in-process for development
+TIMELINE_BACKEND = 'community.timeline.LocMemTimelineStore'
+LEADERBOARD_BACKEND = 'community.leaderboard.LocMemLeaderboardStore'
+
+# Background tasks run on threads of the dev server; no broker needed
+TASK_BACKEND = 'sustainabilityhub.tasks.ThreadBackend'
+
+# Activity rows are written as each request ends, so tests see them
+ACTIVITY_LOG_FLUSH_ON_REQUEST = True
+
 # Debug toolbar
 if DEBUG:
     try:
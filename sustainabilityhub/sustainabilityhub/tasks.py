@@ -0,0 +1,177 @@
+"""
+Background tasks for side effects of a request.
+
+@task turns a function into a task. `.delay(*args)` queues a call for after
+the current transaction commits, so the request returns as soon as its own
+rows are saved and a worker never sees a row that was rolled back. Outside
+a transaction the call is queued at once. Arguments must be JSON
+serializable: pass ids, not model instances.
+
+TASK_BACKEND picks where queued calls run:
+
+- CeleryBackend: on a Celery worker (sustainabilityhub.celery), with retries
+- ThreadBackend: on a thread pool in this process, for development
+- EagerBackend: inline once the transaction commits, for tests and scripts
+
+A failing call is retried up to TASK_MAX_RETRIES times with exponential
+backoff, then logged and dropped.
+
+Calls to a task declared with batch=True made in the same transaction are
+delivered as one call, whose only argument is the list of their argument
+lists:
+
+    @task(batch=True)
+    def send_notifications(calls):
+        for recipient_ids, fields in calls:
+            ...
+"""
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 2  # Seconds before the first retry; doubles on each one
+BACKOFF_MAX = 300
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def backoff(retries):
+    return min(BACKOFF_BASE * 2 ** retries, BACKOFF_MAX)
+
+
+class Task:
+    """A function that can be queued with delay()"""
+
+    def __init__(self, function, batch=False, max_retries=None):
+        functools.update_wrapper(self, function)
+        self.function = function
+        self.name = f'{function.__module__}.{function.__qualname__}'
+        self.batch = batch
+        self._max_retries = max_retries
+
+    @property
+    def max_retries(self):
+        if self._max_retries is not None:
+            return self._max_retries
+        return _setting('TASK_MAX_RETRIES', 3)
+
+    def __call__(self, *args):
+        return self.function(*args)
+
+    def delay(self, *args):
+        """Run the task with `args` once the current transaction commits"""
+        args = list(args)
+        if self.batch:
+            _buffer(self, args)
+        else:
+            transaction.on_commit(lambda: get_backend().submit(self, args))
+
+    def run(self, args, wait=True):
+        """Call the function, retrying failures; the in-process backends use this"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.function(*args)
+            except Exception:
+                if attempt == self.max_retries:
+                    logger.exception('Task %s failed after %d attempts', self.name, attempt + 1)
+                    return None
+                logger.warning('Task %s failed, retrying', self.name, exc_info=True)
+                if wait:
+                    time.sleep(backoff(attempt))
+
+
+def task(function=None, batch=False, max_retries=None):
+    """Decorator registering a task; use as @task or @task(batch=True)"""
+    if function is None:
+        return lambda function: Task(function, batch, max_retries)
+    return Task(function, batch, max_retries)
+
+
+class _Batch:
+    """Calls to one batched task queued in one transaction (or savepoint)"""
+
+    def __init__(self, task, buffers, key):
+        self.task = task
+        self.buffers = buffers
+        self.key = key
+        self.calls = []
+
+    def flush(self):
+        if self.buffers.get(self.key) is self:
+            del self.buffers[self.key]
+        get_backend().submit(self.task, [self.calls])
+
+
+def _buffer(task, args):
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        get_backend().submit(task, [[args]])
+        return
+    # Keyed by savepoint too, so a rolled back savepoint takes its calls with it
+    buffers = connection.__dict__.setdefault('_task_batches', {})
+    key = (task.name, tuple(connection.savepoint_ids))
+    batch = buffers.get(key)
+    if batch is None or not any(hook[1] == batch.flush for hook in connection.run_on_commit):
+        # New transaction, or the previous one rolled back without flushing
+        batch = buffers[key] = _Batch(task, buffers, key)
+        transaction.on_commit(batch.flush)
+    batch.calls.append(args)
+
+
+class EagerBackend:
+    """Runs each task as soon as it is submitted, without waiting between retries"""
+
+    def submit(self, task, args):
+        task.run(args, wait=False)
+
+
+class ThreadBackend:
+    """Runs tasks on a pool of TASK_THREADS threads in this process"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=_setting('TASK_THREADS', 4), thread_name_prefix='task'
+        )
+
+    def _run(self, task, args):
+        try:
+            task.run(args)
+        finally:
+            # Each pool thread has its own connections; do not leave them open between tasks
+            connections.close_all()
+
+    def submit(self, task, args):
+        self.executor.submit(self._run, task, args)
+
+
+class CeleryBackend:
+    """Sends tasks to the Celery workers started with `celery -A sustainabilityhub worker`"""
+
+    def submit(self, task, args):
+        from .celery import run_task
+        run_task.delay(task.name, args)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    path = _setting('TASK_BACKEND', 'sustainabilityhub.tasks.CeleryBackend')
+    backend = _backends.get(path)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(path)
+            if backend is None:
+                backend = _backends[path] = import_string(path)()
+    return backend
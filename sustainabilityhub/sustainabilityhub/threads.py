@@ -0,0 +1,99 @@
+"""
+Materialized paths for threaded comments.
+
+Each comment stores `depth` and a `path` made of its ancestors' ids and its
+own id as fixed-width base36 segments. Sorting by path gives thread order:
+depth first, with siblings in creation order. A comment's subtree is every
+path between its own path and that path padded with 'z'. A whole thread or
+subtree therefore loads with one range query on the (post, path) index and
+is assembled in memory.
+
+Paths are written by a post_save handler once the comment has a primary key.
+Replies nested deeper than MAX_DEPTH keep their real parent, but their paths
+are stored at the deepest level. They sort after that parent instead of
+under it.
+"""
+from django.db.models import Q
+from django.db.models.signals import post_save
+
+STEP = 6  # base36 digits per id, enough for ~2 billion comments
+PATH_LENGTH = 255
+MAX_DEPTH = PATH_LENGTH // STEP - 1
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def segment(pk):
+    digits = ''
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        digits = DIGITS[remainder] + digits
+    return digits.rjust(STEP, '0')
+
+
+def path_for(parent_path, pk):
+    """(path, depth) for a comment with the given id under a parent path ('' for top level)"""
+    if len(parent_path) // STEP > MAX_DEPTH:
+        parent_path = parent_path[:-STEP]
+    path = parent_path + segment(pk)
+    return path, len(path) // STEP - 1
+
+
+def subtree_end(path):
+    """Largest path inside the subtree rooted at `path`"""
+    return path + DIGITS[-1] * (PATH_LENGTH - len(path))
+
+
+def subtree_filter(comments):
+    """Q for every comment in the subtrees of the given comments, the comments included"""
+    condition = Q()
+    for comment in comments:
+        condition |= Q(post_id=comment.post_id, path__gte=comment.path, path__lte=subtree_end(comment.path))
+    return condition
+
+
+def load_thread(queryset, post_id, max_depth=None, limit=None, after=None):
+    """
+    Load a post's comments in thread order.
+
+    `limit` and `after` page through top-level comments; `after` is the path
+    of the last top-level comment already shown. Replies deeper than
+    `max_depth` are left out. Returns (comments, next_after), where
+    next_after is None on the last page.
+    """
+    comments = queryset.filter(post_id=post_id)
+    next_after = None
+    if limit is not None:
+        roots = comments.filter(depth=0)
+        if after:
+            roots = roots.filter(path__gt=after)
+        bounds = list(roots.order_by('path').values_list('path', flat=True)[:limit + 1])
+        if len(bounds) > limit:
+            bounds = bounds[:limit]
+            next_after = bounds[-1]
+        if not bounds:
+            return [], None
+        comments = comments.filter(path__gte=bounds[0], path__lte=subtree_end(bounds[-1]))
+    if max_depth is not None:
+        comments = comments.filter(depth__lte=max_depth)
+    return list(comments.order_by('path')), next_after
+
+
+def connect_comment_paths(comment_model):
+    """Write path and depth for new rows of a comment model with a `parent` self-FK"""
+
+    def assign_path(sender, instance, created, raw=False, **kwargs):
+        if not created or raw:
+            return
+        parent_path = ''
+        if instance.parent_id is not None:
+            parent = sender._meta.get_field('parent').get_cached_value(instance, None)
+            if parent is None or not parent.path:
+                parent = sender.objects.only('path').get(pk=instance.parent_id)
+            parent_path = parent.path
+        instance.path, instance.depth = path_for(parent_path, instance.pk)
+        sender.objects.filter(pk=instance.pk).update(path=instance.path, depth=instance.depth)
+
+    post_save.connect(
+        assign_path, sender=comment_model, weak=False,
+        dispatch_uid=f'thread_path_{comment_model._meta.label_lower}'
+    )
@@ -0,0 +1,284 @@
+"""
+Atomic on/off switches for "one row per user and target" tables.
+
+Likes, follows, bookmarks and reactions are all rows the UI flips on and
+off. With a value (a reaction type) a different value is set in place with
+UPDATE ... WHERE <field> <> value RETURNING. Otherwise the row is removed
+with DELETE ... RETURNING or, when there was none, added with INSERT ... ON
+CONFLICT DO NOTHING RETURNING, so a double click cannot create a duplicate
+or raise. A toggle that loses a race reports the row as it is afterwards.
+
+On PostgreSQL each step is one statement: the update joins the table to
+itself to return the previous value, and delete-or-insert is a single CTE.
+SQLite cannot return a previous value or put DELETE in a CTE, so it reads
+the value before a compare-and-set UPDATE and deletes before it inserts,
+all inside the toggle's transaction. Other databases go through the ORM
+with an IntegrityError fallback.
+
+The statements bypass Model.save()/delete(), so post_save and post_delete
+are sent by hand with instances built from the returned rows. The counter,
+tally, trending and timeline receivers see a toggle like any other write.
+pre_save and pre_delete are not sent.
+"""
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, models, router, transaction
+from django.db.models.signals import post_save, post_delete
+
+
+class ToggleResult(namedtuple('ToggleResult', ['active', 'value', 'previous', 'delta', 'instance'])):
+    """
+    Outcome of a toggle.
+
+    active: whether the row exists afterwards
+    value / previous: the toggled field after and before (None when absent)
+    delta: change in the number of rows, +1, -1 or 0
+    instance: the row added, updated or removed
+    """
+
+    @property
+    def action(self):
+        if self.delta > 0:
+            return 'added'
+        if self.delta < 0:
+            return 'removed'
+        if self.value != self.previous:
+            return 'updated'
+        return 'unchanged'
+
+
+def toggle(model, lookup, field=None, value=None, using=None):
+    """
+    Flip the row identified by `lookup` on or off.
+
+    `lookup` must name exactly the columns of a unique constraint on the
+    model. With `field`, the row carries a value (e.g. a reaction type):
+    toggling the current value removes the row, any other value sets it.
+    """
+    using = using or router.db_for_write(model) or DEFAULT_DB_ALIAS
+    lookup = _normalize(model, lookup)
+    with transaction.atomic(using=using):
+        if _supports_returning(connections[using]):
+            return _toggle_sql(model, lookup, field, value, using)
+        return _toggle_orm(model, lookup, field, value, using)
+
+
+def _normalize(model, lookup):
+    """{field: value} with model instances replaced by their primary keys"""
+    normalized = {}
+    for name, value in lookup.items():
+        field = model._meta.get_field(name)
+        normalized[field] = value.pk if isinstance(value, models.Model) else value
+    return normalized
+
+
+def _supports_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+
+
+def _convert(model, connection, row):
+    """Build an instance from a RETURNING row, applying the same converters as a SELECT"""
+    fields = model._meta.concrete_fields
+    values = []
+    for field, value in zip(fields, row):
+        column = field.get_col(model._meta.db_table)
+        for converter in connection.ops.get_db_converters(column) + field.get_db_converters(connection):
+            value = converter(value, column, connection)
+        values.append(value)
+    return model.from_db(connection.alias, [field.attname for field in fields], values)
+
+
+def _toggle_sql(model, lookup, field, value, using):
+    if field:
+        updated = _update(model, lookup, model._meta.get_field(field), value, using)
+        if updated is not None:
+            return updated
+
+    instance = model(**{key.attname: raw for key, raw in lookup.items()})
+    if field:
+        setattr(instance, field, value)
+    if connections[using].vendor == 'postgresql':
+        removed, added = _delete_or_insert(model, instance, lookup, field, using)
+    else:
+        removed, added = _delete_then_insert(model, instance, lookup, field, using)
+
+    if removed is not None:
+        post_delete.send(sender=model, instance=removed, using=using, origin=removed)
+        return ToggleResult(False, None, getattr(removed, field) if field else None, -1, removed)
+    if added is None:
+        # Nothing to remove and a concurrent request inserted the row first; report what is there now
+        return _current(model, lookup, field, using)
+    post_save.send(sender=model, instance=added, created=True, update_fields=None, raw=False, using=using)
+    return ToggleResult(True, value if field else None, None, 1, added)
+
+
+def _columns(connection, model, alias=None):
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(prefix + connection.ops.quote_name(field.column) for field in model._meta.concrete_fields)
+
+
+def _where(connection, lookup, alias=None):
+    """SQL and params matching the row identified by `lookup`"""
+    prefix = f'{alias}.' if alias else ''
+    sql = ' AND '.join(f'{prefix}{connection.ops.quote_name(key.column)} = %s' for key in lookup)
+    return sql, [key.get_db_prep_value(raw, connection) for key, raw in lookup.items()]
+
+
+def _removable(connection, model, lookup, instance, field):
+    """SQL and params matching the row a toggle removes: with `field`, only when it holds the toggled value"""
+    where, params = _where(connection, lookup)
+    if field:
+        column = model._meta.get_field(field)
+        where += f' AND {connection.ops.quote_name(column.column)} = %s'
+        params.append(column.get_db_prep_value(getattr(instance, field), connection))
+    return where, params
+
+
+def _update(model, lookup, field, value, using):
+    """
+    Set `field` to `value` on an existing row holding another value.
+
+    Returns the ToggleResult, or None when there is no such row and the
+    toggle becomes a delete or an insert.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(field.column)
+    prepared = field.get_db_prep_save(value, connection)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # The self-join keeps the row as it was before the update
+            pk = quote(model._meta.pk.column)
+            where, params = _where(connection, lookup, 't')
+            cursor.execute(
+                f'UPDATE {table} AS t SET {column} = %s FROM {table} AS old '
+                f'WHERE {where} AND t.{pk} = old.{pk} AND t.{column} = old.{column} AND old.{column} <> %s '
+                f'RETURNING old.{column}, {_columns(connection, model, "t")}',
+                [prepared, *params, prepared]
+            )
+            row = cursor.fetchone()
+        else:
+            # Compare-and-set against the value read first, inside the toggle's transaction
+            where, params = _where(connection, lookup)
+            cursor.execute(f'SELECT {column} FROM {table} WHERE {where}', params)
+            found = cursor.fetchone()
+            row = None
+            if found is not None:
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = %s WHERE {where} AND {column} = %s AND {column} <> %s '
+                    f'RETURNING {_columns(connection, model)}',
+                    [prepared, *params, found[0], prepared]
+                )
+                updated = cursor.fetchone()
+                row = (found[0], *updated) if updated else None
+    if row is None:
+        return None
+
+    # Build the instance from the previous value so receivers comparing against
+    # what post_init loaded see the change, then apply the new one
+    index = model._meta.concrete_fields.index(field)
+    old_row = list(row[1:])
+    old_row[index] = row[0]
+    instance = _convert(model, connection, old_row)
+    previous = getattr(instance, field.attname)
+    setattr(instance, field.attname, value)
+    post_save.send(sender=model, instance=instance, created=False, update_fields=None, raw=False, using=using)
+    return ToggleResult(True, value, previous, 0, instance)
+
+
+def _insert_values(instance, connection):
+    """Fields and prepared values of a new row, leaving out an unset primary key"""
+    fields = [
+        field for field in instance._meta.concrete_fields
+        if not (field.primary_key and getattr(instance, field.attname) is None)
+    ]
+    return fields, [field.get_db_prep_save(field.pre_save(instance, add=True), connection) for field in fields]
+
+
+def _delete_or_insert(model, instance, lookup, field, using):
+    """PostgreSQL: (removed, added) from one statement; at most one of them is set"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    where, params = _removable(connection, model, lookup, instance, field)
+    fields, values = _insert_values(instance, connection)
+    columns = ', '.join(quote(f.column) for f in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    target = ', '.join(quote(key.column) for key in lookup)
+    returning = _columns(connection, model)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH d AS (DELETE FROM {table} WHERE {where} RETURNING {returning}), '
+            f'i AS (INSERT INTO {table} ({columns}) SELECT {placeholders} WHERE NOT EXISTS (SELECT 1 FROM d) '
+            f'ON CONFLICT ({target}) DO NOTHING RETURNING {returning}) '
+            f'SELECT TRUE, {returning} FROM d UNION ALL SELECT FALSE, {returning} FROM i',
+            [*params, *values]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None, None
+    converted = _convert(model, connection, row[1:])
+    return (converted, None) if row[0] else (None, converted)
+
+
+def _delete_then_insert(model, instance, lookup, field, using):
+    """SQLite: (removed, added) from a DELETE and, when nothing was removed, an INSERT"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    where, params = _removable(connection, model, lookup, instance, field)
+    returning = _columns(connection, model)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {where} RETURNING {returning}', params)
+        row = cursor.fetchone()
+        if row is not None:
+            return _convert(model, connection, row), None
+
+        fields, values = _insert_values(instance, connection)
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(quote(f.column) for f in fields)}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            f'ON CONFLICT ({", ".join(quote(key.column) for key in lookup)}) DO NOTHING RETURNING {returning}',
+            values
+        )
+        row = cursor.fetchone()
+    return None, _convert(model, connection, row) if row else None
+
+
+def _current(model, lookup, field, using):
+    existing = model._default_manager.using(using).filter(
+        **{key.attname: raw for key, raw in lookup.items()}
+    ).first()
+    if existing is None:
+        return ToggleResult(False, None, None, 0, None)
+    current = getattr(existing, field) if field else None
+    return ToggleResult(True, current, current, 0, existing)
+
+
+def _toggle_orm(model, lookup, field, value, using):
+    filters = {key.attname: raw for key, raw in lookup.items()}
+    manager = model._default_manager.using(using)
+    existing = manager.select_for_update().filter(**filters).first()
+
+    if existing is None:
+        try:
+            with transaction.atomic(using=using):
+                instance = manager.create(**filters, **({field: value} if field else {}))
+        except IntegrityError:
+            return _current(model, lookup, field, using)
+        return ToggleResult(True, value if field else None, None, 1, instance)
+
+    previous = getattr(existing, field) if field else None
+    if field is None or previous == value:
+        existing.delete()
+        return ToggleResult(False, None, previous, -1, existing)
+
+    setattr(existing, field, value)
+    existing.save(update_fields=[field])
+    return ToggleResult(True, value, previous, 0, existing)
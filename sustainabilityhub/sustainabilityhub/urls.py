@@ -7,7 +7,7 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import views as auth_views
 from forums.views import home_view
 from accounts import views
-from sustainabilityhub.search_views import global_search
+from sustainabilityhub.search_views import global_search, autocomplete
 
 # Customize admin site
 admin.site.site_header = "Sustainability Hub Administration"
@@ -37,6 +37,7 @@ urlpatterns = [
     path('reports/', include('rms.urls')),
     path('community/', include('community.urls')),
     path('search/', global_search, name='global_search'),
+    path('search/autocomplete/', autocomplete, name='autocomplete'),
     
     # API endpoints
     path('api/auth/', include('accounts.api_urls')),
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import EngagementBucket, TrendingItem
+
+
+@admin.register(TrendingItem)
+class TrendingItemAdmin(admin.ModelAdmin):
+    list_display = ['item_type', 'rank', 'item_id', 'score', 'engagement', 'computed_at']
+    list_filter = ['item_type']
+    readonly_fields = [field.name for field in TrendingItem._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(EngagementBucket)
+class EngagementBucketAdmin(admin.ModelAdmin):
+    list_display = ['item_type', 'item_id', 'bucket_start', 'score']
+    list_filter = ['item_type', 'bucket_start']
+    readonly_fields = [field.name for field in EngagementBucket._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,179 @@
+"""
+Time-decayed trending for forum topics, community posts and hashtags.
+
+Engagement is recorded into hourly EngagementBucket rows as it happens.
+compute_trending() scores every item seen inside TRENDING_WINDOW_HOURS with
+Hacker News style gravity, sum(points / (age_hours + 2) ** gravity), and
+stores the top TRENDING_SIZE per item type in TrendingItem. Readers only
+fetch the top k rows of that table.
+"""
+import heapq
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import EngagementBucket, TrendingItem
+
+COMPUTED_AT_KEY = 'trending:computed_at'
+COMPUTE_LOCK_KEY = 'trending:compute'
+
+ITEM_MODELS = {
+    'topic': 'forums.Topic',
+    'post': 'community.Post',
+    'hashtag': 'community.HashTag',
+}
+
+# Rows whose creation counts as engagement on an item, and how much
+EngagementSource = namedtuple('EngagementSource', ['model', 'item_type', 'item_field', 'weight'])
+
+ENGAGEMENT_SOURCES = [
+    EngagementSource('forums.Topic', 'topic', 'id', 1),
+    EngagementSource('forums.TopicPost', 'topic', 'topic_id', 2),
+    EngagementSource('forums.TopicLike', 'topic', 'topic_id', 1),
+    EngagementSource('community.Post', 'post', 'id', 1),
+    EngagementSource('community.PostReaction', 'post', 'post_id', 1),
+    EngagementSource('community.Comment', 'post', 'post_id', 2),
+]
+
+# Tagging a post counts towards the hashtag
+HASHTAG_WEIGHT = 1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def bucket_for(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def record(item_type, item_id, weight=1, when=None):
+    """Add engagement to an item's bucket for the current hour"""
+    bucket_start = bucket_for(when or timezone.now())
+    lookup = {'item_type': item_type, 'item_id': item_id, 'bucket_start': bucket_start}
+
+    if EngagementBucket.objects.filter(**lookup).update(score=F('score') + weight):
+        return
+    try:
+        with transaction.atomic():
+            EngagementBucket.objects.create(score=weight, **lookup)
+    except IntegrityError:
+        # Another request created the bucket first
+        EngagementBucket.objects.filter(**lookup).update(score=F('score') + weight)
+
+
+def decayed_score(points, age_hours, gravity):
+    return points / (age_hours + 2) ** gravity
+
+
+def compute_trending(now=None):
+    """Score recent buckets, replace the ranked table and prune expired buckets"""
+    now = now or timezone.now()
+    window = timedelta(hours=_setting('TRENDING_WINDOW_HOURS', 72))
+    gravity = _setting('TRENDING_GRAVITY', 1.8)
+    size = _setting('TRENDING_SIZE', 50)
+
+    scores = defaultdict(lambda: defaultdict(float))
+    engagement = defaultdict(lambda: defaultdict(int))
+    buckets = EngagementBucket.objects.filter(bucket_start__gte=now - window).values_list(
+        'item_type', 'item_id', 'bucket_start', 'score'
+    )
+    for item_type, item_id, bucket_start, points in buckets.iterator():
+        age_hours = max((now - bucket_start).total_seconds() / 3600, 0)
+        scores[item_type][item_id] += decayed_score(points, age_hours, gravity)
+        engagement[item_type][item_id] += points
+
+    rows = []
+    for item_type in ITEM_MODELS:
+        top = heapq.nlargest(size, scores[item_type].items(), key=lambda item: (item[1], item[0]))
+        rows.extend(
+            TrendingItem(
+                item_type=item_type, item_id=item_id, rank=rank, score=score,
+                engagement=engagement[item_type][item_id], computed_at=now
+            )
+            for rank, (item_id, score) in enumerate(top, start=1)
+        )
+
+    with transaction.atomic():
+        TrendingItem.objects.all().delete()
+        TrendingItem.objects.bulk_create(rows)
+        EngagementBucket.objects.filter(bucket_start__lt=now - window).delete()
+
+    cache.set(COMPUTED_AT_KEY, now, timeout=None)
+    return len(rows)
+
+
+def last_computed():
+    computed_at = cache.get(COMPUTED_AT_KEY)
+    if computed_at is None:
+        computed_at = TrendingItem.objects.aggregate(latest=Max('computed_at'))['latest']
+        if computed_at is not None:
+            cache.set(COMPUTED_AT_KEY, computed_at, timeout=None)
+    return computed_at
+
+
+def ensure_fresh():
+    """Recompute if the periodic job has not run lately; one request wins the lock"""
+    max_age = _setting('TRENDING_MAX_AGE', 15 * 60)
+    computed_at = last_computed()
+    if computed_at is not None and (timezone.now() - computed_at).total_seconds() <= max_age:
+        return
+    if cache.add(COMPUTE_LOCK_KEY, True, timeout=60):
+        compute_trending()
+
+
+def get_trending(item_type, limit=10, queryset=None):
+    """Return up to `limit` trending objects in rank order, each with trending_score and engagement set"""
+    ensure_fresh()
+    ranked = list(
+        TrendingItem.objects.filter(item_type=item_type).order_by('rank')
+        .values_list('item_id', 'score', 'engagement')[:limit]
+    )
+    if queryset is None:
+        queryset = apps.get_model(ITEM_MODELS[item_type]).objects.all()
+    objects = queryset.in_bulk([item_id for item_id, _, _ in ranked])
+
+    results = []
+    for item_id, score, points in ranked:
+        obj = objects.get(item_id)
+        if obj is None:
+            # Deleted or filtered out since the last computation
+            continue
+        obj.trending_score = score
+        obj.engagement = points
+        results.append(obj)
+    return results
+
+
+def backfill(now=None):
+    """Rebuild buckets inside the window from existing rows; returns the bucket count"""
+    now = now or timezone.now()
+    since = bucket_for(now - timedelta(hours=_setting('TRENDING_WINDOW_HOURS', 72)))
+
+    totals = defaultdict(int)
+    for source in ENGAGEMENT_SOURCES:
+        rows = apps.get_model(source.model).objects.filter(created_at__gte=since).values_list(
+            source.item_field, 'created_at'
+        )
+        for item_id, created_at in rows.iterator():
+            totals[(source.item_type, item_id, bucket_for(created_at))] += source.weight
+
+    tagged = apps.get_model('community.HashTag').posts.through.objects.filter(
+        post__created_at__gte=since
+    ).values_list('hashtag_id', 'post__created_at')
+    for hashtag_id, created_at in tagged.iterator():
+        totals[('hashtag', hashtag_id, bucket_for(created_at))] += HASHTAG_WEIGHT
+
+    with transaction.atomic():
+        EngagementBucket.objects.filter(bucket_start__gte=since).delete()
+        EngagementBucket.objects.bulk_create([
+            EngagementBucket(item_type=item_type, item_id=item_id, bucket_start=bucket_start, score=score)
+            for (item_type, item_id, bucket_start), score in totals.items()
+        ], batch_size=500)
+    return len(totals)
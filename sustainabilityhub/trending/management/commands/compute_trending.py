@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from trending.engine import backfill, compute_trending
+
+
+class Command(BaseCommand):
+    help = 'Recomputes time-decayed trending rankings from recent engagement buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Rebuild buckets in the window from existing rows first')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            buckets = backfill()
+            self.stdout.write(f'[OK] Backfilled {buckets} engagement buckets')
+        
+        ranked = compute_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Ranked {ranked} trending items')
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('topic', 'Forum topic'), ('post', 'Community post'), ('hashtag', 'Hashtag')], max_length=20)),
+                ('item_id', models.PositiveIntegerField()),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField(help_text='Time-decayed engagement score')),
+                ('engagement', models.IntegerField(default=0, help_text='Raw engagement inside the trending window')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['item_type', 'rank'],
+                'unique_together': {('item_type', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EngagementBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('topic', 'Forum topic'), ('post', 'Community post'), ('hashtag', 'Hashtag')], max_length=20)),
+                ('item_id', models.PositiveIntegerField()),
+                ('bucket_start', models.DateTimeField()),
+                ('score', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='trending_en_bucket__02cdf5_idx')],
+                'unique_together': {('item_type', 'item_id', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+
+
+ITEM_TYPES = [
+    ('topic', 'Forum topic'),
+    ('post', 'Community post'),
+    ('hashtag', 'Hashtag'),
+]
+
+
+class EngagementBucket(models.Model):
+    """Engagement received by one item during one hour"""
+    item_type = models.CharField(max_length=20, choices=ITEM_TYPES)
+    item_id = models.PositiveIntegerField()
+    bucket_start = models.DateTimeField()
+    score = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['item_type', 'item_id', 'bucket_start']
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+    
+    def __str__(self):
+        return f'{self.item_type} {self.item_id} @ {self.bucket_start}: {self.score}'
+
+
+class TrendingItem(models.Model):
+    """Ranked output of the last trending computation, read in rank order"""
+    item_type = models.CharField(max_length=20, choices=ITEM_TYPES)
+    item_id = models.PositiveIntegerField()
+    rank = models.PositiveIntegerField()
+    score = models.FloatField(help_text="Time-decayed engagement score")
+    engagement = models.IntegerField(default=0, help_text="Raw engagement inside the trending window")
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['item_type', 'rank']
+        unique_together = ['item_type', 'rank']
+    
+    def __str__(self):
+        return f'#{self.rank} {self.item_type} {self.item_id}'
@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.db.models.signals import post_save, m2m_changed
+from .engine import ENGAGEMENT_SOURCES, HASHTAG_WEIGHT, record
+
+
+def _engagement_receiver(source):
+    def record_engagement(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            record(source.item_type, getattr(instance, source.item_field), source.weight)
+    return record_engagement
+
+
+def record_hashtag_use(sender, instance, action, reverse, pk_set, **kwargs):
+    """Newly tagged posts count towards their hashtags"""
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        # instance is the post, pk_set the hashtags added to it
+        for hashtag_id in pk_set:
+            record('hashtag', hashtag_id, HASHTAG_WEIGHT)
+    else:
+        record('hashtag', instance.pk, HASHTAG_WEIGHT * len(pk_set))
+
+
+for _source in ENGAGEMENT_SOURCES:
+    post_save.connect(
+        _engagement_receiver(_source), sender=_source.model, weak=False,
+        dispatch_uid=f'trending_{_source.model.lower()}'
+    )
+
+m2m_changed.connect(
+    record_hashtag_use, sender=apps.get_model('community.HashTag').posts.through,
+    dispatch_uid='trending_hashtag_posts'
+)